@@ -0,0 +1,85 @@
+"""dumpdata против export_blog: время и пиковая память на большой базе.
+
+База заполняется через fast_loaddata из сгенерированной фикстуры, каждая
+выгрузка идёт в отдельном процессе.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_export --posts 50000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from .bench_loaddata import write_fixture
+from .common import setup_django
+
+TOOLS = {
+    'dumpdata': ['dumpdata', 'auth.user', 'blog.category', 'blog.location',
+                 'blog.post', 'blog.comment', '--output'],
+    'export_blog': ['export_blog', '--format', 'json'],
+    'export_blog --workers 3': ['export_blog', '--format', 'json',
+                                '--workers', '3'],
+}
+
+
+def prepare(directory, posts):
+    from django.core.management import call_command
+
+    fixture = os.path.join(directory, 'fixture.json')
+    write_fixture(fixture, posts)
+    call_command('migrate', verbosity=0)
+    call_command('fast_loaddata', fixture, stdout=open(os.devnull, 'w'))
+
+
+def run_tool(tool, directory):
+    from django.core.management import call_command
+
+    target = os.path.join(directory, 'export.json')
+    started = time.perf_counter()
+    call_command(*TOOLS[tool], target, stdout=open(os.devnull, 'w'))
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    size = os.path.getsize(target) / 1024 / 1024
+    print(f'{tool:<24} {elapsed:8.2f} s  пик {peak:8.1f} МБ  '
+          f'файл {size:8.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--tool')
+    parser.add_argument('--directory')
+    args = parser.parse_args()
+
+    if args.tool is None:
+        # Пиковая память наследуется через fork и exec, поэтому и
+        # заполнение базы, и каждая выгрузка идут в отдельных процессах
+        # от лёгкого родителя.
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ['BLOGICUM_BENCH_DB'] = os.path.join(
+                directory, 'db.sqlite3'
+            )
+            for tool in ['prepare', *TOOLS]:
+                subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_export',
+                     '--tool', tool, '--directory', directory,
+                     '--posts', str(args.posts)],
+                    check=True,
+                )
+        return
+
+    setup_django()
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = os.environ['BLOGICUM_BENCH_DB']
+    if args.tool == 'prepare':
+        prepare(args.directory, args.posts)
+    else:
+        run_tool(args.tool, args.directory)
+
+
+if __name__ == '__main__':
+    main()
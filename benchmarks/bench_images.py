@@ -0,0 +1,56 @@
+"""Пропускная способность пакетной обработки изображений.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_images --count 40 --workers 1 2 4
+"""
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .common import setup_django, timer
+
+
+def make_sources(directory, count, size):
+    from PIL import Image
+    paths = []
+    for index in range(count):
+        path = Path(directory) / f'source_{index}.jpg'
+        image = Image.new('RGB', size, color=(index % 255, 120, 200))
+        image.save(path, 'JPEG', quality=92)
+        paths.append(str(path))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--width', type=int, default=3000)
+    parser.add_argument('--height', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from blog.images import render_card
+
+    size = tuple(settings.BLOG_IMAGE_CARD_SIZE)
+    quality = settings.BLOG_IMAGE_QUALITY
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_sources(directory, args.count, (args.width, args.height))
+        with timer('в процессе запроса (последовательно)',
+                   args.count, 'img'):
+            for path in paths:
+                render_card(path, size, quality)
+        for workers in args.workers:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                with timer(f'пул процессов, workers={workers}',
+                           args.count, 'img'):
+                    list(executor.map(
+                        render_card, paths,
+                        [size] * len(paths), [quality] * len(paths),
+                    ))
+
+
+if __name__ == '__main__':
+    main()
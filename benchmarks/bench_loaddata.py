@@ -0,0 +1,95 @@
+"""loaddata против fast_loaddata на сгенерированной фикстуре db.json.
+
+Каждая команда запускается в отдельном процессе на своей временной базе,
+чтобы пиковая память процесса относилась только к ней.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_loaddata --posts 50000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import setup_django
+
+
+def write_fixture(path, posts):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[\n')
+        file.write(json.dumps({
+            'model': 'auth.user', 'pk': 1,
+            'fields': {'username': 'author', 'password': '',
+                       'date_joined': '2022-12-18T22:57:29.299Z'},
+        }))
+        file.write(',\n')
+        file.write(json.dumps({
+            'model': 'blog.category', 'pk': 1,
+            'fields': {'title': 'Категория', 'slug': 'category',
+                       'description': 'Описание', 'is_published': True,
+                       'created_at': '2022-12-18T23:03:52.159Z'},
+        }))
+        for number in range(1, posts + 1):
+            file.write(',\n')
+            file.write(json.dumps({
+                'model': 'blog.post', 'pk': number,
+                'fields': {
+                    'title': f'Публикация {number}', 'text': 'Текст ' * 50,
+                    'pub_date': '2022-12-18T23:03:52.159Z', 'author': 1,
+                    'category': 1, 'location': None, 'is_published': True,
+                    'created_at': '2022-12-18T23:03:52.159Z', 'image': '',
+                },
+            }, ensure_ascii=False))
+        file.write('\n]\n')
+
+
+def run_tool(tool, fixture, objects):
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    started = time.perf_counter()
+    if tool == 'loaddata':
+        call_command('loaddata', fixture, verbosity=0)
+    else:
+        call_command('fast_loaddata', fixture, stdout=open(os.devnull, 'w'))
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{tool:<14} {elapsed:8.2f} s  {objects / elapsed:10.0f} '
+          f'объектов/с  пик {peak:8.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--tool')
+    parser.add_argument('--fixture')
+    args = parser.parse_args()
+
+    if args.tool is None:
+        with tempfile.TemporaryDirectory() as directory:
+            fixture = os.path.join(directory, 'db.json')
+            write_fixture(fixture, args.posts)
+            for tool in ('loaddata', 'fast_loaddata'):
+                subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_loaddata',
+                     '--tool', tool, '--fixture', fixture,
+                     '--posts', str(args.posts)],
+                    check=True,
+                )
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django()
+        from django.conf import settings
+        settings.DATABASES['default']['NAME'] = os.path.join(
+            directory, 'db.sqlite3'
+        )
+        run_tool(args.tool, args.fixture, args.posts + 2)
+
+
+if __name__ == '__main__':
+    main()
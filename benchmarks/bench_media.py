@@ -0,0 +1,67 @@
+"""Отдача медиафайлов: django.views.static.serve против blog.media.serve.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_media --size-mb 8 --repeat 50
+"""
+import argparse
+import os
+import tempfile
+
+from .common import setup_django, timer
+
+
+def consume(response):
+    if response.streaming:
+        total = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        total = len(response.content)
+    response.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from django.views import static
+
+    from blog import media
+
+    factory = RequestFactory()
+    size = args.size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, 'video.mp4'), 'wb') as file:
+            file.write(os.urandom(size))
+        total_mb = args.size_mb * args.repeat
+
+        with timer('static.serve, весь файл', total_mb, 'MB'):
+            for _ in range(args.repeat):
+                request = factory.get('/media/video.mp4')
+                consume(static.serve(request, 'video.mp4', root))
+        with timer('media.serve, весь файл', total_mb, 'MB'):
+            for _ in range(args.repeat):
+                request = factory.get('/media/video.mp4')
+                consume(media.serve(request, 'video.mp4', root))
+
+        # Перемотка видео: клиенту нужен последний мегабайт файла.
+        with timer('static.serve, хвост 1 MB (весь файл)', args.repeat,
+                   'req'):
+            for _ in range(args.repeat):
+                request = factory.get(
+                    '/media/video.mp4', HTTP_RANGE='bytes=-1048576'
+                )
+                consume(static.serve(request, 'video.mp4', root))
+        with timer('media.serve, хвост 1 MB (206)', args.repeat, 'req'):
+            for _ in range(args.repeat):
+                request = factory.get(
+                    '/media/video.mp4', HTTP_RANGE='bytes=-1048576'
+                )
+                consume(media.serve(request, 'video.mp4', root))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Параллельные чтения и записи комментариев в двух профилях SQLite.
+
+Каждый профиль запускается в отдельном процессе на своей временной базе:
+читатели листают ленту, писатели добавляют комментарии.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_sqlite --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .common import setup_django
+
+
+def prepare():
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from blog.models import Category, Post
+
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='author')
+    category = Category.objects.create(
+        title='Категория', slug='category', description='Описание'
+    )
+    Post.objects.bulk_create(
+        Post(title=f'Публикация {number}', text='Текст', author=author,
+             category=category, pub_date=timezone.now())
+        for number in range(200)
+    )
+    return author
+
+
+def reader(stop, counts):
+    from django.db import OperationalError, connection
+
+    from blog.models import Post
+    from blog.views import get_queryset_with_comment_counts
+
+    while not stop.is_set():
+        try:
+            posts = Post.objects.select_related('author', 'category')
+            list(get_queryset_with_comment_counts(posts)
+                 .order_by('-pub_date')[:10])
+            counts['reads'] += 1
+        except OperationalError:
+            counts['errors'] += 1
+    connection.close()
+
+
+def writer(stop, counts, author):
+    from django.db import OperationalError, connection
+
+    from blog.models import Comment, Post
+
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    number = 0
+    while not stop.is_set():
+        number += 1
+        try:
+            Comment.objects.create(
+                post_id=post_ids[number % len(post_ids)], author=author,
+                text='Комментарий',
+            )
+            counts['writes'] += 1
+        except OperationalError:
+            counts['errors'] += 1
+    connection.close()
+
+
+def run_profile(args):
+    from django.db import connection
+
+    author = prepare()
+    connection.close()
+    stop = threading.Event()
+    results = []
+    threads = []
+    for number in range(args.readers + args.writers):
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        results.append(counts)
+        if number < args.readers:
+            target, thread_args = reader, (stop, counts)
+        else:
+            target, thread_args = writer, (stop, counts, author)
+        threads.append(threading.Thread(target=target, args=thread_args))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    totals = {
+        key: sum(counts[key] for counts in results)
+        for key in ('reads', 'writes', 'errors')
+    }
+    print(f'{args.profile:<12} чтений {totals["reads"] / elapsed:9.1f}/s  '
+          f'записей {totals["writes"] / elapsed:8.1f}/s  '
+          f'ошибок {totals["errors"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args, rest = parser.parse_known_args()
+
+    if args.profile is None:
+        # Настройки Django задаются один раз на процесс, поэтому каждый
+        # профиль запускается отдельно.
+        for profile in ('default', 'production'):
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_sqlite',
+                 '--profile', profile] + sys.argv[1:],
+                check=True,
+            )
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['BLOGICUM_SQLITE_PROFILE'] = args.profile
+        setup_django()
+        from django.conf import settings
+        settings.DATABASES['default']['NAME'] = os.path.join(
+            directory, 'db.sqlite3'
+        )
+        run_profile(args)
+
+
+if __name__ == '__main__':
+    main()
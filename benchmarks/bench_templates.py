@@ -0,0 +1,83 @@
+"""Размер HTML ленты с обычными и сжимающими пробелы загрузчиками шаблонов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_templates --posts 10 --repeat 200
+"""
+import argparse
+import gzip
+
+from .common import setup_django, timer
+
+
+def make_backend(loaders):
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    options = dict(settings.TEMPLATES[0]['OPTIONS'])
+    options['loaders'] = [('django.template.loaders.cached.Loader', loaders)]
+    return DjangoTemplates({
+        'NAME': 'bench',
+        'DIRS': settings.TEMPLATES[0]['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': options,
+    })
+
+
+def make_page(count):
+    from django.contrib.auth import get_user_model
+    from django.core.paginator import Paginator
+    from django.utils import timezone
+
+    from blog.models import Category, Location, Post
+
+    author = get_user_model()(username='author')
+    category = Category(title='Путешествия', slug='travel',
+                        is_published=True)
+    location = Location(name='Москва', is_published=True)
+    posts = []
+    for number in range(1, count * 5 + 1):
+        post = Post(
+            id=number, title=f'Публикация {number}', text='Текст ' * 40,
+            pub_date=timezone.now(), author=author, category=category,
+            location=location, is_published=True,
+        )
+        post.comment_count = number % 7
+        posts.append(post)
+    return Paginator(posts, count).page(3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    page = make_page(args.posts)
+    variants = [
+        ('как есть', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+        ('без отступов', [
+            'blogicum.template_loaders.FilesystemLoader',
+            'blogicum.template_loaders.AppDirectoriesLoader',
+        ]),
+    ]
+    for label, loaders in variants:
+        template = make_backend(loaders).get_template('blog/index.html')
+        html = template.render({'page_obj': page}, request).encode()
+        print(f'{label:<14} HTML {len(html):7} байт, '
+              f'gzip {len(gzip.compress(html)):6} байт')
+        with timer(f'отрисовка, {label}', args.repeat, 'стр'):
+            for _ in range(args.repeat):
+                template.render({'page_obj': page}, request)
+
+
+if __name__ == '__main__':
+    main()
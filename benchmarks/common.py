@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROJECT_DIR = ROOT / 'blogicum'
+
+
+def setup_django(**overrides):
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+    from django.conf import settings
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    import django
+    django.setup()
+
+
+@contextmanager
+def timer(label, units=None, unit_name='ops'):
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    line = f'{label:<40} {elapsed:8.3f} s'
+    if units:
+        line += f'  {units / elapsed:10.1f} {unit_name}/s'
+    print(line)
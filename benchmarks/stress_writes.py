@@ -0,0 +1,124 @@
+"""Нагрузочный тест: параллельные комментарии через весь стек Django.
+
+Каждый поток отправляет POST на /posts/<id>/comment/ от своего
+пользователя. Без координации записи часть запросов падает с
+«database is locked»; с ней все должны пройти.
+
+Запуск из корня репозитория:
+    python -m benchmarks.stress_writes --writers 16 --requests 50
+    python -m benchmarks.stress_writes --no-coordination
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from .common import setup_django
+
+
+def prepare(writers):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from blog.models import Category, Post
+
+    call_command('migrate', verbosity=0)
+    users = [
+        get_user_model().objects.create(username=f'user{number}')
+        for number in range(writers)
+    ]
+    category = Category.objects.create(
+        title='Категория', slug='category', description='Описание'
+    )
+    post = Post.objects.create(
+        title='Публикация', text='Текст', author=users[0],
+        category=category, pub_date=timezone.now(),
+    )
+    return users, post
+
+
+def writer(user, post, requests, results):
+    from django.db import connection
+    from django.test import Client
+
+    from blog.db import retry_on_lock
+
+    # Сигнал got_request_exception общий для потоков: с повторным
+    # выбросом Client получил бы чужие исключения. Ошибка видна по 500.
+    client = Client(raise_request_exception=False)
+    retry_on_lock(client.force_login, user)
+    for _ in range(requests):
+        response = client.post(f'/posts/{post.pk}/comment/',
+                               {'text': 'Комментарий'})
+        results['ok' if response.status_code == 302 else 'failed'] += 1
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--busy-timeout', type=int,
+                        help='PRAGMA busy_timeout, мс; по умолчанию из '
+                             'профиля production.')
+    parser.add_argument('--serialize', action='store_true',
+                        help='Включить SQLITE_SERIALIZE_WRITES.')
+    parser.add_argument('--no-coordination', action='store_true')
+    args = parser.parse_args()
+
+    os.environ['BLOGICUM_SQLITE_PROFILE'] = 'production'
+    with tempfile.TemporaryDirectory() as directory:
+        from django.conf import settings
+        setup_django()
+        settings.DATABASES['default']['NAME'] = os.path.join(
+            directory, 'db.sqlite3'
+        )
+        if args.busy_timeout is not None:
+            settings.SQLITE_PRAGMAS['busy_timeout'] = args.busy_timeout
+        settings.SQLITE_SERIALIZE_WRITES = args.serialize
+        settings.ALLOWED_HOSTS = ['testserver']
+        if args.no_coordination:
+            settings.DATABASES['default']['OPTIONS'] = {}
+            settings.MIDDLEWARE.remove(
+                'blog.middleware.WriteCoordinationMiddleware'
+            )
+            settings.SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+        from django.db import connection
+
+        from blog.db import write_stats
+        from blog.models import Comment
+
+        users, post = prepare(args.writers)
+        connection.close()
+        results = [{'ok': 0, 'failed': 0} for _ in users]
+        threads = [
+            threading.Thread(target=writer,
+                             args=(user, post, args.requests, result))
+            for user, result in zip(users, results)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        ok = sum(result['ok'] for result in results)
+        failed = sum(result['failed'] for result in results)
+        print(f'запросов {ok + failed}, успешно {ok}, с ошибкой {failed}, '
+              f'{(ok + failed) / elapsed:.1f} req/s')
+        print(f'комментариев в базе: {Comment.objects.count()}')
+        stats = write_stats.snapshot()
+        print('повторов {retries}, отказов {failures}, BEGIN: {begin} '
+              '(ожидание всего {begin_wait_total:.2f} с, '
+              'максимум {begin_wait_max:.3f} с), '
+              'очередь: {queue} (максимум {queue_wait_max:.3f} с)'
+              .format(**stats))
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,78 @@
+from collections import Counter
+
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db import transaction
 
 from .models import Category
 from .models import Location
 from .models import Post
 from .models import Comment
+from .models import ImageJob
+from .models import ArchivedPost
+from .models import ArchivedComment
+from .services import delete_in_batches
+
+ACTION_NAMES = {'deleted': 'удалено', 'nulled': 'отвязано'}
+
+
+class BatchedDeleteMixin:
+    """Действие «удалить пачками» для объектов с большим числом связей.
+
+    Список объектов выполняется без общей транзакции
+    WriteCoordinationMiddleware: иначе все пачки удаления снова попали
+    бы в одну длинную транзакцию.
+    """
+
+    actions = ('delete_in_batches',)
+
+    @transaction.non_atomic_requests
+    def changelist_view(self, request, extra_context=None):
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(
+        description='Удалить выбранные пачками вместе со связанными',
+        permissions=['delete'],
+    )
+    def delete_in_batches(self, request, queryset):
+        stats = Counter()
+        for obj in list(queryset):
+            stats.update(delete_in_batches(obj))
+        self.message_user(request, 'Готово: ' + ', '.join(
+            f'{label} — {ACTION_NAMES[action]} {count}'
+            for (action, label), count in sorted(stats.items())
+        ))
+
+
+@admin.register(Category)
+class CategoryAdmin(BatchedDeleteMixin, admin.ModelAdmin):
+    pass
+
+
+@admin.register(Location)
+class LocationAdmin(BatchedDeleteMixin, admin.ModelAdmin):
+    pass
+
+
+@admin.register(Post)
+class PostAdmin(BatchedDeleteMixin, admin.ModelAdmin):
+    pass
+
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(BatchedDeleteMixin, admin.ModelAdmin):
+    pass
+
+
+admin.site.unregister(get_user_model())
+
+
+@admin.register(get_user_model())
+class BlogUserAdmin(BatchedDeleteMixin, UserAdmin):
+    pass
+
 
-admin.site.register(Category)
-admin.site.register(Location)
-admin.site.register(Post)
 admin.site.register(Comment)
+admin.site.register(ImageJob)
+admin.site.register(ArchivedComment)
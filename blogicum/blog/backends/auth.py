@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+USER_CACHE_PREFIX = 'blog.auth.user:'
+
+
+def user_cache_key(user_id):
+    return f'{USER_CACHE_PREFIX}{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша.
+
+    AuthenticationMiddleware запрашивает строку ``auth_user`` на каждом
+    запросе; здесь она читается из кеша и перечитывается из БД после
+    изменения пользователя или через BLOG_USER_CACHE_TIMEOUT секунд.
+    Смена пароля сохраняет пользователя, поэтому хеш сессии сверяется
+    уже с новым паролем.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.BLOG_USER_CACHE_TIMEOUT)
+        return user
+
+
+def invalidate_user(sender, instance, **kwargs):
+    key = user_cache_key(instance.pk)
+    cache.delete(key)
+    # Параллельный запрос мог успеть закешировать строку до коммита.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+post_save.connect(invalidate_user, sender=get_user_model())
+post_delete.connect(invalidate_user, sender=get_user_model())
@@ -0,0 +1,30 @@
+import time
+
+from django.db.backends.sqlite3 import base
+
+from blog.db import write_stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с режимом начала транзакций из OPTIONS['transaction_mode'].
+
+    С ``'IMMEDIATE'`` блокировка записи берётся сразу в ``BEGIN``: ожидание
+    укладывается в busy_timeout, а не падает посреди транзакции при
+    попытке перейти от чтения к записи. Время ``BEGIN`` учитывается
+    в ``blog.db.write_stats``.
+    """
+
+    transaction_mode = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        statement = 'BEGIN'
+        if self.transaction_mode:
+            statement = f'BEGIN {self.transaction_mode}'
+        started = time.monotonic()
+        self.cursor().execute(statement)
+        write_stats.record_wait('begin', time.monotonic() - started)
@@ -0,0 +1,309 @@
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+from datetime import datetime, timezone
+
+WAL_HEADER_SIZE = 32
+FRAME_HEADER_SIZE = 24
+STAMP_FORMAT = '%Y%m%dT%H%M%S.%fZ'
+
+
+def stamp(moment=None):
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).strftime(STAMP_FORMAT)
+
+
+def parse_stamp(value):
+    return datetime.strptime(value, STAMP_FORMAT).replace(
+        tzinfo=timezone.utc
+    )
+
+
+def write_atomic(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                     prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class BackupError(Exception):
+    pass
+
+
+class RestartCounter:
+    """Считает перезапуски копирования по progress-колбэку backup API.
+
+    После записи в источник между шагами копирование начинается заново:
+    число оставшихся страниц перестаёт убывать.
+    """
+
+    def __init__(self, max_restarts, progress=None):
+        self.max_restarts = max_restarts
+        self.progress = progress
+        self.remaining = None
+        self.restarts = 0
+
+    def __call__(self, status, remaining, total):
+        if self.remaining is not None and remaining >= self.remaining:
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise BackupError(
+                    'Число перезапусков копирования превысило '
+                    f'{self.max_restarts}: источник меняется быстрее, '
+                    'чем копируется.'
+                )
+        self.remaining = remaining
+        if self.progress is not None:
+            self.progress(status, remaining, total)
+
+
+def backup(source, target_path, pages=256, sleep=0.01, progress=None,
+           max_restarts=20):
+    """Копирует базу через online backup API.
+
+    В режиме WAL копия снимается за один шаг: читатель не мешает
+    писателям, а запись в источник между шагами заставила бы копирование
+    начинаться заново. С журналом отката шаг держит блокировку чтения,
+    поэтому база копируется шагами по ``pages`` страниц, а после
+    ``max_restarts`` перезапусков выбрасывается BackupError. Копия
+    собирается во временном файле и подменяет ``target_path`` атомарно.
+    """
+    if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+        pages = -1
+    directory = os.path.dirname(os.path.abspath(target_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-',
+                                     suffix='.sqlite3')
+    os.close(fd)
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target, pages=pages, sleep=sleep,
+                          progress=RestartCounter(max_restarts, progress))
+        finally:
+            target.close()
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def committed_length(data, salts, page_size):
+    """Длина начала ``data`` из кадров поколения до последнего коммита.
+
+    Кадры с чужой солью остались от прошлого поколения WAL, а кадры после
+    последнего коммит-кадра — от незавершённой или откатенной транзакции.
+    """
+    frame_size = FRAME_HEADER_SIZE + page_size
+    offset = end = 0
+    while offset + frame_size <= len(data):
+        commit, frame_salts = struct.unpack_from('>4xI8s', data, offset)
+        if frame_salts != salts:
+            break
+        offset += frame_size
+        if commit:
+            end = offset
+    return end
+
+
+class WalArchiver:
+    """Непрерывное архивирование WAL для восстановления на момент времени.
+
+    Архив одного запуска — каталог ``<время>/`` с базовой копией
+    ``base.sqlite3`` и подкаталогами ``wal/<поколение>/``: заголовок WAL
+    и сегменты кадров ``<время>-<смещение>.frames``. Поколение — это
+    содержимое WAL между перезапусками (новая соль в заголовке).
+
+    Архиватор держит открытой читающую транзакцию: пока она открыта,
+    SQLite не начинает WAL заново и не затирает ещё не скопированные
+    кадры. Новые кадры читаются под короткой блокировкой записи, поэтому
+    в архив попадают только целиком записанные транзакции. Раз в
+    ``checkpoint()`` архиватор отпускает чтение и даёт SQLite перенести
+    WAL в базу, иначе журнал рос бы без ограничений.
+    """
+
+    def __init__(self, db_path, archive_dir, timeout=5.0):
+        self.db_path = str(db_path)
+        self.wal_path = self.db_path + '-wal'
+        self.run_dir = os.path.join(str(archive_dir), stamp())
+        self.reader = sqlite3.connect(self.db_path, isolation_level=None,
+                                      timeout=timeout)
+        self.locker = sqlite3.connect(self.db_path, isolation_level=None,
+                                      timeout=timeout)
+        self.generation = 0
+        self.salts = None
+        self.offset = WAL_HEADER_SIZE
+        self.page_size = None
+
+    def journal_mode(self):
+        return self.reader.execute('PRAGMA journal_mode').fetchone()[0]
+
+    def hold(self):
+        self.reader.execute('BEGIN')
+        self.reader.execute('SELECT count(*) FROM sqlite_master').fetchone()
+
+    def start(self, pages=256, sleep=0.01):
+        self.hold()
+        # Базовая копия снимается внутри той же читающей транзакции:
+        # кадры WAL, которые архив затем повторит, уже не старше её.
+        backup(self.reader, os.path.join(self.run_dir, 'base.sqlite3'),
+               pages=pages, sleep=sleep)
+        os.makedirs(os.path.join(self.run_dir, 'wal'), exist_ok=True)
+
+    def poll(self):
+        """Архивирует новые транзакции; возвращает число кадров."""
+        self.locker.execute('BEGIN IMMEDIATE')
+        try:
+            return self.archive_frames()
+        finally:
+            self.locker.execute('COMMIT')
+
+    def archive_frames(self):
+        try:
+            wal = open(self.wal_path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with wal:
+            header = wal.read(WAL_HEADER_SIZE)
+            if len(header) < WAL_HEADER_SIZE:
+                return 0
+            if header[16:24] != self.salts:
+                self.new_generation(header)
+            wal.seek(self.offset)
+            data = wal.read()
+        length = committed_length(data, self.salts, self.page_size)
+        if not length:
+            return 0
+        write_atomic(
+            os.path.join(self.generation_dir,
+                         f'{stamp()}-{self.offset:012d}.frames'),
+            data[:length],
+        )
+        self.offset += length
+        return length // (FRAME_HEADER_SIZE + self.page_size)
+
+    def new_generation(self, header):
+        self.generation += 1
+        self.salts = header[16:24]
+        self.page_size = struct.unpack_from('>I', header, 8)[0]
+        self.offset = WAL_HEADER_SIZE
+        self.generation_dir = os.path.join(
+            self.run_dir, 'wal', f'{self.generation:06d}'
+        )
+        os.makedirs(self.generation_dir, exist_ok=True)
+        write_atomic(os.path.join(self.generation_dir, 'header'), header)
+
+    def checkpoint(self):
+        """Отпускает WAL для переноса в базу, не теряя кадров архива."""
+        self.locker.execute('BEGIN IMMEDIATE')
+        try:
+            archived = self.archive_frames()
+            self.reader.execute('COMMIT')
+            # Соединение с открытой транзакцией не может выполнить
+            # checkpoint; блокировка записи остаётся у self.locker.
+            checkpointer = sqlite3.connect(self.db_path)
+            try:
+                checkpointer.execute('PRAGMA wal_checkpoint(PASSIVE)')
+            finally:
+                checkpointer.close()
+            self.hold()
+        finally:
+            self.locker.execute('COMMIT')
+        return archived
+
+    def close(self):
+        if self.reader.in_transaction:
+            self.reader.execute('COMMIT')
+        self.reader.close()
+        self.locker.close()
+
+
+def replay(db_path, generation_dir, until=None):
+    """Применяет к копии базы кадры одного поколения не позже ``until``."""
+    segments = sorted(
+        name for name in os.listdir(generation_dir)
+        if name.endswith('.frames')
+        and (until is None or parse_stamp(name.split('-')[0]) <= until)
+    )
+    if not segments:
+        return 0
+    connection = sqlite3.connect(db_path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.close()
+    with open(db_path + '-wal', 'wb') as wal:
+        with open(os.path.join(generation_dir, 'header'), 'rb') as header:
+            wal.write(header.read())
+        for name in segments:
+            with open(os.path.join(generation_dir, name), 'rb') as segment:
+                shutil.copyfileobj(segment, wal)
+    # Открывая базу, SQLite проверяет кадры по контрольным суммам и
+    # применяет их до последнего коммита.
+    connection = sqlite3.connect(db_path)
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    connection.close()
+    return len(segments)
+
+
+def find_run(archive_dir, until=None):
+    """Последний запуск архиватора, начатый не позже ``until``."""
+    runs = sorted(
+        name for name in os.listdir(archive_dir)
+        if os.path.isfile(os.path.join(archive_dir, name, 'base.sqlite3'))
+        and (until is None or parse_stamp(name) <= until)
+    )
+    if not runs:
+        return None
+    return os.path.join(archive_dir, runs[-1])
+
+
+def restore(source, target_path, until=None):
+    """Восстанавливает базу из копии или из каталога архива WAL.
+
+    Возвращает число применённых сегментов WAL. Результат собирается
+    рядом с ``target_path`` и подменяет его атомарно.
+    """
+    source = str(source)
+    if os.path.isdir(source):
+        run_dir = find_run(source, until)
+        if run_dir is None:
+            raise FileNotFoundError(
+                f'В {source} нет базовой копии не позже {until}.'
+            )
+        base = os.path.join(run_dir, 'base.sqlite3')
+    else:
+        run_dir, base = None, source
+    directory = os.path.dirname(os.path.abspath(target_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-',
+                                     suffix='.sqlite3')
+    os.close(fd)
+    applied = 0
+    try:
+        shutil.copyfile(base, temp_path)
+        if run_dir is not None:
+            wal_dir = os.path.join(run_dir, 'wal')
+            for generation in sorted(os.listdir(wal_dir)):
+                applied += replay(
+                    temp_path, os.path.join(wal_dir, generation), until
+                )
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    finally:
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(temp_path + suffix):
+                os.unlink(temp_path + suffix)
+    for suffix in ('-wal', '-shm'):
+        # Журнал прежней базы не относится к восстановленной.
+        if os.path.exists(str(target_path) + suffix):
+            os.unlink(str(target_path) + suffix)
+    return applied
@@ -0,0 +1,170 @@
+import gzip
+import json
+import re
+from collections import Counter, defaultdict
+
+NON_WHITESPACE = re.compile(r'[^ \t\n\r]')
+# Самый длинный токен, об обрыве которого JSONDecodeError сообщает
+# позицией его начала: -Infinity (\uXXXX короче).
+TRUNCATED_TOKEN = len('-Infinity')
+
+
+def open_fixture(path):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+class JSONArrayReader:
+    """Выдаёт элементы JSON-массива по одному, читая файл кусками.
+
+    В памяти держится только текущий кусок и недочитанный элемент.
+    Элемент, разорванный границей куска, разбирается заново после
+    следующего чтения; ошибка в середине куска выбрасывается сразу.
+    """
+
+    def __init__(self, file, chunk_size=1 << 20):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+
+    def fill(self):
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return bool(chunk)
+
+    def peek(self):
+        """Первый непробельный символ; при необходимости дочитывает файл."""
+        while True:
+            match = NON_WHITESPACE.search(self.buffer, self.position)
+            if match:
+                self.position = match.start()
+                return self.buffer[self.position]
+            self.position = len(self.buffer)
+            if not self.fill():
+                raise ValueError('JSON-массив фикстуры не закрыт.')
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f'Неожиданный символ {char!r} в JSON-массиве.')
+        self.position += 1
+        return char
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                item, self.position = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+                return item
+            except json.JSONDecodeError as error:
+                if not self.truncated(error) or not self.fill():
+                    raise
+
+    def truncated(self, error):
+        """Могла ли ошибка разбора возникнуть из-за конца буфера."""
+        if error.msg.startswith('Unterminated string'):
+            return True
+        return error.pos >= len(self.buffer) - TRUNCATED_TOKEN
+
+    def __iter__(self):
+        self.expect('[')
+        if self.peek() == ']':
+            return
+        while True:
+            yield self.decode()
+            if self.expect(',]') == ']':
+                return
+
+
+def secondary_indexes(connection, table):
+    """Неуникальные индексы таблицы SQLite с их SQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = %s AND sql LIKE 'CREATE INDEX %%'",
+            [table],
+        )
+        return cursor.fetchall()
+
+
+class BulkLoader:
+    """Копит объекты фикстуры по моделям и вставляет их bulk_create.
+
+    Объекты не проходят через save(): сигналы и собственная логика
+    моделей не вызываются, как и у loaddata с raw=True. Неуникальные
+    индексы SQLite удаляются перед первой вставкой в таблицу и
+    создаются заново в ``restore_indexes()`` — один проход по готовым
+    данным дешевле обновления индекса на каждой строке.
+    """
+
+    def __init__(self, connection, batch_size, ignore_conflicts=False,
+                 defer_indexes=True):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.defer_indexes = (
+            defer_indexes and connection.vendor == 'sqlite'
+        )
+        self.pending = defaultdict(list)
+        self.counts = Counter()
+        self.models = []
+        self.dropped = []
+
+    def prepare(self, model):
+        self.models.append(model)
+        if not self.defer_indexes:
+            return
+        indexes = secondary_indexes(self.connection, model._meta.db_table)
+        with self.connection.cursor() as cursor:
+            for name, sql in indexes:
+                cursor.execute(
+                    f'DROP INDEX {self.connection.ops.quote_name(name)}'
+                )
+        self.dropped.extend(sql for _, sql in indexes)
+
+    def add(self, deserialized):
+        obj = deserialized.object
+        self.queue(type(obj), obj)
+        for name, values in (deserialized.m2m_data or {}).items():
+            field = obj._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            for value in values:
+                self.queue(
+                    through, through(**{source: obj.pk, target: value})
+                )
+
+    def queue(self, model, obj):
+        if model not in self.models:
+            self.prepare(model)
+        batch = self.pending[model]
+        batch.append(obj)
+        if len(batch) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        batch = self.pending.pop(model, [])
+        model._base_manager.using(self.connection.alias).bulk_create(
+            batch, batch_size=self.batch_size,
+            ignore_conflicts=self.ignore_conflicts,
+        )
+        self.counts[model._meta.label] += len(batch)
+
+    def flush_all(self):
+        for model in list(self.pending):
+            self.flush(model)
+
+    def restore_indexes(self):
+        with self.connection.cursor() as cursor:
+            for sql in self.dropped:
+                cursor.execute(sql.replace(
+                    'CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1
+                ))
+        self.dropped = []
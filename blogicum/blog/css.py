@@ -0,0 +1,120 @@
+import re
+
+CLASS_ATTR_RE = re.compile(r'\bclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+CLASS_SELECTOR_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+NOT_RE = re.compile(r':not\([^()]*\)')
+ATTRIBUTE_RE = re.compile(r'\[[^\]]*\]')
+# Внутри этих at-правил лежат обычные правила, их тоже нужно чистить.
+NESTED_AT_RULES = ('@media', '@supports')
+
+
+def html_classes(text):
+    """Имена классов из атрибутов class в HTML или в тексте шаблона."""
+    classes = set()
+    for match in CLASS_ATTR_RE.finditer(text):
+        value = match.group(1) or match.group(2) or ''
+        # Части условий {% if %} внутри атрибута тоже считаются классами.
+        value = TEMPLATE_TAG_RE.sub(' ', value)
+        classes.update(value.split())
+    return classes
+
+
+def scan(css, position, stops):
+    """Позиция первого символа из stops вне строк и скобок."""
+    depth = 0
+    quote = None
+    while position < len(css):
+        char = css[position]
+        if quote:
+            if char == '\\':
+                position += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and char in stops:
+            return position
+        position += 1
+    return len(css)
+
+
+def block_end(css, start):
+    """Позиция закрывающей скобки блока, открытого на start."""
+    depth = 0
+    position = start
+    while position < len(css):
+        position = scan(css, position, '{}')
+        if position == len(css):
+            break
+        depth += 1 if css[position] == '{' else -1
+        if not depth:
+            return position
+        position += 1
+    return len(css)
+
+
+def split_selectors(prelude):
+    selectors = []
+    position = 0
+    while position < len(prelude):
+        end = scan(prelude, position, ',')
+        selectors.append(prelude[position:end].strip())
+        position = end + 1
+    return selectors
+
+
+def selector_used(selector, used):
+    selector = ATTRIBUTE_RE.sub('', NOT_RE.sub('', selector))
+    return all(
+        name in used for name in CLASS_SELECTOR_RE.findall(selector)
+    )
+
+
+def purge_css(css, used):
+    """Удаляет правила, чьи селекторы ссылаются на неиспользуемые классы.
+
+    Селектор остаётся, если все его классы есть в ``used``; классы внутри
+    ``:not()`` не учитываются. ``@media`` и ``@supports`` чистятся
+    рекурсивно, прочие at-правила и комментарии ``/*! */`` сохраняются.
+    """
+    output = []
+    position = 0
+    while position < len(css):
+        if css[position].isspace():
+            position += 1
+            continue
+        if css.startswith('/*', position):
+            end = css.find('*/', position + 2)
+            end = len(css) if end < 0 else end + 2
+            if css.startswith('/*!', position):
+                output.append(css[position:end])
+            position = end
+            continue
+        end = scan(css, position, '{;')
+        prelude = css[position:end].strip()
+        if end == len(css) or css[end] == ';':
+            output.append(prelude + ';')
+            position = end + 1
+            continue
+        close = block_end(css, end)
+        body = css[end + 1:close]
+        position = close + 1
+        if prelude.startswith(NESTED_AT_RULES):
+            body = purge_css(body, used)
+            if body:
+                output.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            output.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector for selector in split_selectors(prelude)
+                if selector_used(selector, used)
+            ]
+            if selectors:
+                output.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(output)
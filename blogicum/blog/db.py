@@ -0,0 +1,127 @@
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+# Сериализует короткие записи внутри процесса при SQLITE_SERIALIZE_WRITES:
+# потоки ждут на блокировке, а не опрашивают SQLite через busy_timeout.
+write_lock = threading.Lock()
+
+
+class WriteStats:
+    """Счётчики ожидания блокировок записи, общие для процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = {'begin': 0, 'queue': 0, 'retries': 0,
+                           'failures': 0}
+            self.wait_total = {'begin': 0.0, 'queue': 0.0}
+            self.wait_max = {'begin': 0.0, 'queue': 0.0}
+
+    def record_wait(self, kind, seconds):
+        with self.lock:
+            self.counts[kind] += 1
+            self.wait_total[kind] += seconds
+            self.wait_max[kind] = max(self.wait_max[kind], seconds)
+        if seconds >= settings.SQLITE_SLOW_LOCK_WAIT:
+            logger.warning('Ожидание блокировки записи (%s): %.3f с',
+                           kind, seconds)
+
+    def record(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                **self.counts,
+                'begin_wait_total': self.wait_total['begin'],
+                'begin_wait_max': self.wait_max['begin'],
+                'queue_wait_total': self.wait_total['queue'],
+                'queue_wait_max': self.wait_max['queue'],
+            }
+
+
+write_stats = WriteStats()
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # journal_mode идёт первым: от режима журнала зависят остальные.
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return any(message in str(error) for message in LOCKED_MESSAGES)
+
+
+def retry_delay(attempt):
+    """Экспоненциальная пауза с полным джиттером."""
+    ceiling = min(
+        settings.SQLITE_RETRY_MAX_DELAY,
+        settings.SQLITE_RETRY_BASE_DELAY * 2 ** attempt,
+    )
+    return random.uniform(0, ceiling)
+
+
+def retry_on_lock(func, *args, **kwargs):
+    """Вызывает func, повторяя попытку при «database is locked».
+
+    Повторять имеет смысл только снаружи транзакции: внутри atomic()
+    ошибка всё равно откатит всю транзакцию.
+    """
+    attempts = settings.SQLITE_WRITE_RETRIES
+    for attempt in range(attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as error:
+            if not is_locked(error):
+                raise
+            if attempt == attempts:
+                write_stats.record('failures')
+                raise
+            write_stats.record('retries')
+            time.sleep(retry_delay(attempt))
+
+
+@contextmanager
+def serialized_writes():
+    if not settings.SQLITE_SERIALIZE_WRITES:
+        yield
+        return
+    started = time.monotonic()
+    with write_lock:
+        write_stats.record_wait('queue', time.monotonic() - started)
+        yield
+
+
+@contextmanager
+def write_transaction(using=None):
+    """Транзакция записи, в которой при занятой базе повторяется только BEGIN.
+
+    С ``transaction_mode = 'IMMEDIATE'`` блокировка записи берётся при входе
+    в atomic(), поэтому повтор входа не выполняет заново код блока: тот мог
+    уже переместить файлы или сделать другую работу вне транзакции.
+    """
+    with serialized_writes(), ExitStack() as stack:
+        retry_on_lock(stack.enter_context, transaction.atomic(using=using))
+        yield
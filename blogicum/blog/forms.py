@@ -1,16 +1,43 @@
 from django import forms
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from PIL import Image
+
 from .models import Post, Comment
+from .sandbox import ImageRejected, inspect_upload
 
 User = get_user_model()
 
 
+class StreamedImageField(forms.ImageField):
+    def to_python(self, data):
+        # Причину отказа оставляет StreamingImageUploadHandler.
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise ValidationError(error, code='upload_rejected')
+        # Pillow не декодирует файл в процессе запроса: ImageField.to_python
+        # пропускается, проверка идёт в песочнице с лимитами CPU и памяти.
+        upload = forms.FileField.to_python(self, data)
+        if upload is None:
+            return None
+        try:
+            meta = inspect_upload(upload)
+        except ImageRejected as error:
+            raise ValidationError(str(error), code='invalid_image')
+        upload.image_meta = meta
+        upload.content_type = Image.MIME.get(meta.format)
+        return upload
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ['title', 'text', 'pub_date', 'location', 'category',
                   'is_published', 'image']
+        field_classes = {
+            'image': StreamedImageField,
+        }
         widgets = {
             'pub_date': forms.DateTimeInput(attrs={
                 'type': 'datetime-local',
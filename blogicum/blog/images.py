@@ -0,0 +1,239 @@
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import ImageJob, PostImage
+from .sandbox import (
+    EXIF_ORIENTATION, ROTATED_ORIENTATIONS, render_placeholder,
+)
+from .sharding import shard_aliases
+
+
+def render_card(path, size, quality):
+    # Выполняется в дочернем процессе: только Pillow, без обращений к БД.
+    with Image.open(path) as image:
+        image.draft('RGB', size)
+        image.load()
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(
+            buffer, 'JPEG', quality=quality, optimize=True, progressive=True
+        )
+    return buffer.getvalue()
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                     prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def render_webp(source_path, target_path, quality):
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if 'transparency' in image.info else 'RGB'
+            )
+        buffer = BytesIO()
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    data = buffer.getvalue()
+    if len(data) >= os.path.getsize(source_path):
+        # Пустой файл помечает, что WebP не меньше оригинала: при
+        # следующих запросах отдаётся оригинал без повторного кодирования.
+        data = b''
+    write_atomic(target_path, data)
+    return len(data)
+
+
+def describe_image(file):
+    """Возвращает размеры изображения и размытую заглушку для карточки.
+
+    Декодирует файл в текущем процессе: подходит для уже сохранённых
+    изображений (backfill_image_info), а не для загрузок, которые
+    описывает песочница.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION, 1) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+        size = settings.BLOG_IMAGE_PLACEHOLDER_SIZE
+        # draft() просит JPEG-декодер сразу уменьшить картинку.
+        image.draft('RGB', (size, size))
+        placeholder = render_placeholder(image, size)
+    file.seek(0)
+    return {'width': width, 'height': height, 'placeholder': placeholder}
+
+
+def store_image_info(post, info):
+    """Сохраняет размеры и заглушку, полученные при проверке загрузки."""
+    # Данные изображения лежат в той же базе (шарде), что и публикация.
+    return PostImage.objects.using(post._state.db).update_or_create(
+        post=post,
+        defaults={'source': post.image.name, 'card': '', **info},
+    )[0]
+
+
+def card_name(image_name):
+    return f'{Path(image_name).stem}_card.jpg'
+
+
+def enqueue_image_job(post):
+    if not post.image:
+        return None
+    return ImageJob.objects.using(post._state.db).create(
+        post=post, image_name=post.image.name
+    )
+
+
+def claim_jobs(limit):
+    jobs = []
+    for alias in shard_aliases():
+        pending = (
+            ImageJob.objects.using(alias)
+            .filter(status=ImageJob.Status.PENDING)
+            .select_related('post')
+            .order_by('pk')[:limit - len(jobs)]
+        )
+        for job in pending:
+            claimed = ImageJob.objects.using(alias).filter(
+                pk=job.pk, status=ImageJob.Status.PENDING
+            ).update(
+                status=ImageJob.Status.RUNNING,
+                claimed_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                job.attempts += 1
+                jobs.append(job)
+        if len(jobs) >= limit:
+            break
+    return jobs
+
+
+def requeue_stale_jobs(timeout):
+    """Возвращает в очередь задания, взятые дольше timeout секунд назад.
+
+    Такие задания остались от убитого или упавшего обработчика. Задание,
+    исчерпавшее BLOG_IMAGE_JOB_ATTEMPTS попыток, помечается ошибкой,
+    чтобы изображение, роняющее обработчик, не крутилось в очереди вечно.
+    """
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    requeued = 0
+    for alias in shard_aliases():
+        stale = ImageJob.objects.using(alias).filter(
+            Q(claimed_at__lt=deadline) | Q(claimed_at__isnull=True),
+            status=ImageJob.Status.RUNNING,
+        )
+        requeued += stale.filter(
+            attempts__lt=settings.BLOG_IMAGE_JOB_ATTEMPTS
+        ).update(status=ImageJob.Status.PENDING)
+        stale.update(
+            status=ImageJob.Status.FAILED,
+            error='Обработка прервана слишком много раз.',
+            finished_at=timezone.now(),
+        )
+    return requeued
+
+
+def release_job(job, error):
+    """Возвращает задание в очередь, если попытки ещё остались."""
+    if job.attempts < settings.BLOG_IMAGE_JOB_ATTEMPTS:
+        job.status = ImageJob.Status.PENDING
+        job.save(update_fields=['status'])
+    else:
+        finish_job(job, ImageJob.Status.FAILED, error)
+
+
+def finish_job(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+
+
+def store_card(job, data):
+    post = job.post
+    post.refresh_from_db(fields=['image'])
+    if post.image.name != job.image_name:
+        # Изображение успели заменить, превью для него уже не нужно.
+        finish_job(job, ImageJob.Status.DONE, 'Изображение заменено.')
+        return
+    meta = PostImage(post=post, source=job.image_name)
+    meta.card.save(card_name(job.image_name), ContentFile(data), save=False)
+    with transaction.atomic(using=post._state.db):
+        PostImage.objects.using(post._state.db).update_or_create(
+            post=post,
+            defaults={'source': job.image_name, 'card': meta.card.name},
+        )
+        finish_job(job, ImageJob.Status.DONE)
+
+
+def submit_jobs(executor, jobs):
+    """Отправляет задания в пул; возвращает (задания с futures, сломан ли)."""
+    futures = []
+    for index, job in enumerate(jobs):
+        if job.post.image.name != job.image_name:
+            finish_job(job, ImageJob.Status.DONE, 'Изображение заменено.')
+            continue
+        try:
+            future = executor.submit(
+                render_card,
+                job.post.image.path,
+                tuple(settings.BLOG_IMAGE_CARD_SIZE),
+                settings.BLOG_IMAGE_QUALITY,
+            )
+        except BrokenProcessPool as error:
+            for rest in jobs[index:]:
+                release_job(rest, str(error))
+            return futures, True
+        futures.append((job, future))
+    return futures, False
+
+
+def process_jobs(executor, batch_size):
+    """Обрабатывает пачку заданий; возвращает (взято, обработано).
+
+    Если процесс пула упал, задания пачки возвращаются в очередь, а
+    BrokenProcessPool выбрасывается дальше: пул нужно создать заново.
+    """
+    jobs = claim_jobs(batch_size)
+    futures, broken = submit_jobs(executor, jobs)
+    processed = 0
+    for job, future in futures:
+        try:
+            data = future.result()
+        except BrokenProcessPool as error:
+            # Упал не обязательно процесс этого задания.
+            release_job(job, str(error))
+            broken = True
+            continue
+        except Exception as error:
+            finish_job(job, ImageJob.Status.FAILED, str(error))
+            continue
+        store_card(job, data)
+        processed += 1
+    if broken:
+        raise BrokenProcessPool('Процесс обработки изображений упал.')
+    return len(jobs), processed
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from blog.db import retry_on_lock
+from blog.models import ArchivedComment, ArchivedPost, Comment, Post
+from blog.sharding import shard_aliases
+
+POST_FIELDS = (
+    'id', 'title', 'text', 'pub_date', 'author_id', 'location_id',
+    'category_id', 'is_published', 'created_at', 'image',
+)
+COMMENT_FIELDS = ('id', 'text', 'post_id', 'author_id', 'created_at')
+
+
+def copy_rows(source, model, fields):
+    return [
+        model(**{field: getattr(obj, field) for field in fields})
+        for obj in source
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые публикации с комментариями в архивные таблицы '
+        'пачками в коротких транзакциях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.BLOG_ARCHIVE_AFTER_DAYS,
+            help='Архивировать публикации старше указанного числа дней.')
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Сколько публикаций переносить одной транзакцией.')
+        parser.add_argument(
+            '--pause', type=float, default=settings.BLOG_DELETE_PAUSE,
+            help='Пауза между пачками в секундах.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько публикаций будет перенесено.')
+
+    def handle(self, *args, **options):
+        if connections['default'].in_atomic_block:
+            raise CommandError(
+                'Архивирование нельзя запускать внутри транзакции.'
+            )
+        self.options = options
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        started = time.monotonic()
+        posts = comments = 0
+        for alias in shard_aliases():
+            old = Post.objects.using(alias).filter(pub_date__lt=cutoff)
+            if options['dry_run']:
+                posts += old.count()
+                continue
+            while True:
+                batch = list(old.order_by('pk')[:options['batch_size']])
+                if not batch:
+                    break
+                comments += retry_on_lock(self.archive, batch, alias)
+                posts += len(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{alias}: перенесено {posts}')
+                time.sleep(options['pause'])
+        action = 'будет перенесено' if options['dry_run'] else 'перенесено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Публикации старше {cutoff:%Y-%m-%d}: {action} {posts}, '
+            f'комментариев: {comments}. {time.monotonic() - started:.1f} с'
+        ))
+
+    def archive(self, batch, alias):
+        pks = [post.pk for post in batch]
+        batch_size = self.options['batch_size']
+        with transaction.atomic(using=alias):
+            # Повтор после сбоя находит уже скопированные строки.
+            ArchivedPost.objects.using(alias).bulk_create(
+                copy_rows(batch, ArchivedPost, POST_FIELDS),
+                batch_size=batch_size, ignore_conflicts=True,
+            )
+            comments = copy_rows(
+                Comment.objects.using(alias).filter(post_id__in=pks),
+                ArchivedComment, COMMENT_FIELDS,
+            )
+            ArchivedComment.objects.using(alias).bulk_create(
+                comments, batch_size=batch_size, ignore_conflicts=True,
+            )
+            # Вместе с публикациями удаляются их комментарии, данные
+            # изображений и задания обработки.
+            Post.objects.using(alias).filter(pk__in=pks).delete()
+        return len(comments)
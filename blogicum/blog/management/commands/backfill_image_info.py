@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.images import describe_image
+from blog.models import Post, PostImage
+from blog.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры и размытые заглушки для изображений публикаций, '
+        'загруженных до их появления.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Сколько публикаций обрабатывать за одну транзакцию.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated = failed = 0
+        for alias in shard_aliases():
+            last_pk = 0
+            while True:
+                posts = list(
+                    Post.objects.using(alias).exclude(image='')
+                    .filter(pk__gt=last_pk)
+                    .select_related('image_meta')
+                    .order_by('pk')[:options['batch_size']]
+                )
+                if not posts:
+                    break
+                last_pk = posts[-1].pk
+                batch, errors = self.describe(posts)
+                self.save_batch(batch, alias)
+                updated += len(batch)
+                failed += errors
+                self.stdout.write(
+                    f'{alias}: обработано до id={last_pk}: {updated}'
+                )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: обновлено {updated}, ошибок {failed}, '
+            f'{elapsed:.1f} с'
+        ))
+
+    def describe(self, posts):
+        batch = []
+        failed = 0
+        for post in posts:
+            info = post.image_info
+            if info and info.width and info.placeholder:
+                continue
+            try:
+                with post.image.open('rb') as file:
+                    batch.append((post, describe_image(file)))
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{post.image.name}: {error}')
+        return batch, failed
+
+    def save_batch(self, batch, alias):
+        to_create, to_update = [], []
+        for post, info in batch:
+            meta = getattr(post, 'image_meta', None)
+            if meta is None:
+                to_create.append(
+                    PostImage(post=post, source=post.image.name, **info)
+                )
+                continue
+            if meta.source != post.image.name:
+                # Превью от другой версии изображения больше не подходит.
+                meta.source = post.image.name
+                meta.card = ''
+            for name, value in info.items():
+                setattr(meta, name, value)
+            to_update.append(meta)
+        with transaction.atomic(using=alias):
+            PostImage.objects.using(alias).bulk_create(to_create)
+            PostImage.objects.using(alias).bulk_update(
+                to_update,
+                ['source', 'card', 'width', 'height', 'placeholder'],
+            )
@@ -0,0 +1,94 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template.defaultfilters import filesizeformat
+
+from blog.backup import BackupError, WalArchiver, backup
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает копию SQLite через online backup API, не останавливая '
+        'запись, или непрерывно архивирует WAL для восстановления на '
+        'момент времени (restore_db).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target',
+            help='Файл копии или, с --continuous, каталог архива.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Алиас базы данных.')
+        parser.add_argument(
+            '--pages', type=int, default=256,
+            help='Сколько страниц копировать за один шаг (только для '
+                 'журнала отката; в режиме WAL копия снимается за один шаг).')
+        parser.add_argument(
+            '--sleep', type=float, default=0.01,
+            help='Пауза между шагами в секундах.')
+        parser.add_argument(
+            '--max-restarts', type=int, default=20,
+            help='Сколько раз копированию можно начаться заново из-за '
+                 'записи в базу, прежде чем сдаться.')
+        parser.add_argument(
+            '--continuous', action='store_true',
+            help='Снять базовую копию и затем архивировать WAL.')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Как часто архивировать новые транзакции, в секундах.')
+        parser.add_argument(
+            '--checkpoint-interval', type=float, default=60.0,
+            help='Как часто отпускать WAL для переноса в базу, в секундах.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        if options['continuous']:
+            self.archive(connection.settings_dict['NAME'], options)
+            return
+        if connection.in_atomic_block:
+            # Шаг backup API ждёт, пока источник не завершит запись.
+            raise CommandError('Копию нельзя снимать внутри транзакции.')
+        started = time.monotonic()
+        connection.ensure_connection()
+        try:
+            backup(connection.connection, options['target'],
+                   pages=options['pages'], sleep=options['sleep'],
+                   max_restarts=options['max_restarts'])
+        except BackupError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f'Копия {options["target"]} '
+            f'({filesizeformat(os.path.getsize(options["target"]))}) '
+            f'снята за {time.monotonic() - started:.1f} с'
+        ))
+
+    def archive(self, db_path, options):
+        archiver = WalArchiver(db_path, options['target'])
+        try:
+            if archiver.journal_mode() != 'wal':
+                raise CommandError(
+                    'Архивирование WAL требует journal_mode=WAL '
+                    '(профиль SQLite production).'
+                )
+            archiver.start(pages=options['pages'], sleep=options['sleep'])
+            self.stdout.write(f'Базовая копия: {archiver.run_dir}')
+            checkpointed = time.monotonic()
+            while True:
+                time.sleep(options['interval'])
+                if (time.monotonic() - checkpointed
+                        >= options['checkpoint_interval']):
+                    frames = archiver.checkpoint()
+                    checkpointed = time.monotonic()
+                else:
+                    frames = archiver.poll()
+                if frames:
+                    self.stdout.write(f'Архивировано кадров WAL: {frames}')
+        except KeyboardInterrupt:
+            archiver.poll()
+        finally:
+            archiver.close()
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import forms as auth_forms
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.forms import modelform_factory
+from django.template import Context, Template
+from django.template.defaultfilters import filesizeformat
+
+from blog.css import html_classes, purge_css
+from blog.forms import CommentCreateForm, PostForm
+from blog.views import UserEditView
+
+BOOTSTRAP_TAG_RE = re.compile(r'{%\s*bootstrap_button\b.*?%}', re.S)
+
+
+def sample_forms():
+    user = get_user_model()(username='sample')
+    user_form = modelform_factory(
+        get_user_model(), fields=UserEditView.fields
+    )
+    form_classes = [
+        PostForm, CommentCreateForm, user_form,
+        auth_forms.UserCreationForm, auth_forms.PasswordResetForm,
+    ]
+    for form_class in form_classes:
+        yield form_class()
+        yield form_class(data={})
+    for form_class in (auth_forms.SetPasswordForm,
+                       auth_forms.PasswordChangeForm):
+        yield form_class(user)
+        yield form_class(user, data={})
+    yield auth_forms.AuthenticationForm()
+    yield auth_forms.AuthenticationForm(data={})
+
+
+def rendered_classes(templates):
+    """Классы, которые добавляет django_bootstrap5 при отрисовке."""
+    classes = set()
+    form_template = Template(
+        '{% load django_bootstrap5 %}{% bootstrap_form form %}'
+    )
+    for form in sample_forms():
+        # Для разметки варианты выбора не нужны, а сборке не нужна БД.
+        for field in form.fields.values():
+            if hasattr(field, 'queryset'):
+                field.queryset = field.queryset.none()
+        # Ошибки связанных форм дают классы is-invalid и invalid-feedback.
+        form.is_valid()
+        classes |= html_classes(form_template.render(Context({'form': form})))
+    for text in templates:
+        for tag in BOOTSTRAP_TAG_RE.findall(text):
+            html = Template('{% load django_bootstrap5 %}' + tag).render(
+                Context()
+            )
+            classes |= html_classes(html)
+    return classes
+
+
+def size_report(label, before, after):
+    saved = 100 - after * 100 // max(before, 1)
+    return (f'{label}: {filesizeformat(before)} → {filesizeformat(after)} '
+            f'(−{saved}%)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает из CSS Bootstrap только правила для классов, которые '
+        'встречаются в шаблонах и формах django_bootstrap5.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', default='css/bootstrap.min.css',
+            help='Исходный CSS относительно каталога статики.')
+        parser.add_argument(
+            '--safelist', action='append', default=[],
+            help='Класс, который нужно сохранить; можно указать несколько '
+                 'раз.')
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+        source = static_dir / options['source']
+        templates = [
+            path.read_text(encoding='utf-8')
+            for path in sorted(static_dir.rglob('*.html'))
+        ]
+        used = set(settings.BLOG_CSS_SAFELIST) | set(options['safelist'])
+        for text in templates:
+            used |= html_classes(text)
+        used |= rendered_classes(templates)
+
+        css = source.read_bytes()
+        purged = purge_css(css.decode('utf-8'), used).encode('utf-8')
+        digest = hashlib.md5(purged).hexdigest()[:12]
+        target = source.with_name(f'{source.stem}.purged.{digest}.css')
+        for old in source.parent.glob(f'{source.stem}.purged.*.css'):
+            if old != target:
+                old.unlink()
+        target.write_bytes(purged)
+
+        pointer = Path(settings.BLOG_PURGED_CSS_MANIFEST)
+        mapping = {}
+        if pointer.exists():
+            mapping = json.loads(pointer.read_text(encoding='utf-8'))
+        mapping[options['source']] = (
+            target.relative_to(static_dir).as_posix()
+        )
+        pointer.write_text(
+            json.dumps(mapping, indent=2, sort_keys=True) + '\n',
+            encoding='utf-8',
+        )
+
+        self.stdout.write(f'Классов в шаблонах: {len(used)}')
+        self.stdout.write(size_report(
+            target.relative_to(static_dir).as_posix(), len(css), len(purged)
+        ))
+        self.stdout.write(size_report(
+            'gzip', len(gzip.compress(css)), len(gzip.compress(purged))
+        ))
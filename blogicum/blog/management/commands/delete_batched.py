@@ -0,0 +1,64 @@
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.models import Post
+from blog.services import delete_in_batches
+from blog.sharding import post_shard
+
+MODELS = {
+    'user': settings.AUTH_USER_MODEL,
+    'post': 'blog.Post',
+    'category': 'blog.Category',
+    'location': 'blog.Location',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет объекты вместе со связанными строками пачками '
+        'в коротких транзакциях, не останавливая работу сайта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(MODELS))
+        parser.add_argument('pks', nargs='+', type=int, metavar='pk')
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Сколько строк удалять или отвязывать одной транзакцией.')
+        parser.add_argument(
+            '--pause', type=float,
+            help='Пауза между пачками в секундах.')
+
+    def handle(self, *args, **options):
+        if connections['default'].in_atomic_block:
+            raise CommandError(
+                'Удаление пачками нельзя запускать внутри транзакции.'
+            )
+        self.verbosity = options['verbosity']
+        model = apps.get_model(MODELS[options['model']])
+        started = time.monotonic()
+        for pk in options['pks']:
+            try:
+                obj = model._base_manager.using(
+                    post_shard(pk) if model is Post else None
+                ).get(pk=pk)
+            except model.DoesNotExist:
+                raise CommandError(f'{model._meta.label} {pk} не найден.')
+            stats = delete_in_batches(
+                obj, options['batch_size'], options['pause'], self.progress
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.label} {pk} удалён: ' + ', '.join(
+                    f'{action} {label}: {count}'
+                    for (action, label), count in sorted(stats.items())
+                )
+            ))
+        self.stdout.write(f'{time.monotonic() - started:.1f} с')
+
+    def progress(self, action, label, count, total):
+        if self.verbosity:
+            self.stdout.write(f'{action} {label}: +{count} (всего {total})')
@@ -0,0 +1,111 @@
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template.defaultfilters import filesizeformat
+
+from blog.export import (
+    EXPORT_MODELS, export_table, join_fragments, table_aliases,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей и данные блога потоком: JSON Lines по '
+        'файлу на таблицу или один файл в формате db.json.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Каталог для jsonl или файл для json.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'json'), default='jsonl',
+            help='jsonl — строка на объект; json — массив как у dumpdata.')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать выгрузку gzip.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать одним запросом.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Выгружать таблицы параллельно в N процессах.')
+        parser.add_argument(
+            '--database',
+            help='Выгрузить все таблицы из одной базы. По умолчанию '
+                 'публикации и комментарии собираются со всех шардов '
+                 'BLOG_SHARDS.')
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            choices=EXPORT_MODELS,
+            help='Выгрузить только эту модель; можно указать несколько '
+                 'раз.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        labels = options['models'] or EXPORT_MODELS
+        started = time.monotonic()
+        if options['format'] == 'jsonl':
+            os.makedirs(options['output'], exist_ok=True)
+            paths = [
+                os.path.join(options['output'], self.filename(label))
+                for label in labels
+            ]
+            results = self.export(labels, paths)
+        else:
+            directory = os.path.dirname(os.path.abspath(options['output']))
+            with tempfile.TemporaryDirectory(dir=directory) as temp:
+                paths = [
+                    os.path.join(temp, self.filename(label))
+                    for label in labels
+                ]
+                results = self.export(labels, paths)
+                join_fragments(
+                    paths, [count for _, count, _ in results],
+                    options['output'], options['gzip'],
+                )
+        self.report(results, time.monotonic() - started)
+
+    def filename(self, label):
+        suffix = '.gz' if self.options['gzip'] else ''
+        return f'{label}.{self.options["format"]}{suffix}'
+
+    def export(self, labels, paths):
+        options = self.options
+        if options['workers'] < 1:
+            raise CommandError('--workers должно быть не меньше 1.')
+        arguments = [
+            (label, path, options['format'], options['gzip'],
+             options['chunk_size'],
+             table_aliases(apps.get_model(label), options['database']))
+            for label, path in zip(labels, paths)
+        ]
+        if options['workers'] == 1:
+            return [export_table(*args) for args in arguments]
+        # Дочерние процессы не должны наследовать открытые соединения с БД.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [
+                executor.submit(export_table, *args) for args in arguments
+            ]
+            return [future.result() for future in futures]
+
+    def report(self, results, elapsed):
+        for label, count, seconds in results:
+            self.stdout.write(
+                f'{label}: {count} строк за {seconds:.2f} с '
+                f'({count / max(seconds, 1e-6):.0f} строк/с)'
+            )
+        # ru_maxrss в Linux измеряется в килобайтах; в параллельном режиме
+        # это память основного процесса, а не процессов выгрузки.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {sum(count for _, count, _ in results)} '
+            f'за {elapsed:.2f} с, пиковая память {filesizeformat(peak)}'
+        ))
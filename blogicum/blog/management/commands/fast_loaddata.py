@@ -0,0 +1,128 @@
+import itertools
+import resource
+import time
+
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.template.defaultfilters import filesizeformat
+
+from blog.bulkload import BulkLoader, JSONArrayReader, open_fixture
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает фикстуру в формате db.json (dumpdata --format json), '
+        'разбирая массив потоком и вставляя объекты пачками bulk_create. '
+        'Внешние ключи должны ссылаться на первичные ключи: natural keys '
+        'разрешаются запросом к базе и видят только уже вставленные '
+        'пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'fixture', help='Путь к .json или .json.gz.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Алиас базы данных.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов одной модели вставлять за запрос.')
+        parser.add_argument(
+            '--commit-every', type=int,
+            help='Фиксировать транзакцию каждые N объектов; по умолчанию '
+                 'вся фикстура загружается одной транзакцией. Индексы '
+                 'в этом режиме не удаляются.')
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать объекты, чей ключ уже есть в базе.')
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Не удалять индексы на время загрузки.')
+        parser.add_argument(
+            '--ignorenonexistent', '-i', action='store_true',
+            help='Пропускать поля и модели, которых нет в проекте.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        # С --commit-every удаление индексов зафиксировалось бы первой же
+        # пачкой, и прерванная загрузка оставила бы таблицы без них.
+        loader = BulkLoader(
+            connection, options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'],
+            defer_indexes=not (
+                options['keep_indexes'] or options['commit_every']
+            ),
+        )
+        started = time.monotonic()
+        # Как и loaddata, проверка внешних ключей откладывается до конца
+        # загрузки: порядок моделей в фикстуре не важен.
+        with connection.constraint_checks_disabled():
+            try:
+                self.load(loader, options)
+            except IntegrityError as error:
+                raise CommandError(f'Нарушены ограничения: {error}')
+            except (DatabaseError, ValueError) as error:
+                raise CommandError(f'Фикстура не загружена: {error}')
+            finally:
+                loader.restore_indexes()
+        self.reset_sequences(connection, loader.models)
+        self.report(loader, time.monotonic() - started)
+
+    def load(self, loader, options):
+        using = options['database']
+        with open_fixture(options['fixture']) as file:
+            objects = serializers.deserialize(
+                'python', JSONArrayReader(file), using=using,
+                ignorenonexistent=options['ignorenonexistent'],
+            )
+            if not options['commit_every']:
+                # Проверка внутри транзакции: при нарушении внешних
+                # ключей загрузка откатывается целиком.
+                with transaction.atomic(using=using):
+                    self.load_chunk(loader, objects)
+                    self.check_foreign_keys(loader)
+                return
+            for chunk in chunked(objects, options['commit_every']):
+                with transaction.atomic(using=using):
+                    self.load_chunk(loader, chunk)
+        self.check_foreign_keys(loader)
+
+    def load_chunk(self, loader, objects):
+        for deserialized in objects:
+            loader.add(deserialized)
+        loader.flush_all()
+
+    def check_foreign_keys(self, loader):
+        loader.connection.check_constraints(
+            table_names=[model._meta.db_table for model in loader.models]
+        )
+
+    def reset_sequences(self, connection, models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def report(self, loader, elapsed):
+        total = sum(loader.counts.values())
+        for label, count in sorted(loader.counts.items()):
+            self.stdout.write(f'{label}: {count}')
+        # ru_maxrss в Linux измеряется в килобайтах.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {total} за {elapsed:.2f} с '
+            f'({total / max(elapsed, 1e-6):.0f} объектов/с), '
+            f'пиковая память процесса {filesizeformat(peak)}'
+        ))
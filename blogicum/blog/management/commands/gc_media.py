@@ -0,0 +1,161 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.template.defaultfilters import filesizeformat
+
+from blog.media import variant_source
+from blog.models import ArchivedPost, MediaBlob, Post, PostImage
+from blog.sharding import shard_aliases
+
+
+def iter_files(root, directory):
+    """Обходит каталог потоком, не собирая список файлов в памяти."""
+    stack = [os.path.join(root, directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root)
+                    yield name.replace(os.sep, '/'), entry.stat()
+
+
+def referenced(names):
+    found = set()
+    for alias in shard_aliases():
+        for model in (Post, ArchivedPost):
+            found.update(
+                model.objects.using(alias).filter(image__in=names)
+                .values_list('image', flat=True)
+            )
+        found.update(
+            PostImage.objects.using(alias).filter(card__in=names)
+            .values_list('card', flat=True)
+        )
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет или переносит в карантин медиафайлы, на которые не '
+        'ссылается ни одна публикация.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', action='append', dest='dirs',
+            help='Каталог внутри MEDIA_ROOT; можно указать несколько раз.')
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Не трогать файлы моложе указанного числа часов.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько имён проверять одним запросом к БД.')
+        parser.add_argument(
+            '--quarantine',
+            help='Переносить найденные файлы в этот каталог, а не удалять.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, какие файлы будут удалены.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.root = str(settings.MEDIA_ROOT)
+        self.stats = dict(scanned=0, scanned_bytes=0, orphans=0,
+                          orphan_bytes=0)
+        self.deadline = time.time() - options['grace_hours'] * 3600
+        started = time.monotonic()
+        dirs = options['dirs'] or [
+            'posts_images', settings.BLOG_IMAGE_CACHE_DIR
+        ]
+        for directory in dirs:
+            chunk = []
+            for name, stat in iter_files(self.root, directory):
+                self.stats['scanned'] += 1
+                self.stats['scanned_bytes'] += stat.st_size
+                if stat.st_mtime > self.deadline:
+                    continue
+                chunk.append((name, stat))
+                if len(chunk) >= options['chunk_size']:
+                    self.collect(chunk)
+                    chunk = []
+            self.collect(chunk)
+        self.report(time.monotonic() - started)
+
+    def collect(self, chunk):
+        if not chunk:
+            return
+        sources = {name: variant_source(name) or name for name, _ in chunk}
+        alive = referenced(list(set(sources.values())))
+        orphans = [
+            (name, stat) for name, stat in chunk
+            if sources[name] not in alive
+        ]
+        for name, stat in orphans:
+            if self.options['dry_run']:
+                self.stdout.write(f'{name} ({filesizeformat(stat.st_size)})')
+            elif not self.remove(name, sources[name]):
+                continue
+            self.stats['orphans'] += 1
+            self.stats['orphan_bytes'] += stat.st_size
+
+    def remove(self, name, source):
+        """Удаляет файл, если он всё ещё ничей; возвращает, удалён ли.
+
+        Проверка и удаление идут в одной транзакции, которая сначала
+        берёт блокировку записи: ContentAddressedStorage.save() того же
+        содержимого либо уже закончилась и обновила mtime файла и
+        MediaBlob.saved_at, либо дождётся удаления и запишет файл заново.
+        """
+        path = os.path.join(self.root, name)
+        with transaction.atomic():
+            blob = MediaBlob.objects.filter(name=name)
+            # Пустое обновление — только ради блокировки записи.
+            blob.update(saved_at=F('saved_at'))
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                return False
+            saved_at = blob.values_list('saved_at', flat=True).first()
+            if (
+                mtime > self.deadline
+                or (saved_at and saved_at.timestamp() > self.deadline)
+                or referenced([source])
+            ):
+                return False
+            blob.delete()
+            self.discard(path, name)
+        return True
+
+    def discard(self, path, name):
+        quarantine = self.options['quarantine']
+        if quarantine:
+            target = os.path.join(quarantine, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+        else:
+            os.remove(path)
+
+    def report(self, elapsed):
+        stats = self.stats
+        action = 'будет удалено' if self.options['dry_run'] else 'удалено'
+        if self.options['quarantine'] and not self.options['dry_run']:
+            action = 'перенесено в карантин'
+        self.stdout.write(self.style.SUCCESS(
+            f'Просмотрено файлов: {stats["scanned"]} '
+            f'({filesizeformat(stats["scanned_bytes"])}), '
+            f'{action}: {stats["orphans"]} '
+            f'({filesizeformat(stats["orphan_bytes"])}). '
+            f'{elapsed:.1f} с, '
+            f'{stats["scanned"] / max(elapsed, 1e-6):.0f} файлов/с'
+        ))
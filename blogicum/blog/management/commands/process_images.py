@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.images import process_jobs, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь изображений публикаций в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.BLOG_IMAGE_WORKERS,
+            help='Количество процессов обработки.')
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Сколько заданий забирать из очереди за раз.')
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать текущую очередь и завершиться.')
+
+    def handle(self, *args, **options):
+        # Дочерние процессы не должны наследовать открытые соединения с БД.
+        connections.close_all()
+        while True:
+            try:
+                with ProcessPoolExecutor(
+                        max_workers=options['workers']) as executor:
+                    return self.run(executor, options)
+            except BrokenProcessPool as error:
+                self.stderr.write(f'{error} Пул процессов создан заново.')
+
+    def run(self, executor, options):
+        while True:
+            started = time.monotonic()
+            requeued = requeue_stale_jobs(settings.BLOG_IMAGE_JOB_TIMEOUT)
+            if requeued:
+                self.stdout.write(f'Возвращено в очередь: {requeued}')
+            claimed, processed = process_jobs(
+                executor, options['batch_size']
+            )
+            if claimed:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Обработано {processed} из {claimed} '
+                    f'за {elapsed:.2f} с'
+                )
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.db import retry_on_lock
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет просроченные строки django_session пачками в коротких '
+        'транзакциях. Заменяет clearsessions для blog.sessions.cached_db.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BLOG_DELETE_BATCH_SIZE,
+            help='Сколько строк удалять одной транзакцией.')
+        parser.add_argument(
+            '--pause', type=float, default=settings.BLOG_DELETE_PAUSE,
+            help='Пауза между пачками в секундах.')
+
+    def handle(self, *args, **options):
+        # С отложенной записью expire_date в БД отстаёт от кеша не больше
+        # чем на SESSION_WRITE_BEHIND_SECONDS: более свежие строки могут
+        # принадлежать живым сессиям.
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.SESSION_WRITE_BEHIND_SECONDS
+        )
+        expired = Session.objects.filter(expire_date__lt=cutoff)
+        started = time.monotonic()
+        total = 0
+        while True:
+            keys = list(expired.values_list('pk', flat=True)[
+                :options['batch_size']
+            ])
+            if not keys:
+                break
+            retry_on_lock(self.delete, keys)
+            total += len(keys)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Удалено сессий: {total}')
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено просроченных сессий: {total}. '
+            f'{time.monotonic() - started:.1f} с'
+        ))
+
+    def delete(self, keys):
+        with transaction.atomic():
+            Session.objects.filter(pk__in=keys).delete()
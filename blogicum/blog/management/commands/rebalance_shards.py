@@ -0,0 +1,146 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from blog.db import retry_on_lock
+from blog.models import (
+    ArchivedComment, ArchivedPost, Comment, ImageJob, Post, PostImage,
+)
+from blog.services import BatchedDeletion
+from blog.sharding import (
+    mirror_aliases, reference_models, shard_aliases, shard_for_author,
+)
+
+# Публикации автора и строки, ссылающиеся на них полем post. Порядок
+# вставки: сначала публикации, затем зависимые строки.
+MOVED_MODELS = (
+    (Post, (PostImage, Comment, ImageJob)),
+    (ArchivedPost, (ArchivedComment,)),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует справочные таблицы на шарды и переносит публикации '
+        'с комментариями в шард их автора по текущему BLOG_SHARDS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.BLOG_DELETE_BATCH_SIZE,
+            help='Сколько строк переносить одной транзакцией.')
+        parser.add_argument(
+            '--pause', type=float, default=settings.BLOG_DELETE_PAUSE,
+            help='Пауза между пачками в секундах.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько публикаций будет перенесено.')
+
+    def handle(self, *args, **options):
+        if len(shard_aliases()) < 2:
+            raise CommandError('Шарды не настроены: задайте BLOGICUM_SHARDS.')
+        if connections['default'].in_atomic_block:
+            raise CommandError('Перенос нельзя запускать внутри транзакции.')
+        self.options = options
+        self.deletion = BatchedDeletion(
+            options['batch_size'], options['pause']
+        )
+        self.stats = dict(references=0, authors=0, posts=0, rows=0)
+        started = time.monotonic()
+        if not options['dry_run']:
+            self.mirror_references()
+        for source in shard_aliases():
+            authors = set()
+            for model in (Post, ArchivedPost):
+                authors.update(
+                    model.objects.using(source).order_by()
+                    .values_list('author_id', flat=True).distinct()
+                )
+            for author_id in sorted(authors):
+                target = shard_for_author(author_id)
+                if target != source:
+                    self.move(author_id, source, target)
+        self.report(time.monotonic() - started)
+
+    def mirror_references(self):
+        for model in reference_models():
+            for alias in mirror_aliases():
+                present = set(
+                    model._base_manager.using(alias)
+                    .values_list('pk', flat=True)
+                )
+                missing = [
+                    obj for obj in
+                    model._base_manager.using('default').iterator()
+                    if obj.pk not in present
+                ]
+                model._base_manager.using(alias).bulk_create(
+                    missing, batch_size=self.options['batch_size']
+                )
+                self.stats['references'] += len(missing)
+
+    def move(self, author_id, source, target):
+        posts = Post.objects.using(source).filter(author_id=author_id).count()
+        self.stats['authors'] += 1
+        self.stats['posts'] += posts
+        if self.options['dry_run']:
+            self.stdout.write(
+                f'Автор {author_id}: {posts} публикаций '
+                f'{source} → {target}'
+            )
+            return
+        batch_size = self.options['batch_size']
+        # Пачка публикаций сначала копируется в целевой шард вместе с
+        # зависимыми строками, затем удаляется из исходного через
+        # BatchedDeletion. Каждая пачка — своя короткая транзакция;
+        # прерванный перенос можно повторить, уже скопированные строки
+        # пропускаются.
+        for model, related in MOVED_MODELS:
+            rows = model.objects.using(source).filter(
+                author_id=author_id
+            ).order_by('pk')
+            while True:
+                batch = list(rows[:batch_size])
+                if not batch:
+                    break
+                pks = [obj.pk for obj in batch]
+                retry_on_lock(self.copy, model, batch, target)
+                for related_model in related:
+                    self.copy_related(related_model, pks, source, target)
+                self.deletion.release(model, pks, source)
+                retry_on_lock(self.deletion.apply, model, pks, source, None)
+                self.deletion.wait()
+
+    def copy_related(self, model, post_ids, source, target):
+        rows = model.objects.using(source).filter(
+            post_id__in=post_ids
+        ).order_by('pk')
+        while True:
+            batch = list(rows[:self.options['batch_size']])
+            if not batch:
+                return
+            retry_on_lock(self.copy, model, batch, target)
+            self.stats['rows'] += len(batch)
+            rows = rows.filter(pk__gt=batch[-1].pk)
+            self.deletion.wait()
+
+    def copy(self, model, rows, target):
+        with transaction.atomic(using=target):
+            model.objects.using(target).bulk_create(
+                rows, ignore_conflicts=True
+            )
+
+    def report(self, elapsed):
+        stats = self.stats
+        action = 'будет перенесено' if self.options['dry_run'] else (
+            'перенесено'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Скопировано справочных строк: {stats["references"]}; '
+            f'{action} авторов: {stats["authors"]}, '
+            f'публикаций: {stats["posts"]}, '
+            f'связанных строк: {stats["rows"]}. {elapsed:.1f} с'
+        ))
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.backup import restore
+
+
+class Command(BaseCommand):
+    help = (
+        'Восстанавливает SQLite из копии backup_db или из архива WAL, '
+        'при необходимости на заданный момент времени.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', help='Файл копии или каталог архива WAL.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Алиас базы, файл которой заменяется по умолчанию.')
+        parser.add_argument(
+            '--output',
+            help='Куда записать базу вместо файла из DATABASES.')
+        parser.add_argument(
+            '--until',
+            help='Момент времени в формате ISO 8601 (только для архива).')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перезаписать существующий файл базы.')
+
+    def handle(self, *args, **options):
+        output = options['output'] or str(
+            connections[options['database']].settings_dict['NAME']
+        )
+        if os.path.exists(output) and not options['force']:
+            raise CommandError(
+                f'Файл {output} уже существует; добавьте --force.'
+            )
+        until = None
+        if options['until']:
+            until = parse_datetime(options['until'])
+            if until is None:
+                raise CommandError(f'Неверная дата: {options["until"]}')
+            if timezone.is_naive(until):
+                until = timezone.make_aware(until)
+        # Открытые соединения продолжили бы работать со старым файлом.
+        connections.close_all()
+        try:
+            applied = restore(options['source'], output, until)
+        except FileNotFoundError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f'База восстановлена в {output}; '
+            f'применено сегментов WAL: {applied}.'
+        ))
@@ -0,0 +1,340 @@
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import (
+    http_date, parse_etags, parse_http_date_safe, urlencode,
+)
+from django.views.decorators.http import require_safe
+
+from .images import render_card, render_webp, write_atomic
+from .storage import is_content_addressed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+VARIANT_RE = re.compile(
+    r'^(?:webp/(?P<webp>.+)\.webp|r/\d+x\d+/(?P<resized>.+)\.jpg)$'
+)
+WEBP_SOURCE_TYPES = ('image/jpeg', 'image/png')
+RESIZE_SALT = 'blog.media.resize'
+
+# Ограничивает число одновременных ресайзов и кодирований WebP в процессе:
+# всплеск первых запросов к новым вариантам не должен занять все ядра.
+resize_slots = threading.BoundedSemaphore(
+    settings.BLOG_IMAGE_RESIZE_CONCURRENCY
+)
+
+
+class FileSlice:
+    """Файл, ограниченный диапазоном байтов.
+
+    ``fileno()`` и позиция в файле сохраняются, поэтому WSGI-сервер
+    с ``wsgi.file_wrapper`` (gunicorn) отдаёт диапазон через sendfile,
+    а остальные читают ровно ``length`` байтов.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(path, stat):
+    name = os.path.basename(path)
+    if is_content_addressed(path):
+        return '"%s"' % os.path.splitext(name)[0]
+    return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+
+def parse_range(header, size):
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = min(int(end), size)
+        if not length:
+            return None
+        return size - length, size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def range_applies(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Для If-Range допустимо только строгое сравнение ETag.
+        return not if_range.startswith('W/') and etag in parse_etags(if_range)
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def accel_response(relative_path, full_path):
+    response = HttpResponse()
+    mode = settings.MEDIA_ACCEL_REDIRECT
+    if mode == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(relative_path)
+        )
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = full_path
+    else:
+        raise ValueError(f'Неизвестный режим MEDIA_ACCEL_REDIRECT: {mode}')
+    return response
+
+
+def file_headers(full_path, relative_path, stat, extra_headers=None):
+    if is_content_addressed(relative_path):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    return {
+        'ETag': file_etag(full_path, stat),
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': cache_control,
+        **(extra_headers or {}),
+    }
+
+
+def body_response(request, full_path, relative_path, size, byte_range):
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # Диапазоны и sendfile обрабатывает фронтовой прокси.
+        return accel_response(relative_path, full_path)
+    if request.method == 'HEAD':
+        response = HttpResponse()
+        response['Content-Length'] = size
+        return response
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileSlice(open(full_path, 'rb'), start, length), status=206
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = length
+        return response
+    response = FileResponse(open(full_path, 'rb'))
+    response['Content-Length'] = size
+    return response
+
+
+def serve_file(request, full_path, relative_path, extra_headers=None):
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+
+    headers = file_headers(full_path, relative_path, stat, extra_headers)
+    # Ответ-заготовка нужен, чтобы 304 получил те же ETag и Cache-Control.
+    skeleton = HttpResponse(headers=headers)
+    conditional = get_conditional_response(
+        request, etag=headers['ETag'], last_modified=int(stat.st_mtime),
+        response=skeleton,
+    )
+    if conditional is not skeleton:
+        return conditional
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and range_applies(
+            request, headers['ETag'], stat.st_mtime):
+        byte_range = parse_range(range_header, stat.st_size)
+        if byte_range is None and ',' not in range_header:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    response = body_response(
+        request, full_path, relative_path, stat.st_size, byte_range
+    )
+    content_type, encoding = mimetypes.guess_type(full_path)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def accepts_webp(request):
+    for item in request.META.get('HTTP_ACCEPT', '').split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        if media_type == 'image/webp':
+            return 'q=0' not in params and 'q=0.0' not in params
+    return False
+
+
+def variant_source(name):
+    """Имя исходного файла для производного файла из кеша или None."""
+    prefix = settings.BLOG_IMAGE_CACHE_DIR + '/'
+    if not name.startswith(prefix):
+        return None
+    match = VARIANT_RE.match(name[len(prefix):])
+    if match is None:
+        return None
+    return match['webp'] or match['resized']
+
+
+def webp_candidate(path, full_path):
+    if not settings.BLOG_IMAGE_WEBP:
+        return False
+    if not path.startswith(settings.BLOG_IMAGE_WEBP_DIRS):
+        return False
+    return mimetypes.guess_type(full_path)[0] in WEBP_SOURCE_TYPES
+
+
+def serve_webp(request, path, full_path):
+    variant = posixpath.join(settings.BLOG_IMAGE_CACHE_DIR, 'webp',
+                             path + '.webp')
+    variant_path = safe_join(settings.MEDIA_ROOT, variant)
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    if not os.path.exists(variant_path):
+        try:
+            rendered = render_limited(
+                variant_path, render_webp, full_path, variant_path,
+                settings.BLOG_IMAGE_WEBP_QUALITY,
+            )
+        except OSError:
+            raise Http404('Файл не является изображением')
+        if not rendered:
+            # Слоты заняты: оригинал подходит любому клиенту.
+            return None
+    if not os.path.getsize(variant_path):
+        return None
+    headers = {'Vary': 'Accept', **variant_headers(path, 'webp')}
+    return serve_file(request, variant_path, variant, headers)
+
+
+def variant_headers(path, suffix):
+    headers = {}
+    if is_content_addressed(path):
+        stem = posixpath.splitext(posixpath.basename(path))[0]
+        headers['ETag'] = f'"{stem}-{suffix}"'
+        headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return headers
+
+
+def resize_signature(size, path):
+    return signing.Signer(salt=RESIZE_SALT).signature(f'{size}/{path}')
+
+
+def resized_url(name, width, height):
+    """Подписанный адрес копии изображения, вписанной в width×height."""
+    size = f'{width}x{height}'
+    url = reverse('media_resized', kwargs={
+        'width': width, 'height': height, 'path': name,
+    })
+    return f'{url}?{urlencode({"s": resize_signature(size, name)})}'
+
+
+def render_limited(variant_path, render, *args):
+    """Строит производный файл, заняв слот resize_slots.
+
+    Возвращает False, если слот не освободился за BLOG_IMAGE_RESIZE_WAIT.
+    Пока запрос ждал слота, файл мог построить соседний поток: тогда
+    повторно он не кодируется.
+    """
+    if not resize_slots.acquire(timeout=settings.BLOG_IMAGE_RESIZE_WAIT):
+        return False
+    try:
+        if not os.path.exists(variant_path):
+            render(*args)
+    finally:
+        resize_slots.release()
+    return True
+
+
+def write_card(full_path, variant_path, size):
+    data = render_card(full_path, size, settings.BLOG_IMAGE_QUALITY)
+    write_atomic(variant_path, data)
+
+
+@require_safe
+def serve_resized(request, width, height, path):
+    width, height = int(width), int(height)
+    size = f'{width}x{height}'
+    max_size = settings.BLOG_IMAGE_RESIZE_MAX_SIZE
+    if not (0 < width <= max_size and 0 < height <= max_size):
+        raise Http404('Недопустимый размер')
+    if not constant_time_compare(
+            request.GET.get('s', ''), resize_signature(size, path)):
+        raise Http404('Неверная подпись')
+    variant = posixpath.join(settings.BLOG_IMAGE_CACHE_DIR, 'r', size,
+                             path + '.jpg')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        variant_path = safe_join(settings.MEDIA_ROOT, variant)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.exists(variant_path):
+        if not os.path.isfile(full_path):
+            raise Http404('Файл не найден')
+        try:
+            rendered = render_limited(variant_path, write_card, full_path,
+                                      variant_path, (width, height))
+        except OSError:
+            raise Http404('Файл не является изображением')
+        if not rendered:
+            response = HttpResponse(
+                'Изображение ещё готовится, повторите запрос позже.',
+                status=503, content_type='text/plain; charset=utf-8',
+            )
+            response['Retry-After'] = settings.BLOG_IMAGE_RESIZE_RETRY_AFTER
+            return response
+    return serve_file(request, variant_path, variant,
+                      variant_headers(path, size))
+
+
+@require_safe
+def serve(request, path, document_root=None):
+    document_root = document_root or settings.MEDIA_ROOT
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not webp_candidate(path, full_path):
+        return serve_file(request, full_path, path)
+    if accepts_webp(request):
+        response = serve_webp(request, path, full_path)
+        if response is not None:
+            return response
+    # Общие кеши должны хранить WebP и оригинал как разные ответы.
+    return serve_file(request, full_path, path, {'Vary': 'Accept'})
@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .db import write_transaction
+from .routers import use_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class WriteCoordinationMiddleware:
+    """Выполняет изменяющие запросы в одной транзакции.
+
+    Представление для POST и других небезопасных методов вызывается внутри
+    ``blog.db.write_transaction()``; с ``transaction_mode = 'IMMEDIATE'``
+    блокировка записи берётся в самом начале. Если SQLite занята дольше
+    busy_timeout, после паузы с джиттером повторяется только BEGIN, само
+    представление заново не вызывается. Шаблон ответа отрисовывается уже
+    после транзакции.
+
+    Представления с ``transaction.non_atomic_requests`` сами управляют
+    транзакциями и вызываются как есть: так загрузка изображений не держит
+    блокировку записи, пока принимается и проверяется файл, а записи в
+    шарды BLOG_SHARDS блокируют базу шарда, а не ``default``.
+
+    Стоит после CsrfViewMiddleware: process_view, вернувший ответ,
+    пропускает process_view следующих middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS:
+            return None
+        if DEFAULT_DB_ALIAS in getattr(view_func, '_non_atomic_requests',
+                                       ()):
+            return None
+        with write_transaction():
+            return view_func(request, *view_args, **view_kwargs)
+
+
+class ReplicaPinningMiddleware:
+    """Закрепляет чтения за основной базой после изменяющих запросов.
+
+    Изменяющий запрос целиком читает из ``default`` и записывает в сессию
+    момент, до которого следующие запросы того же пользователя тоже
+    читают из ``default`` (REPLICA_STICKY_SECONDS): реплика могла ещё не
+    получить записанное.
+    """
+
+    session_key = '_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        now = time.time()
+        writing = request.method not in SAFE_METHODS
+        if not writing and request.session.get(self.session_key, 0) <= now:
+            return self.get_response(request)
+        with use_primary():
+            response = self.get_response(request)
+        if writing:
+            request.session[self.session_key] = (
+                now + settings.REPLICA_STICKY_SECONDS
+            )
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток'),
+        ),
+        migrations.AddField(
+            model_name='imagejob',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взято в обработку'),
+        ),
+    ]
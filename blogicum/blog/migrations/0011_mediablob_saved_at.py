@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-19 11:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_imagejob_claim'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='mediablob',
+            name='refcount',
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='saved_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Последнее сохранение'),
+        ),
+    ]
@@ -1,10 +1,52 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 
 User = get_user_model()
 
 
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet моделей, которые при BLOG_SHARDS лежат на шардах.
+
+    Без ``.using()`` база новой строки выбирается по самому экземпляру:
+    роутер находит шард по автору или публикации. Вставки, для которых
+    экземпляра нет, требуют явной базы, иначе строки молча попали бы
+    в ``default``.
+    """
+
+    def needs_shard(self):
+        from .routers import is_sharded
+
+        return self._db is None and is_sharded(self.model)
+
+    def require_shard(self, method):
+        if self.needs_shard():
+            raise ValueError(
+                f'{self.model._meta.label}.objects.{method}() без .using() '
+                'записал бы строки в default, а не в шард.'
+            )
+
+    def create(self, **kwargs):
+        if not self.needs_shard():
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+    def bulk_create(self, *args, **kwargs):
+        self.require_shard('bulk_create')
+        return super().bulk_create(*args, **kwargs)
+
+    def get_or_create(self, *args, **kwargs):
+        self.require_shard('get_or_create')
+        return super().get_or_create(*args, **kwargs)
+
+    def update_or_create(self, *args, **kwargs):
+        self.require_shard('update_or_create')
+        return super().update_or_create(*args, **kwargs)
+
+
 class Category(models.Model):
     title = models.CharField(
         max_length=256,
@@ -104,9 +146,29 @@ class Post(models.Model):
     def username(self):
         return self.author.username
 
+    @property
+    def image_info(self):
+        meta = getattr(self, 'image_meta', None)
+        if self.image and meta and meta.source == self.image.name:
+            return meta
+        return None
+
+    @property
+    def card_image(self):
+        # Пока превью не готово, карточка показывает оригинал.
+        info = self.image_info
+        if info and info.card:
+            return info.card
+        return self.image
+
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(fields=['pub_date'], name='blog_post_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -133,9 +195,225 @@ class Comment(models.Model):
         verbose_name='Добавлено',
         auto_now_add=True)
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text
+
+
+class PostImage(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='image_meta',
+        verbose_name='Пост'
+    )
+    source = models.CharField(
+        max_length=255,
+        verbose_name='Исходный файл',
+        help_text='Изображение публикации, из которого получены данные.')
+    card = models.ImageField(
+        'Превью для ленты',
+        upload_to='posts_images/cards',
+        blank=True)
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Ширина')
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Высота')
+    placeholder = models.TextField(
+        blank=True,
+        verbose_name='Заглушка',
+        help_text='Размытая миниатюра в виде data: URI.')
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'данные изображения'
+        verbose_name_plural = 'Данные изображений'
+
+    def __str__(self):
+        return self.source
+
+
+class ImageJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Обрабатывается'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+        verbose_name='Пост'
+    )
+    image_name = models.CharField(
+        max_length=255,
+        verbose_name='Исходный файл',
+        help_text='Имя изображения на момент постановки в очередь.')
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+        verbose_name='Статус')
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка')
+    created_at = models.DateTimeField(
+        verbose_name='Добавлено',
+        auto_now_add=True)
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершено')
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взято в обработку')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток')
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'обработка изображения'
+        verbose_name_plural = 'Обработка изображений'
+
+    def __str__(self):
+        return self.image_name
+
+
+class MediaBlob(models.Model):
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Имя файла')
+    size = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Размер')
+    created_at = models.DateTimeField(
+        verbose_name='Добавлено',
+        auto_now_add=True)
+    saved_at = models.DateTimeField(
+        verbose_name='Последнее сохранение',
+        default=timezone.now)
+
+    class Meta:
+        verbose_name = 'файл медиа'
+        verbose_name_plural = 'Файлы медиа'
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedPost(models.Model):
+    """Публикация, перенесённая из Post командой archive_posts.
+
+    Сохраняет идентификатор, автора и даты исходной публикации и
+    доступна только для чтения.
+    """
+
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID публикации')
+    title = models.CharField(
+        max_length=256,
+        verbose_name='Заголовок')
+    text = models.TextField(
+        verbose_name='Текст')
+    pub_date = models.DateTimeField(
+        verbose_name='Дата и время публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор публикации'
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Местоположение'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Категория'
+    )
+    is_published = models.BooleanField(
+        default=True,
+        verbose_name='Опубликовано')
+    created_at = models.DateTimeField(
+        verbose_name='Добавлено')
+    image = models.ImageField('Фото', upload_to='posts_images', blank=True)
+    archived_at = models.DateTimeField(
+        verbose_name='Перенесено в архив',
+        auto_now_add=True)
+
+    # Шаблоны публикаций обращаются к этим свойствам Post.
+    image_info = None
+
+    @property
+    def username(self):
+        return self.author.username
+
+    @property
+    def card_image(self):
+        return self.image
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'архивная публикация'
+        verbose_name_plural = 'Архив публикаций'
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID комментария')
+    text = models.TextField(
+        verbose_name='Текст')
+    # Те же имена обращений, что у Comment: comment_set и Count('comment').
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comment_set',
+        related_query_name='comment',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор комментария'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Добавлено')
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'архивный комментарий'
+        verbose_name_plural = 'Архив комментариев'
+
+    def __str__(self):
+        return self.text
@@ -0,0 +1,99 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .sharding import shard_for_author, shard_of
+
+pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Направляет все чтения внутри блока на основную базу."""
+    token = pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        pinned_to_primary.reset(token)
+
+
+def is_sharded(model):
+    return (
+        bool(settings.BLOG_SHARDS)
+        and model._meta.label in settings.BLOG_SHARDED_MODELS
+    )
+
+
+class AuthorShardRouter:
+    """Раскладывает публикации по шардам BLOG_SHARDS по author_id.
+
+    Комментарии, данные изображений и задания обработки лежат в шарде
+    своей публикации, чтобы выборки ленты оставались запросами к одной
+    базе. Чтение без подсказки-экземпляра роутер не выбирает: ленты
+    опрашивают все шарды через ``blog.sharding.scatter_gather``, а
+    страницы одного автора или публикации обращаются к её шарду явно.
+    Запись без экземпляра тоже не выбирается: ``objects.create()`` этих
+    моделей передаёт роутеру сам новый объект, а пакетные вставки
+    ``blog.models.ShardedQuerySet`` требуют явного ``.using()``.
+    """
+
+    def route(self, model, instance, locate):
+        if not is_sharded(model) or instance is None:
+            return None
+        if is_sharded(instance.__class__):
+            return locate(instance)
+        if (isinstance(instance, get_user_model())
+                and model._meta.label == 'blog.Post'):
+            return shard_for_author(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints.get('instance'),
+                          lambda instance: instance._state.db)
+
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints.get('instance'), shard_of)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.BLOG_SHARDS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class PrimaryReplicaRouter:
+    """Чтения моделей из REPLICA_APPS идут на случайную реплику.
+
+    Запись всегда идёт в ``default``. Пока действует ``use_primary()``
+    (изменяющий запрос и короткое окно после него), чтения тоже идут в
+    ``default``: пользователь сразу видит то, что только что записал.
+    Реплики объявляются в DATABASES с ``TEST['MIRROR'] = 'default'``.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or pinned_to_primary.get()
+            or model._meta.app_label not in settings.REPLICA_APPS
+        ):
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django записал бы объект туда, откуда прочёл.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if settings.DATABASES[db].get('TEST', {}).get('MIRROR'):
+            return False
+        return None
@@ -0,0 +1,183 @@
+import base64
+import multiprocessing
+import resource
+import tempfile
+import threading
+import warnings
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageFilter, ImageOps
+
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+class ImageRejected(Exception):
+    pass
+
+
+class ImageMeta(namedtuple('ImageMeta', [
+    'format', 'width', 'height', 'mode', 'orientation', 'placeholder',
+])):
+    def info(self):
+        """Размеры с учётом поворота по EXIF и заглушка для PostImage."""
+        width, height = self.width, self.height
+        if self.orientation in ROTATED_ORIENTATIONS:
+            width, height = height, width
+        return {
+            'width': width,
+            'height': height,
+            'placeholder': self.placeholder,
+        }
+
+
+def render_placeholder(image, size):
+    """Размытая JPEG-заглушка изображения в виде data: URL."""
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((size, size))
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def address_space():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[0]) * resource.getpagesize()
+
+
+def _limit_memory(memory):
+    # Лимит отсчитывается от уже занятого адресного пространства: процесс,
+    # созданный через fork, наследует арены потоков и mmap SQLite.
+    limit = address_space() + memory
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _inspect(path, max_pixels, cpu_seconds, placeholder_size):
+    # Выполняется в процессе песочницы. Лимит CPU отсчитывается от уже
+    # потраченного процессом времени, превышение завершает его SIGXCPU.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    spent = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (spent + cpu_seconds, hard))
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(path) as image:
+                image.verify()
+            with Image.open(path) as image:
+                image.load()
+                return ImageMeta(
+                    format=image.format,
+                    width=image.width,
+                    height=image.height,
+                    mode=image.mode,
+                    orientation=image.getexif().get(EXIF_ORIENTATION, 1),
+                    # Заглушка считается здесь же: процесс запроса не
+                    # декодирует присланное изображение.
+                    placeholder=render_placeholder(image, placeholder_size),
+                )
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        return 'Изображение слишком большое по числу пикселей.'
+    except MemoryError:
+        return 'Изображение требует слишком много памяти.'
+    except Exception:
+        return 'Загрузите правильное изображение.'
+
+
+def _worker(sender, path, max_pixels, cpu_seconds, memory,
+            placeholder_size):
+    _limit_memory(memory)
+    try:
+        sender.send(
+            _inspect(path, max_pixels, cpu_seconds, placeholder_size)
+        )
+    finally:
+        sender.close()
+
+
+def get_context():
+    context = multiprocessing.get_context(
+        settings.BLOG_IMAGE_SANDBOX_START_METHOD
+    )
+    if context.get_start_method() == 'forkserver':
+        # Предзагрузка заодно передаёт серверу sys.path проекта.
+        context.set_forkserver_preload(['blog.sandbox'])
+    return context
+
+
+def get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.BLOG_IMAGE_SANDBOX_WORKERS
+            )
+        return _slots
+
+
+def run_sandboxed(path):
+    context = get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_worker, daemon=True, args=(
+        sender,
+        path,
+        settings.BLOG_IMAGE_MAX_PIXELS,
+        settings.BLOG_IMAGE_SANDBOX_CPU_SECONDS,
+        settings.BLOG_IMAGE_SANDBOX_MEMORY,
+        settings.BLOG_IMAGE_PLACEHOLDER_SIZE,
+    ))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(settings.BLOG_IMAGE_SANDBOX_TIMEOUT):
+            raise ImageRejected('Изображение обрабатывается слишком долго.')
+        return receiver.recv()
+    except EOFError:
+        # Процесс убит лимитом CPU или памяти, не успев ответить.
+        raise ImageRejected('Изображение требует слишком много ресурсов.')
+    finally:
+        receiver.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+
+def inspect_path(path):
+    """Проверяет и декодирует изображение в ограниченном подпроцессе.
+
+    Возвращает ``ImageMeta`` или выбрасывает ``ImageRejected``. У каждой
+    проверки свой процесс: зависший или убитый лимитом процесс не
+    задевает проверки других запросов. Одновременно работает не больше
+    BLOG_IMAGE_SANDBOX_WORKERS процессов.
+    """
+    slots = get_slots()
+    if not slots.acquire(timeout=settings.BLOG_IMAGE_SANDBOX_TIMEOUT):
+        raise ImageRejected(
+            'Сервер занят проверкой изображений, попробуйте позже.'
+        )
+    try:
+        meta = run_sandboxed(path)
+    finally:
+        slots.release()
+    if isinstance(meta, str):
+        raise ImageRejected(meta)
+    return meta
+
+
+def inspect_upload(upload):
+    if hasattr(upload, 'temporary_file_path'):
+        return inspect_path(upload.temporary_file_path())
+    with tempfile.NamedTemporaryFile(suffix='.upload') as temp_file:
+        for chunk in upload.chunks():
+            temp_file.write(chunk)
+        temp_file.flush()
+        upload.seek(0)
+        return inspect_path(temp_file.name)
@@ -0,0 +1,104 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import models, router, transaction
+
+from .db import retry_on_lock
+from .sharding import shard_aliases
+
+
+class BatchedDeletion:
+    """Удаление объекта с зависимыми строками короткими транзакциями.
+
+    ``obj.delete()`` собирает в памяти все связанные строки и удаляет их
+    одной транзакцией, которая держит блокировку записи SQLite всё это
+    время. Здесь зависимые строки сначала удаляются (CASCADE) или
+    отвязываются (SET_NULL) пачками по ``batch_size``: каждая пачка —
+    своя транзакция с повтором при занятой базе, а между пачками
+    остальные запросы успевают и прочитать, и записать. Прерванное
+    удаление можно запустить заново: уже убранные строки не мешают.
+
+    Счётчик ``stats`` ведётся по парам (действие, модель), где действие —
+    ``deleted`` или ``nulled``; ``progress(действие, модель, в пачке,
+    всего)`` вызывается после каждой пачки. Вызывать вне atomic():
+    внутри внешней транзакции пачки не освобождают блокировку.
+    """
+
+    def __init__(self, batch_size=None, pause=None, progress=None):
+        self.batch_size = batch_size or settings.BLOG_DELETE_BATCH_SIZE
+        self.pause = (
+            settings.BLOG_DELETE_PAUSE if pause is None else pause
+        )
+        self.progress = progress
+        self.stats = Counter()
+
+    def delete(self, obj):
+        model = type(obj)
+        if model._meta.label in settings.BLOG_SHARDED_MODELS:
+            aliases = [router.db_for_write(model, instance=obj)]
+        else:
+            # На справочные строки ссылаются строки всех шардов.
+            aliases = shard_aliases()
+        for alias in aliases:
+            self.release(model, [obj.pk], alias)
+        retry_on_lock(obj.delete)
+        self.record('deleted', model, 1)
+        return self.stats
+
+    def release(self, model, pks, using):
+        """Убирает строки, ссылающиеся на ``pks`` модели ``model``."""
+        for relation in model._meta.related_objects:
+            if relation.many_to_many:
+                continue
+            rows = relation.related_model._base_manager.using(using).filter(
+                **{f'{relation.field.name}__in': pks}
+            )
+            if relation.on_delete is models.CASCADE:
+                self.purge(rows, using)
+            elif relation.on_delete is models.SET_NULL:
+                self.nullify(rows, relation.field.name, using)
+
+    def purge(self, rows, using):
+        model = rows.model
+        while True:
+            pks = list(rows.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                return
+            self.release(model, pks, using)
+            retry_on_lock(self.apply, model, pks, using, None)
+            self.record('deleted', model, len(pks))
+            self.wait()
+
+    def nullify(self, rows, field_name, using):
+        model = rows.model
+        while True:
+            pks = list(rows.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                return
+            retry_on_lock(self.apply, model, pks, using, field_name)
+            self.record('nulled', model, len(pks))
+            self.wait()
+
+    def apply(self, model, pks, using, field_name):
+        rows = model._base_manager.using(using).filter(pk__in=pks)
+        with transaction.atomic(using=using):
+            if field_name is None:
+                rows.delete()
+            else:
+                rows.update(**{field_name: None})
+
+    def record(self, action, model, count):
+        key = (action, model._meta.label)
+        self.stats[key] += count
+        if self.progress is not None:
+            self.progress(*key, count, self.stats[key])
+
+    def wait(self):
+        if self.pause:
+            time.sleep(self.pause)
+
+
+def delete_in_batches(obj, batch_size=None, pause=None, progress=None):
+    """Удаляет объект через BatchedDeletion; возвращает счётчик строк."""
+    return BatchedDeletion(batch_size, pause, progress).delete(obj)
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.base import UpdateError
+
+from . import db
+
+
+class SessionStore(cached_db.SessionStore, db.SessionStore):
+    """Сессии в кеше с отложенной записью в БД.
+
+    Сессия читается из кеша и при каждом сохранении пишется в кеш, а
+    строка ``django_session`` обновляется не чаще раза в
+    SESSION_WRITE_BEHIND_SECONDS: частые изменения сессии (например,
+    отметка ReplicaPinningMiddleware после каждого POST) не занимают
+    блокировку записи SQLite. Новая сессия и удаление пишутся в БД сразу.
+    При потере записи кеша теряются изменения не старше этого интервала.
+
+    Кеш SESSION_CACHE_ALIAS должен быть общим для всех процессов сайта.
+    """
+
+    cache_key_prefix = 'blog.sessions.cached_db'
+
+    def __init__(self, session_key=None):
+        self._synced = 0
+        super().__init__(session_key)
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Некоторые кеши не принимают ключи с недопустимыми символами.
+            entry = None
+        if entry is not None:
+            self._synced = entry['synced']
+            return entry['data']
+        session = self._get_session_from_db()
+        if not session:
+            return {}
+        data = self.decode(session.session_data)
+        self._synced = time.time()
+        self.cache_entry(data, self.get_expiry_age(expiry=session.expire_date))
+        return data
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        now = time.time()
+        if must_create or (
+                now - self._synced >= settings.SESSION_WRITE_BEHIND_SECONDS):
+            self.save_to_db(must_create)
+            self._synced = now
+        self.cache_entry(self._session, self.get_expiry_age())
+
+    def save_to_db(self, must_create):
+        try:
+            db.SessionStore.save(self, must_create=must_create)
+        except UpdateError:
+            # Строку удалили как просроченную по отставшему expire_date,
+            # хотя в кеше сессия жива.
+            db.SessionStore.save(self, must_create=True)
+
+    def cache_entry(self, data, timeout):
+        self._cache.set(self.cache_key, {'data': data, 'synced': self._synced},
+                        timeout)
@@ -0,0 +1,14 @@
+from django.contrib.sessions.backends import db
+
+from blog.db import retry_on_lock
+
+
+class SessionStore(db.SessionStore):
+    """Сессии в БД с повтором записи при занятой SQLite.
+
+    Сессия сохраняется после представления, вне его транзакции, поэтому
+    повтор нужен отдельно.
+    """
+
+    def save(self, must_create=False):
+        return retry_on_lock(super().save, must_create=must_create)
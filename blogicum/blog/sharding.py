@@ -0,0 +1,203 @@
+import fcntl
+import heapq
+import itertools
+import os
+import threading
+import time
+from copy import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import (
+    ArchivedPost, Category, Comment, ImageJob, Location, Post,
+)
+
+# Начало отсчёта идентификаторов (2024-01-01 UTC) в миллисекундах.
+ID_EPOCH = 1704067200000
+WORKER_IDS = 1024
+SEQUENCE_MASK = 0xfff
+
+_worker = None
+_last_millis = _sequence = 0
+_sequence_lock = threading.Lock()
+
+
+def shard_aliases():
+    return list(settings.BLOG_SHARDS) or ['default']
+
+
+def shard_for_author(author_id):
+    """Алиас шарда с публикациями автора или None без шардирования."""
+    shards = settings.BLOG_SHARDS
+    if not shards:
+        return None
+    return shards[author_id % len(shards)]
+
+
+def shard_of(instance):
+    """Шард строки: публикации — по автору, остальное — по публикации."""
+    if isinstance(instance, (Post, ArchivedPost)):
+        return shard_for_author(instance.author_id)
+    return shard_for_author(instance.post.author_id)
+
+
+def post_shard(post_id, model=Post):
+    """Алиас шарда, где лежит публикация (или архивная), или None.
+
+    None оставляет выбор базы роутерам: без шардирования это default или
+    реплика, а для несуществующей публикации — пустой ответ и 404.
+    """
+    if not settings.BLOG_SHARDS:
+        return None
+    for alias in settings.BLOG_SHARDS:
+        if model.objects.using(alias).filter(pk=post_id).exists():
+            return alias
+    return None
+
+
+def claim_worker_id(directory=None):
+    """Свободный номер процесса и файл, удерживающий его под flock.
+
+    Блокировку снимает ядро, когда процесс завершается, так что номер
+    умершего процесса освобождается сам, а у живых процессов номера
+    не совпадают.
+    """
+    directory = directory or settings.BLOG_ID_WORKER_DIR
+    os.makedirs(directory, exist_ok=True)
+    for number in range(WORKER_IDS):
+        lock_file = open(os.path.join(directory, f'{number}.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+        return number, lock_file
+    raise RuntimeError(
+        f'Заняты все {WORKER_IDS} номеров процессов в {directory}.'
+    )
+
+
+def worker_id():
+    global _worker
+    # Дочерний процесс после fork разделяет блокировку родителя и берёт
+    # собственный номер.
+    if _worker is None or _worker[0] != os.getpid():
+        _worker = (os.getpid(), *claim_worker_id())
+    return _worker[1]
+
+
+def current_millis():
+    return time.time_ns() // 1_000_000 - ID_EPOCH
+
+
+def next_id():
+    """Идентификатор, уникальный на всех шардах.
+
+    Миллисекунды от ID_EPOCH, 10 бит номера процесса из claim_worker_id()
+    и 12 бит счётчика внутри миллисекунды: при переносе между шардами
+    строки сохраняют свои идентификаторы.
+    """
+    global _last_millis, _sequence
+    with _sequence_lock:
+        millis = max(current_millis(), _last_millis)
+        if millis == _last_millis:
+            _sequence = (_sequence + 1) & SEQUENCE_MASK
+            if _sequence == 0:
+                # Счётчик миллисекунды исчерпан: ждём следующую.
+                while millis <= _last_millis:
+                    millis = current_millis()
+        else:
+            _sequence = 0
+        _last_millis = millis
+        return millis << 22 | worker_id() << 12 | _sequence
+
+
+def assign_id(sender, instance, raw=False, **kwargs):
+    if settings.BLOG_SHARDS and instance.pk is None and not raw:
+        instance.pk = next_id()
+
+
+def mirror_aliases():
+    return [alias for alias in settings.BLOG_SHARDS if alias != 'default']
+
+
+def reference_models():
+    """Справочные таблицы, на которые ссылаются строки шардов."""
+    return [get_user_model(), Category, Location]
+
+
+def mirror_save(sender, instance, using, **kwargs):
+    # Внешние ключи на шардах проверяются, поэтому справочные строки
+    # из default копируются на каждый шард.
+    if using != 'default':
+        return
+    for alias in mirror_aliases():
+        copy(instance).save_base(using=alias, raw=True)
+
+
+def mirror_delete(sender, instance, using, **kwargs):
+    if using != 'default':
+        return
+    for alias in mirror_aliases():
+        sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+for model in (Post, Comment, ImageJob):
+    pre_save.connect(assign_id, sender=model)
+for model in reference_models():
+    post_save.connect(mirror_save, sender=model)
+    post_delete.connect(mirror_delete, sender=model)
+
+
+class ScatterGather:
+    """Несколько одинаково упорядоченных запросов как один для Paginator.
+
+    Запросы — это один запрос к разным шардам или, например, публикации
+    и их архив. Для среза ``[start:stop]`` каждый запрос отдаёт первые
+    ``stop`` строк, а heapq.merge сливает уже упорядоченные потоки.
+    Глубокая страница стоит столько же строк с каждого запроса, сколько
+    OFFSET стоил бы в одной базе.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets):
+        queryset = querysets[0]
+        directions = {field.startswith('-')
+                      for field in queryset.query.order_by}
+        if len(directions) != 1:
+            raise ValueError(
+                'Объединяемые запросы должны быть отсортированы по полям '
+                'одного направления.'
+            )
+        self.querysets = querysets
+        self.model = queryset.model
+        self.reverse = directions.pop()
+        self.fields = [field.lstrip('-')
+                       for field in queryset.query.order_by]
+
+    def key(self, obj):
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step:
+            raise TypeError('Поддерживаются только срезы без шага.')
+        streams = [queryset[:index.stop] for queryset in self.querysets]
+        merged = heapq.merge(*streams, key=self.key, reverse=self.reverse)
+        return list(itertools.islice(merged, index.start, index.stop))
+
+
+def scatter_gather(queryset):
+    if not settings.BLOG_SHARDS:
+        return queryset
+    return ScatterGather(
+        [queryset.using(alias) for alias in settings.BLOG_SHARDS]
+    )
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+CONTENT_ADDRESSED_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[\w]+)?$'
+)
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_NAME.search(name))
+
+
+def content_hash(content):
+    digest = getattr(content, 'content_hash', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем из хеша содержимого.
+
+    Файл ``posts_images/photo.JPG`` сохраняется как
+    ``posts_images/ab/cd/abcd….jpg``: одинаковые байты лежат на диске
+    один раз. Ссылок на такой файл может быть несколько, поэтому
+    ``delete()`` его не удаляет: ничьи файлы находит и удаляет
+    ``gc_media`` по ссылкам из публикаций.
+    """
+
+    shard_levels = 2
+
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        shards = [
+            digest[level * 2:level * 2 + 2]
+            for level in range(self.shard_levels)
+        ]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    def save(self, name, content, max_length=None):
+        from .models import MediaBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content_hash(content))
+        # Запись строки MediaBlob берёт блокировку записи, под которой
+        # gc_media перепроверяет файл перед удалением: параллельные save()
+        # и удаление одних байтов не разминутся.
+        with transaction.atomic():
+            updated = MediaBlob.objects.filter(name=name).update(
+                saved_at=timezone.now()
+            )
+            if not updated:
+                MediaBlob.objects.create(name=name, size=content.size)
+            if not self.exists(name):
+                self._save(name, content)
+            else:
+                # Новая ссылка на старый файл: gc_media не трогает файлы
+                # моложе льготного периода.
+                os.utime(self.path(name))
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Запись во временный файл и атомарная замена: параллельная загрузка
+        # тех же байтов не оставит полузаписанный файл.
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(
+                content.temporary_file_path(), full_path,
+                allow_overwrite=True,
+            )
+        else:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as temp_file:
+                    for chunk in content.chunks():
+                        temp_file.write(chunk)
+                os.replace(temp_path, full_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def delete(self, name):
+        if not is_content_addressed(name):
+            super().delete(name)
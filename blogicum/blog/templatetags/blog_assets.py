@@ -0,0 +1,25 @@
+import json
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def purged_css():
+    """Соответствие исходных CSS и файлов, собранных командой build_css."""
+    try:
+        with open(settings.BLOG_PURGED_CSS_MANIFEST, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+@register.simple_tag
+def stylesheet(path):
+    if settings.BLOG_PURGED_CSS:
+        path = purged_css().get(path, path)
+    return static(path)
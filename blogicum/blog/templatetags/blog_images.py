@@ -0,0 +1,13 @@
+from django import template
+
+from blog.media import resized_url as build_resized_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def resized_url(image, width, height):
+    """Адрес копии изображения, вписанной в прямоугольник width×height."""
+    if not image:
+        return ''
+    return build_resized_url(image.name, width, height)
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    StopFutureHandlers,
+)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+
+class StreamedImageFile(UploadedFile):
+    """Изображение, принятое сразу в каталог хранилища.
+
+    Хеш и размеры посчитаны во время приёма: хранилище переносит файл
+    переименованием и не читает его повторно.
+    """
+
+    def __init__(self, file, name, content_type, size, charset,
+                 content_type_extra=None, content_hash=None,
+                 image_size=None):
+        super().__init__(
+            file, name, content_type, size, charset, content_type_extra
+        )
+        self.content_hash = content_hash
+        self.image_size = image_size
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Хранилище уже перенесло файл на постоянное место.
+            pass
+
+
+class RejectedImageFile(UploadedFile):
+    def __init__(self, name, content_type, error):
+        super().__init__(BytesIO(), name, content_type, 0)
+        self.upload_error = error
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """Принимает изображение публикации потоком, проверяя его по ходу.
+
+    Байты пишутся во временный файл в ``MEDIA_ROOT``, одновременно
+    считается SHA-256, а по первым килобайтам определяются формат и
+    размеры. Превышение лимитов прекращает запись и хеширование;
+    форма получает файл с причиной отказа в ``upload_error``.
+    """
+
+    field_names = ('image',)
+
+    def handle_raw_input(
+            self, input_data, META, content_length,  # noqa: N803
+            boundary, encoding=None):
+        self.request_too_large = (
+            content_length > settings.BLOG_IMAGE_MAX_BYTES
+            + settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name in self.field_names
+        if not self.active:
+            return
+        self.error = None
+        self.received = 0
+        self.header = bytearray()
+        self.image_size = None
+        self.hasher = hashlib.sha256()
+        self.file = None
+        if getattr(self, 'request_too_large', False):
+            self.reject_too_large()
+        else:
+            directory = os.path.join(
+                settings.MEDIA_ROOT, settings.BLOG_IMAGE_INCOMING_DIR
+            )
+            os.makedirs(directory, exist_ok=True)
+            extension = os.path.splitext(self.file_name)[1].lower()
+            self.file = tempfile.NamedTemporaryFile(
+                dir=directory, suffix='.upload' + extension
+            )
+        raise StopFutureHandlers()
+
+    def reject(self, error):
+        self.error = error
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def reject_too_large(self):
+        self.reject(
+            'Размер изображения не должен превышать '
+            f'{filesizeformat(settings.BLOG_IMAGE_MAX_BYTES)}.'
+        )
+
+    def sniff(self, raw_data):
+        self.header += raw_data
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                self.image_size = image.size
+        except Image.DecompressionBombError:
+            self.image_size = (0, 0)
+            self.reject('Изображение слишком большое по числу пикселей.')
+            return
+        except Exception:
+            if len(self.header) >= settings.BLOG_IMAGE_SNIFF_BYTES:
+                self.reject('Загрузите правильное изображение.')
+            return
+        width, height = self.image_size
+        if width * height > settings.BLOG_IMAGE_MAX_PIXELS:
+            self.reject(
+                f'Изображение {width}×{height} слишком большое по числу '
+                'пикселей.'
+            )
+        self.header = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.BLOG_IMAGE_MAX_BYTES:
+            self.reject_too_large()
+            return None
+        if self.image_size is None:
+            self.sniff(raw_data)
+            if self.error:
+                return None
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if self.error is None and self.image_size is None:
+            self.reject('Загрузите правильное изображение.')
+        if self.error:
+            return RejectedImageFile(
+                self.file_name, self.content_type, self.error
+            )
+        self.file.flush()
+        self.file.seek(0)
+        return StreamedImageFile(
+            self.file, self.file_name, self.content_type, file_size,
+            self.charset, self.content_type_extra,
+            content_hash=self.hasher.hexdigest(),
+            image_size=self.image_size,
+        )
+
+    def upload_interrupted(self):
+        if getattr(self, 'active', False) and self.file is not None:
+            self.file.close()
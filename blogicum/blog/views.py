@@ -12,14 +12,24 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse
 from django.core.paginator import Paginator
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, FileField
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
-from .models import Post, Category, Comment
+from .models import ArchivedPost, Post, Category, Comment
+from .db import write_transaction
 from .forms import PostForm, CommentCreateForm
+from .images import enqueue_image_job, store_image_info
+from .sharding import (
+    ScatterGather, post_shard, scatter_gather, shard_for_author,
+)
+from .uploadhandlers import StreamingImageUploadHandler
 
 
 def get_queryset_with_comment_counts(posts):
-    return posts.annotate(comment_count=Count("comment"))
+    return posts.annotate(
+        comment_count=Count("comment")
+    ).select_related("image_meta")
 
 
 def paginate_items(queryset, request, per_page=10):
@@ -28,13 +38,49 @@ def paginate_items(queryset, request, per_page=10):
     return paginator.get_page(page_number)
 
 
+class WriteTransactionMixin:
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Транзакцию открывает само представление: тело запроса
+        # разбирается, а изображение проверяется в песочнице вне её, и
+        # блокировка записи берётся в базе get_write_alias(), а не в
+        # default, как у WriteCoordinationMiddleware.
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
+
+    def form_valid(self, form):
+        self.store_files(form.instance)
+        with write_transaction(self.get_write_alias()):
+            return super().form_valid(form)
+
+    def get_write_alias(self):
+        # База, куда попадут строки: при BLOG_SHARDS — шард автора или
+        # публикации.
+        return None
+
+    def store_files(self, instance):
+        # Перенос загрузки в хранилище идёт до транзакции; save() модели
+        # видит уже сохранённый файл и пишет только строку.
+        for field in instance._meta.concrete_fields:
+            if not isinstance(field, FileField):
+                continue
+            file = getattr(instance, field.attname)
+            if file and not file._committed:
+                file.save(file.name, file.file, save=False)
+
+
 class BaseCommentMixin:
     model = Comment
     form_class = CommentCreateForm
     template_name = "blog/comment.html"
 
     def get_post(self):
-        return get_object_or_404(Post, id=self.kwargs["post"])
+        return get_object_or_404(
+            Post.objects.using(post_shard(self.kwargs["post"])),
+            id=self.kwargs["post"],
+        )
+
+    def get_write_alias(self):
+        return post_shard(self.kwargs["post"])
 
     def get_success_url(self):
         return reverse(
@@ -47,8 +93,13 @@ class BaseCommentMixin:
 
 class AuthorCheckCommentMixin(BaseCommentMixin):
     def get_object(self, queryset=None):
-        comment = get_object_or_404(Comment, pk=self.kwargs["comment"])
-        post = get_object_or_404(Post, pk=self.kwargs["post"])
+        shard = post_shard(self.kwargs["post"])
+        comment = get_object_or_404(
+            Comment.objects.using(shard), pk=self.kwargs["comment"]
+        )
+        post = get_object_or_404(
+            Post.objects.using(shard), pk=self.kwargs["post"]
+        )
         if comment.author != self.request.user or comment.post != post:
             raise Http404("Запрещено")
         return comment
@@ -58,7 +109,7 @@ class PostQuerySetMixin:
     model = Post
     paginate_by = 10
 
-    def get_queryset(self):
+    def get_posts(self):
         now = timezone.now()
         posts = Post.objects.filter(
             pub_date__lte=now,
@@ -67,8 +118,16 @@ class PostQuerySetMixin:
         )
         return get_queryset_with_comment_counts(posts).order_by("-pub_date")
 
+    def get_queryset(self):
+        return scatter_gather(self.get_posts())
+
 
-class CommentCreateView(LoginRequiredMixin, BaseCommentMixin, CreateView):
+class CommentCreateView(
+    LoginRequiredMixin,
+    BaseCommentMixin,
+    WriteTransactionMixin,
+    CreateView,
+):
     def form_valid(self, form):
         form.instance.author = self.request.user
         form.instance.post = self.get_post()
@@ -78,6 +137,7 @@ class CommentCreateView(LoginRequiredMixin, BaseCommentMixin, CreateView):
 class CommentEditView(
     LoginRequiredMixin,
     AuthorCheckCommentMixin,
+    WriteTransactionMixin,
     UpdateView,
 ):
     pass
@@ -86,9 +146,12 @@ class CommentEditView(
 class CommentRemoveView(
     LoginRequiredMixin,
     AuthorCheckCommentMixin,
+    WriteTransactionMixin,
     DeleteView,
 ):
-    pass
+    def delete(self, request, *args, **kwargs):
+        with write_transaction(self.get_write_alias()):
+            return super().delete(request, *args, **kwargs)
 
 
 class UserProfileView(DetailView):
@@ -102,20 +165,29 @@ class UserProfileView(DetailView):
             username=self.kwargs["username"],
         )
 
+    def filter_posts(self, posts):
+        if self.request.user == self.object:
+            return posts.filter(author=self.object)
+        return posts.filter(
+            author=self.object,
+            is_published=True,
+            pub_date__lte=timezone.now(),
+            category__is_published=True,
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        now = timezone.now()
-        if self.request.user == self.object:
-            posts = Post.objects.filter(author=self.object)
-        else:
-            posts = Post.objects.filter(
-                author=self.object,
-                is_published=True,
-                pub_date__lte=now,
-                category__is_published=True,
-            )
-        posts = get_queryset_with_comment_counts(posts).order_by("-pub_date")
-        context["page_obj"] = paginate_items(posts, self.request)
+        shard = shard_for_author(self.object.pk)
+        posts = get_queryset_with_comment_counts(
+            self.filter_posts(Post.objects.using(shard))
+        ).order_by("-pub_date")
+        # Архивные публикации старше живых и продолжают ленту автора.
+        archived = self.filter_posts(
+            ArchivedPost.objects.using(shard)
+        ).annotate(comment_count=Count("comment")).order_by("-pub_date")
+        context["page_obj"] = paginate_items(
+            ScatterGather([posts, archived]), self.request
+        )
         return context
 
 
@@ -137,7 +209,73 @@ class UserEditView(LoginRequiredMixin, UpdateView):
         )
 
 
-class PostCreateView(LoginRequiredMixin, CreateView):
+class DeferredCsrfMixin:
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # CsrfViewMiddleware разбирает тело запроса ещё до dispatch().
+        # Здесь проверка CSRF переносится в конец dispatch(), чтобы
+        # предшествующие миксины успели отказать или подключить свои
+        # обработчики загрузки до чтения request.POST и request.FILES.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
+
+class PostAuthorRequiredMixin:
+    def dispatch(self, request, *args, **kwargs):
+        self.shard = post_shard(self.kwargs["post"])
+        author_id = (
+            self.get_queryset().filter(pk=self.kwargs["post"])
+            .values_list("author_id", flat=True)
+            .first()
+        )
+        if author_id is None:
+            raise Http404("Публикация не найдена.")
+        if not self.has_post_access(author_id):
+            return self.handle_not_author()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Post.objects.using(self.shard)
+
+    def get_write_alias(self):
+        return self.shard
+
+    def has_post_access(self, author_id):
+        return author_id == self.request.user.id
+
+    def handle_not_author(self):
+        return redirect(
+            "blog:post_detail",
+            post=self.kwargs["post"],
+        )
+
+
+class PostImageMixin:
+    def dispatch(self, request, *args, **kwargs):
+        request.upload_handlers.insert(
+            0, StreamingImageUploadHandler(request)
+        )
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if "image" in form.changed_data and self.object.image:
+            store_image_info(
+                self.object, form.cleaned_data["image"].image_meta.info()
+            )
+            enqueue_image_job(self.object)
+        return response
+
+
+class PostCreateView(
+    LoginRequiredMixin,
+    WriteTransactionMixin,
+    PostImageMixin,
+    DeferredCsrfMixin,
+    CreateView,
+):
     model = Post
     form_class = PostForm
     template_name = "blog/create.html"
@@ -146,6 +284,9 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         form.instance.author = self.request.user
         return super().form_valid(form)
 
+    def get_write_alias(self):
+        return shard_for_author(self.request.user.pk)
+
     def get_success_url(self):
         return reverse(
             "blog:profile",
@@ -155,7 +296,14 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         )
 
 
-class PostUpdateView(LoginRequiredMixin, UpdateView):
+class PostUpdateView(
+    LoginRequiredMixin,
+    PostAuthorRequiredMixin,
+    WriteTransactionMixin,
+    PostImageMixin,
+    DeferredCsrfMixin,
+    UpdateView,
+):
     model = Post
     form_class = PostForm
     template_name = "blog/create.html"
@@ -169,14 +317,6 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
             )
         return super().dispatch(request, *args, **kwargs)
 
-    def form_valid(self, form):
-        if form.instance.author != self.request.user:
-            return redirect(
-                "blog:post_detail",
-                post=self.kwargs["post"],
-            )
-        return super().form_valid(form)
-
     def get_success_url(self):
         return reverse(
             "blog:profile",
@@ -186,19 +326,32 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
         )
 
 
-class PostDeleteView(LoginRequiredMixin, DeleteView):
+class PostDeleteView(
+    LoginRequiredMixin,
+    PostAuthorRequiredMixin,
+    WriteTransactionMixin,
+    DeferredCsrfMixin,
+    DeleteView,
+):
     model = Post
     template_name = "blog/create.html"
+    pk_url_kwarg = "post"
 
-    def get_object(self, queryset=None):
-        post = get_object_or_404(Post, pk=self.kwargs["post"])
-        if post.author != self.request.user and not self.request.user.is_staff:
-            raise Http404("Удаление запрещено")
-        return post
+    def delete(self, request, *args, **kwargs):
+        with write_transaction(self.get_write_alias()):
+            return super().delete(request, *args, **kwargs)
+
+    def has_post_access(self, author_id):
+        return self.request.user.is_staff or super().has_post_access(
+            author_id
+        )
+
+    def handle_not_author(self):
+        raise Http404("Удаление запрещено")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["form"] = PostForm(instance=self.get_object())
+        context["form"] = PostForm(instance=self.object)
         return context
 
     def get_success_url(self):
@@ -216,7 +369,20 @@ class PostDetailView(DetailView):
     context_object_name = "post"
 
     def get_object(self, queryset=None):
-        post = get_object_or_404(Post, pk=self.kwargs["post"])
+        post = (
+            Post.objects.using(post_shard(self.kwargs["post"]))
+            .select_related("image_meta")
+            .filter(pk=self.kwargs["post"])
+            .first()
+        )
+        if post is None:
+            # Старые публикации перенесены командой archive_posts.
+            post = get_object_or_404(
+                ArchivedPost.objects.using(
+                    post_shard(self.kwargs["post"], ArchivedPost)
+                ),
+                pk=self.kwargs["post"],
+            )
         now = timezone.now()
         if self.request.user != post.author:
             if post.pub_date > now or not post.is_published:
@@ -231,7 +397,8 @@ class PostDetailView(DetailView):
             self.object.comment_set.all()
             .order_by("created_at")
         )
-        if self.request.user.is_authenticated:
+        context["archived"] = isinstance(self.object, ArchivedPost)
+        if self.request.user.is_authenticated and not context["archived"]:
             context["form"] = CommentCreateForm()
         return context
 
@@ -244,14 +411,14 @@ class CategoryListView(PostQuerySetMixin, ListView):
     template_name = "blog/category.html"
     context_object_name = "page_obj"
 
-    def get_queryset(self):
+    def get_posts(self):
         category = get_object_or_404(
             Category,
             slug=self.kwargs["slug"],
             is_published=True,
         )
         return get_queryset_with_comment_counts(
-            super().get_queryset().filter(category=category)
+            super().get_posts().filter(category=category)
         ).order_by("-pub_date")
 
     def get_context_data(self, **kwargs):
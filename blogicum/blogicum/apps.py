@@ -0,0 +1,7 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseConfig
+
+
+class StaticFilesConfig(BaseConfig):
+    # STATICFILES_DIRS совпадает с каталогом шаблонов: шаблоны не должны
+    # попадать в собранную статику.
+    ignore_patterns = BaseConfig.ignore_patterns + ['*.html']
@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from blogicum.middleware import EarlyHintsMiddleware  # noqa: E402
+
+application = EarlyHintsMiddleware(django_application)
@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.templatetags.static import static
+from django.utils.cache import has_vary_header, patch_vary_headers
+from django.utils.text import compress_sequence
+
+from blog.media import serve_file
+from blog.templatetags.blog_assets import stylesheet
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if coding and 'q=0' not in params and 'q=0.0' not in params:
+            encodings.add(coding.lower())
+    return encodings
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT.
+
+    Файлы с хешем в имени кешируются навсегда (``immutable``); если клиент
+    принимает сжатие, отдаётся готовая копия ``.br`` или ``.gz``.
+    Работает только при ``STATIC_PIPELINE = True``.
+    """
+
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        if not settings.STATIC_PIPELINE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT)
+        self.hashed = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values()
+        )
+
+    def __call__(self, request):
+        path = request.path_info
+        if path.startswith(self.prefix) and request.method in ('GET', 'HEAD'):
+            response = self.serve(request, path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            full_path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        if name in self.hashed:
+            cache_control = IMMUTABLE
+        else:
+            cache_control = f'public, max-age={settings.STATIC_MAX_AGE}'
+        headers = {'Cache-Control': cache_control}
+        accepted = accepted_encodings(request)
+        for coding, suffix in self.encodings:
+            if coding in accepted and os.path.isfile(full_path + suffix):
+                response = serve_file(
+                    request, full_path + suffix, name + suffix, headers
+                )
+                break
+        else:
+            response = serve_file(request, full_path, name, headers)
+        if any(os.path.isfile(full_path + suffix)
+               for _, suffix in self.encodings):
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы gzip или brotli (если установлен).
+
+    Ответы короче ``COMPRESSION_MIN_LENGTH`` не сжимаются, потоковые
+    сжимаются по частям. Сжатое тело ответа без ``Vary: Cookie`` кладётся
+    в кеш под хешем исходного, так что одинаковые страницы не сжимаются
+    повторно. Страницы с ``Vary: Cookie`` несут данные запроса (токен CSRF,
+    имя пользователя) и почти не повторяются: они сжимаются без кеша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request)
+        if brotli is not None and 'br' in accepted:
+            coding = 'br'
+        elif 'gzip' in accepted:
+            coding = 'gzip'
+        else:
+            return response
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                coding, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_LENGTH:
+                return response
+            compressed = self.compress_cached(
+                coding, response.content,
+                not has_vary_header(response, 'Cookie'),
+            )
+            if compressed is None:
+                return response
+            response.content = compressed
+            response['Content-Length'] = len(compressed)
+        etag = response.get('ETag')
+        if etag:
+            # Сжатое представление не совпадает побайтно с исходным.
+            response['ETag'] = re.sub(r'^"', 'W/"', etag)
+        response['Content-Encoding'] = coding
+        return response
+
+    def compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        # Диапазон указывает смещения в несжатом теле: сжатый фрагмент
+        # не совпал бы ни с Content-Range, ни с Content-Length.
+        if response.status_code == 206 or response.has_header(
+            'Content-Range'
+        ):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        return content_type.strip().lower() in settings.COMPRESSION_TYPES
+
+    def compress_stream(self, coding, sequence):
+        if coding == 'br':
+            return brotli_sequence(sequence)
+        return compress_sequence(sequence)
+
+    def compress(self, coding, content):
+        if coding == 'br':
+            return brotli.compress(
+                content, quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        return gzip.compress(content, settings.COMPRESSION_GZIP_LEVEL,
+                             mtime=0)
+
+    def compress_cached(self, coding, content, cacheable=True):
+        """Сжатое тело или None, если сжатие не уменьшает размер."""
+        cacheable = (
+            cacheable
+            and len(content) <= settings.COMPRESSION_CACHE_MAX_LENGTH
+        )
+        key = None
+        if cacheable:
+            digest = hashlib.sha256(content).hexdigest()
+            key = f'compressed:{coding}:{digest}'
+            compressed = cache.get(key)
+            if compressed is not None:
+                return compressed or None
+        compressed = self.compress(coding, content)
+        if len(compressed) >= len(content):
+            compressed = b''
+        if key is not None:
+            cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+        return compressed or None
+
+
+@lru_cache(maxsize=None)
+def preload_links():
+    """Значения Link для PRELOAD_ASSETS с итоговыми (хешированными) URL."""
+    links = []
+    for path, kind in settings.PRELOAD_ASSETS:
+        url = stylesheet(path) if kind == 'style' else static(path)
+        links.append(f'<{url}>; rel=preload; as={kind}')
+    return tuple(links)
+
+
+def is_page_request(method, path):
+    return method == 'GET' and not path.startswith(
+        (settings.STATIC_URL, settings.MEDIA_URL)
+    )
+
+
+class PreloadMiddleware:
+    """Добавляет к HTML-страницам заголовок Link: rel=preload."""
+
+    def __init__(self, get_response):
+        if not settings.PRELOAD_ASSETS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '')
+        if response.status_code == 200 and content_type.startswith(
+                'text/html'):
+            links = ', '.join(preload_links())
+            existing = response.get('Link')
+            response['Link'] = f'{existing}, {links}' if existing else links
+        return response
+
+
+class EarlyHintsMiddleware:
+    """ASGI-обёртка, отправляющая 103 Early Hints до обработки запроса.
+
+    Работает на серверах с расширением ``http.response.early_hint``
+    (например, Hypercorn): браузер начинает загружать CSS, пока
+    представление ждёт базу. На остальных серверах ничего не делает.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] == 'http'
+            and settings.PRELOAD_ASSETS
+            and 'http.response.early_hint' in scope.get('extensions', {})
+            and is_page_request(scope['method'], scope['path'])
+        ):
+            await send({
+                'type': 'http.response.early_hint',
+                'links': [link.encode() for link in preload_links()],
+            })
+        await self.app(scope, receive, send)
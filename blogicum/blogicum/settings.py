@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,20 +39,42 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    'blogicum.apps.StaticFilesConfig',
     'django_bootstrap5'
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blogicum.middleware.CompressionMiddleware',
+    'blogicum.middleware.StaticFilesMiddleware',
+    'blogicum.middleware.PreloadMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.WriteCoordinationMiddleware',
 ]
 
+SESSION_ENGINE = 'blog.sessions.db'
+
+# Сессии в кеше с отложенной записью в БД и пользователь сессии из кеша
+# (BLOGICUM_CACHED_SESSIONS=1). Кеш default должен быть общим для всех
+# процессов сайта (Memcached, Redis): у LocMemCache он свой в каждом.
+BLOG_CACHED_SESSIONS = os.getenv('BLOGICUM_CACHED_SESSIONS') == '1'
+if BLOG_CACHED_SESSIONS:
+    SESSION_ENGINE = 'blog.sessions.cached_db'
+    AUTHENTICATION_BACKENDS = [
+        'blog.backends.auth.CachedModelBackend',
+        # Сессии, начатые до включения режима, остаются действительными.
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+# Строка django_session обновляется не чаще раза в столько секунд.
+SESSION_WRITE_BEHIND_SECONDS = 60
+BLOG_USER_CACHE_TIMEOUT = 5 * 60
+
 ROOT_URLCONF = 'blogicum.urls'
 
 TEMPLATES_DIR = BASE_DIR / 'static'
@@ -77,6 +100,21 @@ TEMPLATES = [
 ]
 
 
+# Отступы и пустые строки шаблонов убираются при загрузке
+# (blogicum.template_loaders), скомпилированные шаблоны кешируются.
+# Письма и текстовые шаблоны, где переводы строк значимы, не трогаются.
+TEMPLATE_STRIP_WHITESPACE = not DEBUG
+TEMPLATE_WHITESPACE_EXCLUDE = ('*.txt', '*_email.html')
+
+if TEMPLATE_STRIP_WHITESPACE:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'blogicum.template_loaders.FilesystemLoader',
+            'blogicum.template_loaders.AppDirectoriesLoader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
 
@@ -85,11 +123,114 @@ WSGI_APPLICATION = 'blogicum.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'blog.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Профиль SQLite выбирается переменной окружения BLOGICUM_SQLITE_PROFILE.
+# 'production': журнал WAL (читатели не ждут писателя), synchronous=NORMAL,
+# кеш страниц 64 МБ, mmap 256 МБ, временные таблицы в памяти, ожидание
+# блокировки до 5 секунд и постоянные соединения.
+SQLITE_PROFILES = {
+    'default': {
+        'PRAGMAS': {},
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+    },
+    'production': {
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64 * 1024,
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 5000,
+        },
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+    },
+}
+SQLITE_PROFILE = os.environ.get(
+    'BLOGICUM_SQLITE_PROFILE', 'default' if DEBUG else 'production'
+)
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]['PRAGMAS']
+DATABASES['default']['CONN_MAX_AGE'] = (
+    SQLITE_PROFILES[SQLITE_PROFILE]['CONN_MAX_AGE']
+)
+DATABASES['default']['OPTIONS'] = SQLITE_PROFILES[SQLITE_PROFILE]['OPTIONS']
+
+# Реплика только для чтения: копия базы по пути BLOGICUM_REPLICA_NAME,
+# которую поддерживает в актуальном состоянии внешняя репликация. Без
+# переменной алиас смотрит в ту же базу, а чтения на него не направляются.
+# В тестах реплика — зеркало default.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': os.environ.get(
+        'BLOGICUM_REPLICA_NAME', DATABASES['default']['NAME']
+    ),
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = (
+    ['replica'] if 'BLOGICUM_REPLICA_NAME' in os.environ else []
+)
+DATABASE_ROUTERS = [
+    'blog.routers.AuthorShardRouter',
+    'blog.routers.PrimaryReplicaRouter',
+]
+# Приложения, чьи модели читаются с реплик; сессии и пользователи всегда
+# читаются из default.
+REPLICA_APPS = ('blog',)
+# Сколько секунд после изменяющего запроса читать из default.
+REPLICA_STICKY_SECONDS = 5
+
+# Шарды публикаций по author_id: BLOGICUM_SHARDS="/data/s1.sqlite3,..."
+# добавляет алиасы shard1, shard2… к default. Комментарии, данные
+# изображений и задания обработки лежат в шарде своей публикации;
+# пользователи, категории и местоположения пишутся в default и
+# копируются на шарды. После изменения списка шардов нужна команда
+# rebalance_shards.
+SHARD_NAMES = [
+    name for name in os.environ.get('BLOGICUM_SHARDS', '').split(',')
+    if name
+]
+for number, name in enumerate(SHARD_NAMES, 1):
+    DATABASES[f'shard{number}'] = {**DATABASES['default'], 'NAME': name}
+BLOG_SHARDS = (
+    ['default'] + [f'shard{number}' for number in
+                   range(1, len(SHARD_NAMES) + 1)]
+    if SHARD_NAMES else []
+)
+BLOG_SHARDED_MODELS = (
+    'blog.Post', 'blog.Comment', 'blog.PostImage', 'blog.ImageJob',
+    'blog.ArchivedPost', 'blog.ArchivedComment',
+)
+# Номер процесса в идентификаторах строк шардов (blog.sharding.next_id)
+# закрепляется flock на файле этого каталога. Каталог должен быть общим
+# для всех процессов, которые пишут в шарды.
+BLOG_ID_WORKER_DIR = BASE_DIR / 'run' / 'id_workers'
+
+# Запись при занятой SQLite (blog.middleware.WriteCoordinationMiddleware,
+# blog.sessions.db): до SQLITE_WRITE_RETRIES повторов с паузой от 0 до
+# min(MAX_DELAY, BASE_DELAY * 2**попытка) секунд. SQLITE_SERIALIZE_WRITES
+# выстраивает изменяющие запросы процесса в очередь на одной блокировке.
+SQLITE_WRITE_RETRIES = 5
+SQLITE_RETRY_BASE_DELAY = 0.05
+SQLITE_RETRY_MAX_DELAY = 1.0
+SQLITE_SERIALIZE_WRITES = False
+# Ожидания блокировки дольше порога (секунды) пишутся в журнал blog.db.
+SQLITE_SLOW_LOCK_WAIT = 0.5
+
+# Удаление с зависимыми строками (blog.services.BatchedDeletion): пачки
+# по BLOG_DELETE_BATCH_SIZE строк в отдельных транзакциях с паузой
+# BLOG_DELETE_PAUSE секунд между ними.
+BLOG_DELETE_BATCH_SIZE = 500
+BLOG_DELETE_PAUSE = 0.01
+
+# Публикации старше BLOG_ARCHIVE_AFTER_DAYS дней команда archive_posts
+# переносит с комментариями в архивные таблицы своего шарда.
+BLOG_ARCHIVE_AFTER_DAYS = 2 * 365
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -129,6 +270,45 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+STATIC_ROOT = BASE_DIR / 'static_root'
+
+# Продакшен-конвейер статики: collectstatic хеширует имена и пишет сжатые
+# копии, а StaticFilesMiddleware отдаёт их с Cache-Control: immutable.
+STATIC_PIPELINE = not DEBUG
+STATIC_MAX_AGE = 60 * 60
+
+if STATIC_PIPELINE:
+    STATICFILES_STORAGE = (
+        'blogicum.staticfiles.CompressedManifestStaticFilesStorage'
+    )
+
+# Сжатие ответов (blogicum.middleware.CompressionMiddleware). Сжатые тела
+# до COMPRESSION_CACHE_MAX_LENGTH байт без Vary: Cookie кешируются по хешу
+# исходного тела.
+COMPRESSION_MIN_LENGTH = 500
+COMPRESSION_TYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+)
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CACHE_MAX_LENGTH = 512 * 1024
+COMPRESSION_CACHE_TIMEOUT = 10 * 60
+
+# Ресурсы, которые нужны каждой странице: о них сообщают заголовок
+# Link: rel=preload и, на ASGI-серверах с поддержкой, 103 Early Hints.
+PRELOAD_ASSETS = (
+    ('css/bootstrap.min.css', 'style'),
+    ('img/logo.png', 'image'),
+)
+
+# Урезанный Bootstrap из manage.py build_css: в продакшене тег
+# {% stylesheet %} подставляет его вместо полного bootstrap.min.css.
+BLOG_PURGED_CSS = STATIC_PIPELINE
+BLOG_PURGED_CSS_MANIFEST = TEMPLATES_DIR / 'css' / 'purged.json'
+# Классы, которых нет в шаблонах, но которые нужно сохранить.
+BLOG_CSS_SAFELIST = ()
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -148,6 +328,66 @@ LOGIN_REDIRECT_URL = 'blog:index'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+MEDIA_URL = '/media/'
+
+# Медиафайлы отдаёт blog.media.serve (Range, ETag, sendfile). Чтобы
+# передать отдачу фронтовому прокси, укажите 'x-accel-redirect' (nginx,
+# internal-локация MEDIA_ACCEL_PREFIX) или 'x-sendfile' (Apache, lighttpd).
+MEDIA_ACCEL_REDIRECT = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+# Производные изображения, которые строятся по запросу и кешируются
+# в MEDIA_ROOT/BLOG_IMAGE_CACHE_DIR.
+BLOG_IMAGE_CACHE_DIR = 'cache'
+# Браузерам с image/webp в Accept отдаётся WebP-вариант изображения.
+BLOG_IMAGE_WEBP = True
+BLOG_IMAGE_WEBP_DIRS = ('posts_images/',)
+BLOG_IMAGE_WEBP_QUALITY = 80
+# Копии произвольного размера по подписанному адресу
+# /media/r/<w>x<h>/<path>?s=… (тег {% resized_url %}). Одновременно строится
+# не больше BLOG_IMAGE_RESIZE_CONCURRENCY копий и WebP-вариантов на
+# процесс; запрос, не дождавшийся слота за BLOG_IMAGE_RESIZE_WAIT секунд,
+# получает 503 (за WebP — оригинал).
+BLOG_IMAGE_RESIZE_MAX_SIZE = 2000
+BLOG_IMAGE_RESIZE_CONCURRENCY = 2
+BLOG_IMAGE_RESIZE_WAIT = 2
+BLOG_IMAGE_RESIZE_RETRY_AFTER = 5
+
+# Файлы называются по хешу содержимого и раскладываются по подкаталогам;
+# одинаковые загрузки хранятся один раз.
+DEFAULT_FILE_STORAGE = 'blog.storage.ContentAddressedStorage'
+
+# Фоновая обработка изображений публикаций (manage.py process_images).
+BLOG_IMAGE_CARD_SIZE = (640, 640)
+BLOG_IMAGE_QUALITY = 85
+BLOG_IMAGE_WORKERS = os.cpu_count() or 1
+# Задание, взятое в обработку дольше BLOG_IMAGE_JOB_TIMEOUT секунд назад
+# (обработчик убит или упал), возвращается в очередь; после
+# BLOG_IMAGE_JOB_ATTEMPTS попыток помечается ошибкой.
+BLOG_IMAGE_JOB_TIMEOUT = 10 * 60
+BLOG_IMAGE_JOB_ATTEMPTS = 3
+# Сторона размытой заглушки, которая показывается до загрузки картинки.
+BLOG_IMAGE_PLACEHOLDER_SIZE = 16
+
+# Ограничения для загрузки изображений, проверяются во время приёма
+# (blog.uploadhandlers.StreamingImageUploadHandler).
+BLOG_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+BLOG_IMAGE_MAX_PIXELS = 8000 * 8000
+BLOG_IMAGE_SNIFF_BYTES = 256 * 1024
+BLOG_IMAGE_INCOMING_DIR = 'posts_images/incoming'
+
+# Проверка и декодирование загруженных изображений: каждое — в своём
+# подпроцессе, не больше BLOG_IMAGE_SANDBOX_WORKERS одновременно, с
+# ограничениями памяти (байты сверх адресного пространства процесса при
+# старте) и CPU (секунды). forkserver создаёт процессы из небольшого
+# сервера, а не из многопоточного процесса сайта.
+BLOG_IMAGE_SANDBOX_WORKERS = 2
+BLOG_IMAGE_SANDBOX_MEMORY = 512 * 1024 * 1024
+BLOG_IMAGE_SANDBOX_CPU_SECONDS = 5
+BLOG_IMAGE_SANDBOX_TIMEOUT = 10
+BLOG_IMAGE_SANDBOX_START_METHOD = 'forkserver'
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Указываем директорию, в которую будут сохраняться файлы писем:
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
@@ -0,0 +1,53 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хеширует имена статики и кладёт рядом сжатые копии.
+
+    После ``collectstatic`` у текстовых файлов появляются соседи ``.gz``
+    и, если установлен пакет ``brotli``, ``.br``. Копия сохраняется,
+    только когда она заметно меньше исходного файла.
+    """
+
+    compress_extensions = ('.css', '.js', '.svg', '.ico', '.json', '.txt',
+                           '.xml', '.map')
+    compress_min_size = 256
+    compress_max_ratio = 0.95
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not name.endswith(self.compress_extensions):
+                continue
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compressors(self):
+        yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+        if brotli is not None:
+            yield '.br', lambda data: brotli.compress(data)
+
+    def compress(self, name):
+        path = self.path(name)
+        if os.path.getsize(path) < self.compress_min_size:
+            return
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compressor in self.compressors():
+            compressed = compressor(data)
+            if len(compressed) > len(data) * self.compress_max_ratio:
+                continue
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            yield name + suffix
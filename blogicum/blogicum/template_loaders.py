@@ -0,0 +1,55 @@
+import re
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.template.loaders import app_directories, filesystem
+
+PROTECTED_RE = re.compile(
+    r'<(pre|textarea|script|style)\b.*?</\1\s*>'
+    r'|{%\s*filter\b.*?{%\s*endfilter\s*%}',
+    re.S | re.I,
+)
+WHITESPACE_RE = re.compile(r'[ \t\r\f\v]*\n\s*')
+
+
+def collapse(text):
+    return WHITESPACE_RE.sub('\n', text)
+
+
+def strip_whitespace(source):
+    output = []
+    position = 0
+    for match in PROTECTED_RE.finditer(source):
+        output.append(collapse(source[position:match.start()]))
+        output.append(match.group(0))
+        position = match.end()
+    output.append(collapse(source[position:]))
+    return ''.join(output)
+
+
+class WhitespaceStrippingMixin:
+    """Убирает отступы и пустые строки из исходника шаблона.
+
+    Пробелы сжимаются один раз при чтении, до компиляции, и ничего не
+    стоят при отрисовке. Последовательность пробелов с переводом строки
+    заменяется одним переводом строки: для HTML это по-прежнему пробел,
+    и строчные элементы не слипаются. Содержимое ``<pre>``, ``<textarea>``,
+    ``<script>``, ``<style>`` и блоков ``{% filter %}`` не меняется, как и
+    шаблоны из ``TEMPLATE_WHITESPACE_EXCLUDE``.
+    """
+
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        name = origin.template_name or ''
+        if any(fnmatch(name, pattern)
+               for pattern in settings.TEMPLATE_WHITESPACE_EXCLUDE):
+            return contents
+        return strip_whitespace(contents)
+
+
+class FilesystemLoader(WhitespaceStrippingMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(WhitespaceStrippingMixin, app_directories.Loader):
+    pass
@@ -13,13 +13,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include, reverse_lazy
+from django.urls import path, include, re_path, reverse_lazy
 from django.contrib.auth.forms import UserCreationForm
 from django.views.generic.edit import CreateView
-from django.conf.urls.static import static
 from django.conf import settings
 
+from blog import media
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -35,7 +38,18 @@ urlpatterns = [
         ),
         name='registration',
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(
+        r'^%sr/(?P<width>\d+)x(?P<height>\d+)/(?P<path>.+)$'
+        % re.escape(settings.MEDIA_URL.lstrip('/')),
+        media.serve_resized,
+        name='media_resized',
+    ),
+    re_path(
+        r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        media.serve,
+        name='media',
+    ),
+]
 
 handler404 = 'pages.views.page_not_found'
 handler500 = 'pages.views.server_error'
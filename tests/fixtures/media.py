@@ -0,0 +1,27 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+
+def make_image_bytes(size=(100, 100), fmt='JPEG', color=(73, 109, 137)):
+    image_data = BytesIO()
+    Image.new('RGB', size, color=color).save(image_data, fmt)
+    return image_data.getvalue()
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    root = tmp_path / 'media'
+    root.mkdir()
+    with override_settings(MEDIA_ROOT=str(root)):
+        yield root
+
+
+@pytest.fixture
+def uploaded_image():
+    return SimpleUploadedFile(
+        'upload.jpg', make_image_bytes(), content_type='image/jpeg'
+    )
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import ArchivedComment, ArchivedPost, Comment, Post
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def old_posts(mixer, user, another_user, published_category):
+    posts = [
+        mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            is_published=True, image='',
+            pub_date=timezone.now() - timedelta(days=1000 + number),
+        )
+        for number in range(3)
+    ]
+    for post in posts:
+        mixer.cycle(2).blend('blog.Comment', post=post, author=another_user)
+    fresh = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+        image='',
+    )
+    return posts, fresh
+
+
+def test_archive_posts(old_posts):
+    posts, fresh = old_posts
+    out = StringIO()
+    call_command('archive_posts', days=365, batch_size=2, pause=0,
+                 dry_run=True, stdout=out)
+    assert 'будет перенесено 3' in out.getvalue()
+    assert Post.objects.count() == 4, 'Режим --dry-run не должен переносить.'
+
+    call_command('archive_posts', days=365, batch_size=2, pause=0,
+                 stdout=StringIO())
+    assert list(Post.objects.values_list('pk', flat=True)) == [fresh.pk], (
+        'Убедитесь, что в основной таблице остаются только свежие '
+        'публикации.'
+    )
+    assert sorted(ArchivedPost.objects.values_list('pk', flat=True)) == [
+        post.pk for post in posts
+    ], 'Архивные публикации должны сохранять свои идентификаторы.'
+    assert Comment.objects.count() == 0
+    assert ArchivedComment.objects.count() == 6
+    archived = ArchivedPost.objects.get(pk=posts[0].pk)
+    assert (archived.title, archived.pub_date) == (
+        posts[0].title, posts[0].pub_date
+    )
+
+
+def test_archived_post_views(client, user, another_user, old_posts):
+    posts, fresh = old_posts
+    call_command('archive_posts', days=365, pause=0, stdout=StringIO())
+    client.force_login(another_user)
+    response = client.get(reverse('blog:post_detail', args=[posts[0].pk]))
+    assert response.status_code == 200, (
+        'Страница архивной публикации должна открываться по прежнему '
+        'адресу.'
+    )
+    assert response.context['archived']
+    assert len(response.context['comments']) == 2
+    assert 'form' not in response.context, (
+        'Комментировать архивные публикации нельзя.'
+    )
+    response = client.get(reverse('blog:profile', args=[user.username]))
+    assert [post.pk for post in response.context['page_obj']] == [
+        fresh.pk, *(post.pk for post in posts)
+    ], 'В профиле архивные публикации должны идти после свежих.'
+    assert response.context['page_obj'][1].comment_count == 2
+
+
+def test_pub_date_index():
+    with connection.cursor() as cursor:
+        indexes = connection.introspection.get_constraints(
+            cursor, Post._meta.db_table
+        )
+    assert any(
+        item['columns'] == ['pub_date'] and item['index']
+        for item in indexes.values()
+    ), 'Лента сортирует по pub_date: у поля должен быть индекс.'
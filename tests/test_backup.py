@@ -0,0 +1,134 @@
+import sqlite3
+import time
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from blog.backup import BackupError, WalArchiver, backup
+
+
+def count_posts(path):
+    with sqlite3.connect(path) as connection:
+        query = 'SELECT count(*) FROM blog_post'
+        return connection.execute(query).fetchone()[0]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backup_db(mixer, user, media_root, tmp_path):
+    mixer.cycle(3).blend('blog.Post', author=user)
+    target = tmp_path / 'backup.sqlite3'
+    call_command('backup_db', str(target), '--pages', '1', '--sleep', '0')
+    assert count_posts(target) == 3, (
+        'Убедитесь, что backup_db копирует содержимое базы.'
+    )
+
+
+@pytest.fixture
+def live_db(tmp_path):
+    connection = sqlite3.connect(tmp_path / 'live.sqlite3',
+                                 isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('CREATE TABLE blog_post (id INTEGER PRIMARY KEY)')
+    yield connection
+    connection.close()
+
+
+def insert(connection, count):
+    for _ in range(count):
+        connection.execute('INSERT INTO blog_post DEFAULT VALUES')
+
+
+def make_source(path, journal_mode):
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute(f'PRAGMA journal_mode={journal_mode}')
+    connection.execute('CREATE TABLE blog_post (id INTEGER PRIMARY KEY, '
+                       'text TEXT)')
+    connection.executemany('INSERT INTO blog_post (text) VALUES (?)',
+                           [('x' * 1000,)] * 200)
+    return connection
+
+
+def writing_progress(path):
+    """progress-колбэк, который пишет в базу другим соединением.
+
+    Так запись гарантированно попадает между шагами копирования.
+    """
+    writer = sqlite3.connect(path, isolation_level=None)
+
+    def progress(status, remaining, total):
+        writer.execute("INSERT INTO blog_post (text) VALUES ('y')")
+
+    return writer, progress
+
+
+def test_backup_with_concurrent_writes_in_wal(tmp_path):
+    path = tmp_path / 'busy.sqlite3'
+    source = make_source(path, 'WAL')
+    writer, progress = writing_progress(path)
+    try:
+        backup(source, tmp_path / 'copy.sqlite3', pages=1, sleep=0,
+               progress=progress, max_restarts=0)
+    finally:
+        writer.close()
+        source.close()
+    assert count_posts(tmp_path / 'copy.sqlite3') == 200, (
+        'Убедитесь, что копия базы в режиме WAL снимается при постоянной '
+        'записи.'
+    )
+
+
+def test_backup_gives_up_after_restarts(tmp_path):
+    path = tmp_path / 'busy.sqlite3'
+    source = make_source(path, 'DELETE')
+    writer, progress = writing_progress(path)
+    try:
+        with pytest.raises(BackupError):
+            backup(source, tmp_path / 'copy.sqlite3', pages=1, sleep=0,
+                   progress=progress, max_restarts=3)
+    finally:
+        writer.close()
+        source.close()
+    assert not (tmp_path / 'copy.sqlite3').exists()
+
+
+def test_point_in_time_restore(live_db, tmp_path):
+    archive = tmp_path / 'archive'
+    insert(live_db, 5)
+    archiver = WalArchiver(tmp_path / 'live.sqlite3', archive)
+    archiver.start()
+    insert(live_db, 10)
+    assert archiver.poll()
+    time.sleep(0.01)
+    moment = timezone.now()
+    time.sleep(0.01)
+    insert(live_db, 20)
+    archiver.checkpoint()
+    # После checkpoint WAL начинается заново: это новое поколение архива.
+    insert(live_db, 40)
+    archiver.poll()
+    archiver.close()
+
+    latest = tmp_path / 'latest.sqlite3'
+    call_command('restore_db', str(archive), '--output', str(latest))
+    assert count_posts(latest) == 75, (
+        'Убедитесь, что восстановление применяет все поколения WAL.'
+    )
+    earlier = tmp_path / 'earlier.sqlite3'
+    call_command('restore_db', str(archive), '--output', str(earlier),
+                 '--until', moment.isoformat())
+    assert count_posts(earlier) == 15, (
+        'Убедитесь, что --until восстанавливает состояние на момент времени.'
+    )
+    with sqlite3.connect(earlier) as connection:
+        assert connection.execute(
+            'PRAGMA integrity_check').fetchone()[0] == 'ok'
+
+
+def test_restore_keeps_existing_file(tmp_path):
+    target = tmp_path / 'db.sqlite3'
+    target.write_bytes(b'data')
+    with pytest.raises(CommandError):
+        call_command('restore_db', str(tmp_path / 'backup.sqlite3'),
+                     '--output', str(target))
+    assert target.read_bytes() == b'data'
@@ -0,0 +1,73 @@
+import json
+import shutil
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import override_settings
+
+from blog.css import html_classes, purge_css
+from blog.templatetags.blog_assets import purged_css
+
+
+def test_html_classes():
+    text = (
+        '<a class="nav-link {% if active %}active{% endif %}" '
+        "href='#'><span class='badge  bg-{{ color }}'>"
+    )
+    assert html_classes(text) == {'nav-link', 'active', 'badge', 'bg-'}
+
+
+def test_purge_css():
+    css = (
+        '/*! license */:root{--x:1}a{color:red}.btn,.carousel{x:1}'
+        '.row>.col{y:"}"}.nav:not(.unused){z:1}'
+        '@media (min-width:576px){.col-sm{a:b}.btn-sm{c:d}}'
+        '@keyframes spin{to{transform:rotate(1turn)}}'
+        '/*# sourceMappingURL=x.map */'
+    )
+    assert purge_css(css, {'btn', 'btn-sm', 'row', 'col', 'nav'}) == (
+        '/*! license */:root{--x:1}a{color:red}.btn{x:1}'
+        '.row>.col{y:"}"}.nav:not(.unused){z:1}'
+        '@media (min-width:576px){.btn-sm{c:d}}'
+        '@keyframes spin{to{transform:rotate(1turn)}}'
+    )
+
+
+@pytest.fixture
+def static_copy(tmp_path):
+    static_dir = tmp_path / 'static'
+    shutil.copytree(settings.STATICFILES_DIRS[0], static_dir)
+    manifest = static_dir / 'css' / 'purged.json'
+    with override_settings(
+            STATICFILES_DIRS=[str(static_dir)],
+            BLOG_PURGED_CSS_MANIFEST=str(manifest)):
+        yield static_dir
+    purged_css.cache_clear()
+
+
+def test_build_css(static_copy, capsys):
+    call_command('build_css')
+    manifest = json.loads(
+        (static_copy / 'css' / 'purged.json').read_text()
+    )
+    name = manifest['css/bootstrap.min.css']
+    assert name.startswith('css/bootstrap.min.purged.')
+    purged = (static_copy / name).read_text()
+    full = (static_copy / 'css' / 'bootstrap.min.css').read_text()
+    assert len(purged) < len(full) / 2, (
+        'Убедитесь, что из CSS удаляются неиспользуемые правила.'
+    )
+    assert '.navbar-brand{' in purged
+    assert '.is-invalid' in purged, (
+        'Убедитесь, что учитываются классы из форм django_bootstrap5.'
+    )
+    assert '.carousel{' not in purged
+    assert '−' in capsys.readouterr().out
+
+    with override_settings(BLOG_PURGED_CSS=True):
+        rendered = Template(
+            "{% load blog_assets %}{% stylesheet 'css/bootstrap.min.css' %}"
+        ).render(Context())
+    assert rendered == '/static/' + name
@@ -0,0 +1,101 @@
+import gzip
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from blogicum import middleware
+from blogicum.middleware import CompressionMiddleware
+
+PAGE = ('<p>Публикация</p>' * 200).encode()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def request(encoding='gzip, deflate'):
+    return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+
+
+def test_html_compressed(monkeypatch):
+    monkeypatch.setattr(middleware, 'brotli', None)
+    response = CompressionMiddleware(
+        lambda request: HttpResponse(PAGE, headers={'ETag': '"page"'})
+    )(request())
+    assert response['Content-Encoding'] == 'gzip', (
+        'Убедитесь, что HTML-ответы сжимаются gzip.'
+    )
+    assert gzip.decompress(response.content) == PAGE
+    assert response['Content-Length'] == str(len(response.content))
+    assert 'Accept-Encoding' in response['Vary']
+    assert response['ETag'] == 'W/"page"'
+
+
+@pytest.mark.parametrize(
+    ('response', 'encoding'),
+    [
+        (HttpResponse(b'<p>short</p>'), 'gzip'),
+        (HttpResponse(PAGE, content_type='image/png'), 'gzip'),
+        (HttpResponse(PAGE), 'identity'),
+        (HttpResponse(PAGE, status=206), 'gzip'),
+        (HttpResponse(PAGE, headers={'Content-Range': 'bytes 0-9/100'}),
+         'gzip'),
+    ],
+    ids=['short', 'binary', 'not-accepted', 'partial', 'content-range'],
+)
+def test_not_compressed(response, encoding):
+    result = CompressionMiddleware(lambda request: response)(
+        request(encoding)
+    )
+    assert not result.has_header('Content-Encoding')
+
+
+def test_compressed_body_cached(monkeypatch):
+    monkeypatch.setattr(middleware, 'brotli', None)
+    calls = []
+    compress = gzip.compress
+    monkeypatch.setattr(
+        middleware.gzip, 'compress',
+        lambda *args, **kwargs: calls.append(1) or compress(*args, **kwargs),
+    )
+    handler = CompressionMiddleware(lambda request: HttpResponse(PAGE))
+    first = handler(request())
+    second = handler(request())
+    assert first.content == second.content
+    assert len(calls) == 1, (
+        'Убедитесь, что одинаковые ответы не сжимаются повторно.'
+    )
+
+
+def test_per_user_page_not_cached(monkeypatch):
+    monkeypatch.setattr(middleware, 'brotli', None)
+    calls = []
+    compress = gzip.compress
+    monkeypatch.setattr(
+        middleware.gzip, 'compress',
+        lambda *args, **kwargs: calls.append(1) or compress(*args, **kwargs),
+    )
+    handler = CompressionMiddleware(
+        lambda request: HttpResponse(PAGE, headers={'Vary': 'Cookie'})
+    )
+    handler(request())
+    assert handler(request())['Content-Encoding'] == 'gzip'
+    assert len(calls) == 2, (
+        'Ответы с Vary: Cookie не должны попадать в кеш сжатых тел.'
+    )
+
+
+def test_streaming_compressed(monkeypatch):
+    monkeypatch.setattr(middleware, 'brotli', None)
+    response = CompressionMiddleware(
+        lambda request: StreamingHttpResponse(iter([PAGE, PAGE]))
+    )(request())
+    assert response['Content-Encoding'] == 'gzip'
+    assert not response.has_header('Content-Length')
+    body = b''.join(response.streaming_content)
+    assert gzip.decompress(body) == PAGE * 2
@@ -0,0 +1,48 @@
+import gzip
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+
+from blog.export import EXPORT_MODELS
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def blog_data(mixer, user, another_user, media_root):
+    user.groups.add(Group.objects.create(name='Редакторы'))
+    posts = mixer.cycle(5).blend('blog.Post', author=user)
+    mixer.cycle(7).blend('blog.Comment', post=posts[0], author=another_user)
+
+
+def dumpdata():
+    out = io.StringIO()
+    call_command('dumpdata', *EXPORT_MODELS, stdout=out)
+    return json.loads(out.getvalue())
+
+
+def test_json_export_matches_dumpdata(blog_data, tmp_path):
+    target = tmp_path / 'db.json.gz'
+    call_command('export_blog', str(target), '--format', 'json', '--gzip',
+                 '--chunk-size', '2', stdout=io.StringIO())
+    with gzip.open(target, 'rt', encoding='utf-8') as file:
+        exported = json.load(file)
+    assert exported == dumpdata(), (
+        'Убедитесь, что выгрузка в формате json совпадает с dumpdata.'
+    )
+
+
+def test_jsonl_export_per_table(blog_data, tmp_path):
+    call_command('export_blog', str(tmp_path), '--chunk-size', '3',
+                 stdout=io.StringIO())
+    lines = (tmp_path / 'blog.comment.jsonl').read_text(
+        encoding='utf-8').splitlines()
+    assert len(lines) == 7, (
+        'Убедитесь, что каждая строка файла jsonl — отдельный объект.'
+    )
+    expected = [item for item in dumpdata() if item['model'] == 'auth.user']
+    users = (tmp_path / 'auth.user.jsonl').read_text(encoding='utf-8')
+    assert [json.loads(line) for line in users.splitlines()] == expected
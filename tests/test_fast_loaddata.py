@@ -0,0 +1,90 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from blog.bulkload import BulkLoader, JSONArrayReader, secondary_indexes
+from blog.models import Category, Location, Post
+
+FIXTURE = Path(__file__).resolve().parent.parent / 'db.json'
+
+
+def test_reader_streams_array():
+    data = FIXTURE.read_text(encoding='utf-8')
+    items = list(JSONArrayReader(io.StringIO(data), chunk_size=7))
+    assert items == json.loads(data), (
+        'Убедитесь, что потоковый разбор не зависит от границ кусков.'
+    )
+    assert list(JSONArrayReader(io.StringIO(' [ ] '))) == []
+
+
+@pytest.mark.parametrize('data', ['{}', '[{"a": 1} {"b": 2}]', '[{"a": 1},'])
+def test_reader_rejects_broken_array(data):
+    with pytest.raises(ValueError):
+        list(JSONArrayReader(io.StringIO(data), chunk_size=4))
+
+
+class CountingReader(io.StringIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_reader_fails_fast_on_broken_item():
+    file = CountingReader('[{"a": 1 "b": 2}, ' + '{"c": 3}, ' * 1000 + '{}]')
+    with pytest.raises(ValueError):
+        list(JSONArrayReader(file, chunk_size=64))
+    assert file.reads == 1, (
+        'Ошибка в середине куска не должна дочитывать файл до конца.'
+    )
+
+
+@pytest.mark.django_db
+def test_fast_loaddata_loads_fixture():
+    indexes = secondary_indexes(connection, Post._meta.db_table)
+    out = io.StringIO()
+    call_command(
+        'fast_loaddata', str(FIXTURE), '--batch-size', '5',
+        '--commit-every', '50', '--ignore-conflicts', stdout=out,
+        skip_checks=False,
+    )
+    assert Post.objects.count() == 39
+    assert Category.objects.count() == 6
+    assert Location.objects.count() == 12
+    assert 'объектов/с' in out.getvalue()
+    assert secondary_indexes(connection, Post._meta.db_table) == indexes, (
+        'Убедитесь, что удалённые на время загрузки индексы восстановлены.'
+    )
+
+
+@pytest.mark.django_db
+def test_fast_loaddata_checks_foreign_keys(tmp_path):
+    fixture = tmp_path / 'broken.json'
+    fixture.write_text(json.dumps([{
+        'model': 'blog.post', 'pk': 1,
+        'fields': {'title': 'Заголовок', 'text': 'Текст', 'author': 999,
+                   'pub_date': '2022-12-18T23:03:52.159Z',
+                   'is_published': True, 'image': ''},
+    }]))
+    with pytest.raises(CommandError):
+        call_command('fast_loaddata', str(fixture))
+
+
+@pytest.mark.django_db
+def test_commit_every_keeps_indexes(monkeypatch):
+    indexes = secondary_indexes(connection, Post._meta.db_table)
+    # Загрузка, прерванная до восстановления индексов.
+    monkeypatch.setattr(BulkLoader, 'restore_indexes', lambda self: None)
+    call_command(
+        'fast_loaddata', str(FIXTURE), '--commit-every', '50',
+        '--ignore-conflicts', stdout=io.StringIO(),
+    )
+    assert secondary_indexes(connection, Post._meta.db_table) == indexes, (
+        'С --commit-every индексы не должны удаляться: удаление '
+        'фиксировалось бы вместе с первой пачкой.'
+    )
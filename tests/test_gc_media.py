@@ -0,0 +1,82 @@
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.management.commands.gc_media import Command
+from blog.models import MediaBlob
+from blog.storage import ContentAddressedStorage
+
+
+def age(path, hours):
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def media_files(mixer, user, published_category, media_root, uploaded_image):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        image=uploaded_image,
+    )
+    kept = media_root / post.image.name
+    orphan = media_root / 'posts_images' / 'old.jpg'
+    orphan.write_bytes(b'old')
+    fresh = media_root / 'posts_images' / 'fresh.jpg'
+    fresh.write_bytes(b'fresh')
+    variant = media_root / 'cache' / 'webp' / 'posts_images' / 'old.jpg.webp'
+    variant.parent.mkdir(parents=True)
+    variant.write_bytes(b'webp')
+    for path in (kept, orphan, variant):
+        age(path, 48)
+    return kept, orphan, fresh, variant
+
+
+@pytest.mark.django_db
+def test_gc_media(media_files, tmp_path):
+    kept, orphan, fresh, variant = media_files
+    out = StringIO()
+    call_command('gc_media', dry_run=True, stdout=out)
+    assert 'posts_images/old.jpg' in out.getvalue()
+    assert orphan.exists(), 'Режим --dry-run не должен удалять файлы.'
+
+    quarantine = tmp_path / 'quarantine'
+    call_command('gc_media', quarantine=str(quarantine), stdout=StringIO())
+    assert kept.exists(), 'Файл, на который ссылается публикация, удалён.'
+    assert fresh.exists(), 'Файлы моложе льготного периода удалять нельзя.'
+    assert not orphan.exists() and not variant.exists()
+    assert (quarantine / 'posts_images' / 'old.jpg').read_bytes() == b'old'
+
+
+@pytest.mark.django_db
+def test_gc_media_skips_reused_blob(media_root, uploaded_image):
+    storage = ContentAddressedStorage(location=str(media_root))
+    name = storage.save('posts_images/photo.jpg', uploaded_image)
+    path = media_root / name
+    age(path, 48)
+    command = Command()
+    command.options = {'dry_run': False, 'quarantine': None}
+    command.root = str(media_root)
+    command.deadline = time.time() - 24 * 3600
+
+    # Та же картинка загружена снова между поиском сирот и удалением.
+    uploaded_image.seek(0)
+    storage.save('posts_images/again.jpg', uploaded_image)
+    assert os.path.getmtime(path) > command.deadline, (
+        'Повторная загрузка тех же байтов должна обновлять mtime файла.'
+    )
+    assert not command.remove(name, name)
+    assert path.exists(), 'Файл, загруженный повторно, удалять нельзя.'
+    assert MediaBlob.objects.filter(name=name).exists()
+
+    age(path, 48)
+    MediaBlob.objects.filter(name=name).update(
+        saved_at=timezone.now() - timedelta(hours=48)
+    )
+    assert command.remove(name, name)
+    assert not path.exists()
+    assert not MediaBlob.objects.filter(name=name).exists()
@@ -0,0 +1,68 @@
+import pytest
+from bs4 import BeautifulSoup
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from blog.models import PostImage
+from fixtures.media import make_image_bytes
+
+
+@pytest.mark.django_db
+def test_upload_stores_dimensions_and_placeholder(
+        user_client, published_category, published_location, media_root,
+        monkeypatch):
+    def load(image):
+        raise AssertionError(
+            'Загруженное изображение должно декодироваться только в '
+            'песочнице.'
+        )
+
+    image = SimpleUploadedFile(
+        'wide.jpg', make_image_bytes((120, 80)), content_type='image/jpeg'
+    )
+    # Плагины Pillow при первой загрузке сами создают изображения.
+    Image.init()
+    # Процессы песочницы запускает forkserver: подмена их не касается.
+    monkeypatch.setattr(Image.Image, 'load', load)
+    user_client.post('/posts/create/', data={
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+        'location': published_location.pk,
+        'is_published': True,
+        'image': image,
+    })
+    meta = PostImage.objects.get()
+    assert (meta.width, meta.height) == (120, 80)
+    assert meta.placeholder.startswith('data:image/jpeg;base64,')
+
+    soup = BeautifulSoup(user_client.get('/').content, 'html.parser')
+    img = soup.find('img', src=meta.post.image.url)
+    assert img['width'] == '120' and img['height'] == '80', (
+        'Убедитесь, что карточка публикации выводит размеры изображения.'
+    )
+
+
+@pytest.mark.django_db
+def test_backfill_and_lazy_loading(
+        mixer, user, published_category, media_root, uploaded_image,
+        client):
+    posts = mixer.cycle(3).blend(
+        'blog.Post', author=user, category=published_category,
+        image=uploaded_image, is_published=True,
+    )
+    assert not PostImage.objects.exists()
+
+    call_command('backfill_image_info', batch_size=2, stdout=None)
+
+    assert PostImage.objects.filter(width=100, height=100).count() == 3
+    imgs = BeautifulSoup(
+        client.get('/').content, 'html.parser'
+    ).select('article img')
+    assert len(imgs) == len(posts)
+    assert 'loading' not in imgs[0].attrs, (
+        'Первая карточка ленты должна загружаться без loading="lazy".'
+    )
+    assert all(img.get('loading') == 'lazy' for img in imgs[1:])
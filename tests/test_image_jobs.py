@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from PIL import Image
+
+from blog.images import enqueue_image_job, process_jobs, requeue_stale_jobs
+from blog.models import ImageJob, Post
+
+
+@pytest.mark.django_db
+def test_card_rendered_by_job(
+        mixer, user, published_category, media_root, uploaded_image):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        image=uploaded_image,
+    )
+    assert post.card_image == post.image, (
+        'Пока превью не готово, карточка должна показывать оригинал.'
+    )
+    job = enqueue_image_job(post)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert process_jobs(executor, batch_size=10) == (1, 1)
+
+    job.refresh_from_db()
+    post = Post.objects.select_related('image_meta').get(pk=post.pk)
+    assert job.status == ImageJob.Status.DONE
+    assert post.image_meta.card, 'Убедитесь, что задание сохраняет превью.'
+    assert post.card_image == post.image_meta.card
+    with Image.open(post.card_image.path) as card:
+        assert card.format == 'JPEG'
+
+
+@pytest.mark.django_db
+def test_post_create_enqueues_job(
+        user_client, published_category, published_location, media_root,
+        uploaded_image):
+    response = user_client.post('/posts/create/', data={
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+        'location': published_location.pk,
+        'image': uploaded_image,
+    })
+    assert response.status_code == 302
+    job = ImageJob.objects.get()
+    assert job.status == ImageJob.Status.PENDING, (
+        'Убедитесь, что обработка изображения вынесена из запроса в очередь.'
+    )
+    assert job.post.card_image == job.post.image
+
+
+class BrokenExecutor:
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool('Пул сломан.')
+
+
+@pytest.mark.django_db
+def test_broken_pool_requeues_jobs(
+        mixer, user, published_category, media_root, uploaded_image):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        image=uploaded_image,
+    )
+    job = enqueue_image_job(post)
+    with pytest.raises(BrokenProcessPool):
+        process_jobs(BrokenExecutor(), batch_size=10)
+    job.refresh_from_db()
+    assert job.status == ImageJob.Status.PENDING, (
+        'Задания сломанного пула должны возвращаться в очередь.'
+    )
+    assert job.attempts == 1
+
+
+@pytest.mark.django_db
+def test_stale_running_jobs_requeued(
+        mixer, user, published_category, media_root, uploaded_image):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        image=uploaded_image,
+    )
+    stale = enqueue_image_job(post)
+    exhausted = enqueue_image_job(post)
+    fresh = enqueue_image_job(post)
+    long_ago = timezone.now() - timedelta(hours=1)
+    ImageJob.objects.filter(pk=stale.pk).update(
+        status=ImageJob.Status.RUNNING, claimed_at=long_ago, attempts=1,
+    )
+    ImageJob.objects.filter(pk=exhausted.pk).update(
+        status=ImageJob.Status.RUNNING, claimed_at=long_ago, attempts=3,
+    )
+    ImageJob.objects.filter(pk=fresh.pk).update(
+        status=ImageJob.Status.RUNNING, claimed_at=timezone.now(),
+        attempts=1,
+    )
+    assert requeue_stale_jobs(timeout=600) == 1
+    statuses = dict(ImageJob.objects.values_list('pk', 'status'))
+    assert statuses == {
+        stale.pk: ImageJob.Status.PENDING,
+        exhausted.pk: ImageJob.Status.FAILED,
+        fresh.pk: ImageJob.Status.RUNNING,
+    }, (
+        'Зависшие задания должны возвращаться в очередь, а исчерпавшие '
+        'попытки — помечаться ошибкой.'
+    )
@@ -0,0 +1,201 @@
+import threading
+from http import HTTPStatus
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from django.template import Context, Template
+from django.test import override_settings
+from PIL import Image
+
+from blog import media
+from blog.media import resized_url, variant_source
+from fixtures.media import make_image_bytes
+
+
+@pytest.fixture
+def media_file(media_root):
+    path = media_root / 'posts_images' / 'photo.jpg'
+    path.parent.mkdir()
+    path.write_bytes(bytes(range(256)) * 4)
+    return path
+
+
+def read(response):
+    return b''.join(response.streaming_content)
+
+
+def test_full_response(client, media_file):
+    response = client.get('/media/posts_images/photo.jpg')
+    assert response.status_code == HTTPStatus.OK
+    assert response['Content-Type'] == 'image/jpeg'
+    assert response['Accept-Ranges'] == 'bytes'
+    assert response['ETag'].startswith('"')
+    assert read(response) == media_file.read_bytes()
+
+
+def test_range_request(client, media_file):
+    response = client.get(
+        '/media/posts_images/photo.jpg', HTTP_RANGE='bytes=10-19'
+    )
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT, (
+        'Убедитесь, что медиафайлы поддерживают запросы с заголовком Range.'
+    )
+    assert response['Content-Range'] == 'bytes 10-19/1024'
+    assert read(response) == media_file.read_bytes()[10:20]
+
+    response = client.get(
+        '/media/posts_images/photo.jpg', HTTP_RANGE='bytes=-4'
+    )
+    assert read(response) == media_file.read_bytes()[-4:]
+
+    response = client.get(
+        '/media/posts_images/photo.jpg', HTTP_RANGE='bytes=5000-'
+    )
+    assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+
+
+def test_if_range_and_not_modified(client, media_file):
+    etag = client.get('/media/posts_images/photo.jpg')['ETag']
+    response = client.get(
+        '/media/posts_images/photo.jpg',
+        HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"',
+    )
+    assert response.status_code == HTTPStatus.OK
+    response = client.get(
+        '/media/posts_images/photo.jpg',
+        HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag,
+    )
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    response = client.get(
+        '/media/posts_images/photo.jpg', HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+
+
+def test_accel_redirect(client, media_file):
+    with override_settings(MEDIA_ACCEL_REDIRECT='x-accel-redirect'):
+        response = client.get('/media/posts_images/photo.jpg')
+    assert response['X-Accel-Redirect'] == (
+        '/protected-media/posts_images/photo.jpg'
+    )
+    assert response.content == b''
+
+
+def test_path_traversal(client, media_file):
+    response = client.get('/media/../settings.py')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.fixture
+def post_image(media_root):
+    path = media_root / 'posts_images' / 'card.jpg'
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(make_image_bytes((400, 300)))
+    return path
+
+
+def test_webp_negotiation(client, media_root, post_image):
+    response = client.get(
+        '/media/posts_images/card.jpg',
+        HTTP_ACCEPT='image/avif,image/webp,*/*',
+    )
+    assert response['Content-Type'] == 'image/webp', (
+        'Убедитесь, что браузерам с поддержкой WebP отдаётся WebP-вариант.'
+    )
+    assert 'Accept' in response['Vary']
+    assert read(response)[8:12] == b'WEBP'
+    assert (
+        media_root / 'cache' / 'webp' / 'posts_images' / 'card.jpg.webp'
+    ).exists()
+
+    response = client.get(
+        '/media/posts_images/card.jpg', HTTP_ACCEPT='image/png,*/*'
+    )
+    assert response['Content-Type'] == 'image/jpeg'
+    assert 'Accept' in response['Vary']
+
+
+def test_resized_variant(client, media_root, post_image):
+    url = resized_url('posts_images/card.jpg', 200, 200)
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что по подписанному адресу отдаётся уменьшенная копия.'
+    )
+    assert response['Content-Type'] == 'image/jpeg'
+    with Image.open(BytesIO(read(response))) as image:
+        assert image.size == (200, 150)
+    variant = (
+        media_root / 'cache' / 'r' / '200x200' / 'posts_images'
+        / 'card.jpg.jpg'
+    )
+    assert variant.exists(), 'Убедитесь, что копия сохраняется на диск.'
+    assert variant_source(
+        'cache/r/200x200/posts_images/card.jpg.jpg'
+    ) == 'posts_images/card.jpg'
+
+    post_image.unlink()
+    assert client.get(url).status_code == HTTPStatus.OK, (
+        'Убедитесь, что повторный запрос отдаёт копию из кеша.'
+    )
+
+
+def test_resized_variant_requires_signature(client, post_image):
+    url = resized_url('posts_images/card.jpg', 200, 200)
+    assert client.get(
+        url.replace('200x200', '300x300')
+    ).status_code == HTTPStatus.NOT_FOUND, (
+        'Убедитесь, что размер нельзя изменить без новой подписи.'
+    )
+    assert client.get(
+        url.split('?')[0]
+    ).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_resize_concurrency_limit(client, post_image, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(media, 'resize_slots', slots)
+    with override_settings(BLOG_IMAGE_RESIZE_WAIT=0):
+        response = client.get(resized_url('posts_images/card.jpg', 64, 64))
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        'Убедитесь, что при занятых слотах ресайза отдаётся 503.'
+    )
+    assert 'Retry-After' in response
+
+
+def test_webp_uses_resize_slots(client, media_root, post_image,
+                                monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(media, 'resize_slots', slots)
+    with override_settings(BLOG_IMAGE_RESIZE_WAIT=0):
+        response = client.get('/media/posts_images/card.jpg',
+                              HTTP_ACCEPT='image/webp,*/*')
+    assert response['Content-Type'] == 'image/jpeg', (
+        'Пока слоты кодирования заняты, должен отдаваться оригинал.'
+    )
+    assert not (
+        media_root / 'cache' / 'webp' / 'posts_images' / 'card.jpg.webp'
+    ).exists()
+
+
+def test_webp_of_broken_image(client, media_root, post_image):
+    post_image.write_bytes(b'not an image')
+    response = client.get('/media/posts_images/card.jpg',
+                          HTTP_ACCEPT='image/webp,*/*')
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        'Нечитаемое изображение не должно приводить к ошибке сервера.'
+    )
+
+
+def test_resized_url_tag(post_image):
+    template = Template(
+        '{% load blog_images %}{% resized_url image 320 240 %}'
+    )
+    rendered = template.render(Context({
+        'image': SimpleNamespace(name='posts_images/card.jpg'),
+    }))
+    assert rendered == resized_url('posts_images/card.jpg', 320, 240)
+    assert rendered.startswith('/media/r/320x240/posts_images/card.jpg?s=')
@@ -0,0 +1,45 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.uploadhandlers import StreamingImageUploadHandler
+
+
+@pytest.fixture
+def fail_on_body_parsing(monkeypatch):
+    def new_file(*args, **kwargs):
+        raise AssertionError(
+            'Убедитесь, что авторство публикации проверяется до разбора '
+            'тела запроса.'
+        )
+    monkeypatch.setattr(StreamingImageUploadHandler, 'new_file', new_file)
+
+
+@pytest.mark.django_db
+def test_edit_by_another_user_refused_before_upload(
+        another_user_client, post_with_published_location, uploaded_image,
+        fail_on_body_parsing):
+    post = post_with_published_location
+    response = another_user_client.post(
+        f'/posts/{post.id}/edit/',
+        data={'title': 'Чужой заголовок', 'image': uploaded_image},
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert response.url == f'/posts/{post.id}/'
+    post.refresh_from_db()
+    assert post.title != 'Чужой заголовок'
+
+
+@pytest.mark.django_db
+def test_delete_by_another_user_refused(
+        another_user_client, post_with_published_location):
+    post = post_with_published_location
+    response = another_user_client.post(f'/posts/{post.id}/delete/')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert type(post).objects.filter(pk=post.pk).exists()
+
+
+@pytest.mark.django_db
+def test_edit_missing_post(user_client):
+    response = user_client.get('/posts/999999/edit/')
+    assert response.status_code == HTTPStatus.NOT_FOUND
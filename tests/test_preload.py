@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from django.test import override_settings
+
+from blogicum.middleware import EarlyHintsMiddleware, preload_links
+
+
+@pytest.fixture(autouse=True)
+def clear_links():
+    preload_links.cache_clear()
+    yield
+    preload_links.cache_clear()
+
+
+@pytest.mark.django_db
+def test_preload_link_header(client):
+    response = client.get('/')
+    assert response['Link'] == (
+        '</static/css/bootstrap.min.css>; rel=preload; as=style, '
+        '</static/img/logo.png>; rel=preload; as=image'
+    ), 'Убедитесь, что страницы сообщают о критичных ресурсах в Link.'
+
+
+@pytest.mark.django_db
+@override_settings(PRELOAD_ASSETS=(('css/bootstrap.min.css', 'style'),))
+def test_no_preload_for_error_pages(client):
+    response = client.get('/no-such-page/')
+    assert response.status_code == 404
+    assert not response.has_header('Link')
+
+
+def run_asgi(scope):
+    messages = []
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200})
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(EarlyHintsMiddleware(app)(scope, None, send))
+    return [message['type'] for message in messages], messages
+
+
+def test_early_hints_sent_when_supported():
+    types, messages = run_asgi({
+        'type': 'http', 'method': 'GET', 'path': '/',
+        'extensions': {'http.response.early_hint': {}},
+    })
+    assert types == ['http.response.early_hint', 'http.response.start'], (
+        'Убедитесь, что 103 Early Hints отправляется до ответа.'
+    )
+    assert messages[0]['links'][0].startswith(b'</static/css/')
+
+
+@pytest.mark.parametrize(
+    'scope',
+    [
+        {'type': 'http', 'method': 'GET', 'path': '/'},
+        {'type': 'http', 'method': 'POST', 'path': '/',
+         'extensions': {'http.response.early_hint': {}}},
+        {'type': 'http', 'method': 'GET', 'path': '/media/a.jpg',
+         'extensions': {'http.response.early_hint': {}}},
+    ],
+    ids=['unsupported', 'post', 'media'],
+)
+def test_early_hints_skipped(scope):
+    assert run_asgi(scope)[0] == ['http.response.start']
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import Post
+from blog.routers import PrimaryReplicaRouter, use_primary
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica']
+)
+
+
+@pytest.fixture(autouse=True)
+def replicas():
+    with override_settings(DATABASE_REPLICAS=['replica']):
+        yield
+
+
+def test_router_reads_from_replica():
+    router = PrimaryReplicaRouter()
+    assert router.db_for_read(Post) == 'replica'
+    assert router.db_for_write(Post) == 'default'
+    with use_primary():
+        assert router.db_for_read(Post) is None, (
+            'Убедитесь, что внутри use_primary() чтения идут в default.'
+        )
+    with override_settings(DATABASE_REPLICAS=[]):
+        assert router.db_for_read(Post) is None
+    assert not router.allow_migrate('replica', 'blog')
+
+
+def test_replica_sees_primary_data(post_with_published_location):
+    post = Post.objects.get(pk=post_with_published_location.pk)
+    assert post._state.db == 'replica'
+    post.title = 'Изменённый заголовок'
+    post.save()
+    assert Post.objects.using('default').get(pk=post.pk).title == (
+        'Изменённый заголовок'
+    )
+
+
+def test_index_reads_from_replica(user_client, post_with_published_location):
+    with CaptureQueriesContext(connections['replica']) as queries:
+        response = user_client.get(reverse('blog:index'))
+    assert response.status_code == 200
+    assert queries.captured_queries, (
+        'Убедитесь, что главная страница читает публикации с реплики.'
+    )
+
+
+def test_reads_pinned_after_post(user_client, post_with_published_location):
+    url = reverse('blog:add_comment', args=[post_with_published_location.pk])
+    with CaptureQueriesContext(connections['replica']) as queries:
+        user_client.post(url, data={'text': 'Комментарий'})
+        response = user_client.get(reverse('blog:index'))
+    assert response.status_code == 200
+    assert not queries.captured_queries, (
+        'Убедитесь, что после изменяющего запроса пользователь читает '
+        'из основной базы.'
+    )
+
+
+def test_sticky_window_expires(user_client, post_with_published_location):
+    url = reverse('blog:add_comment', args=[post_with_published_location.pk])
+    with override_settings(REPLICA_STICKY_SECONDS=0):
+        user_client.post(url, data={'text': 'Комментарий'})
+    with CaptureQueriesContext(connections['replica']) as queries:
+        user_client.get(reverse('blog:index'))
+    assert queries.captured_queries
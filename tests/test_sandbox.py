@@ -0,0 +1,93 @@
+import multiprocessing
+import subprocess
+import sys
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from blog import sandbox
+from blog.models import Post
+from fixtures.media import make_image_bytes
+
+
+def write_image(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def write_large_image(path):
+    # Картинка создаётся в отдельном процессе: иначе освобождённая после
+    # неё память осталась бы в куче, унаследованной процессом песочницы.
+    subprocess.run([
+        sys.executable, '-c',
+        'import sys; from PIL import Image; '
+        'Image.new("RGB", (6000, 6000), "navy").save(sys.argv[1], "PNG")',
+        str(path),
+    ], check=True)
+    return str(path)
+
+
+def test_sandbox_returns_image_meta(tmp_path):
+    path = write_image(tmp_path / 'photo.png', make_image_bytes(
+        (120, 80), 'PNG'
+    ))
+    meta = sandbox.inspect_path(path)
+    assert (meta.format, meta.width, meta.height) == ('PNG', 120, 80), (
+        'Убедитесь, что песочница возвращает формат и размеры изображения.'
+    )
+    assert meta.orientation == 1
+    assert meta.info()['placeholder'].startswith('data:image/jpeg;base64,')
+
+
+def test_sandbox_rejects_truncated_image(tmp_path):
+    data = make_image_bytes((400, 400))
+    path = write_image(tmp_path / 'photo.jpg', data[:len(data) // 2])
+    with pytest.raises(sandbox.ImageRejected):
+        sandbox.inspect_path(path)
+
+
+def test_sandbox_rejects_image_over_memory_limit(tmp_path):
+    path = write_large_image(tmp_path / 'photo.png')
+    with override_settings(BLOG_IMAGE_SANDBOX_MEMORY=16 * 1024 * 1024):
+        with pytest.raises(sandbox.ImageRejected):
+            sandbox.inspect_path(path)
+    small = write_image(tmp_path / 'small.png', make_image_bytes(
+        (10, 10), 'PNG'
+    ))
+    assert sandbox.inspect_path(small).width == 10, (
+        'Убедитесь, что песочница работает после отказа.'
+    )
+
+
+def test_sandbox_timeout_kills_only_its_process(tmp_path):
+    path = write_image(tmp_path / 'photo.png', make_image_bytes(
+        (120, 80), 'PNG'
+    ))
+    with override_settings(BLOG_IMAGE_SANDBOX_TIMEOUT=0):
+        with pytest.raises(sandbox.ImageRejected):
+            sandbox.inspect_path(path)
+    assert not multiprocessing.active_children(), (
+        'Процесс проверки, не уложившийся в таймаут, должен завершаться.'
+    )
+    assert sandbox.inspect_path(path).width == 120
+
+
+@pytest.mark.django_db
+def test_post_form_rejects_image_failing_in_sandbox(
+        user_client, published_category, published_location, media_root):
+    data = make_image_bytes((400, 400))
+    response = user_client.post('/posts/create/', data={
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+        'location': published_location.pk,
+        'image': SimpleUploadedFile(
+            'photo.jpg', data[:len(data) // 2], content_type='image/jpeg'
+        ),
+    })
+    assert not Post.objects.exists(), (
+        'Убедитесь, что повреждённое изображение не проходит проверку формы.'
+    )
+    assert 'image' in response.context['form'].errors
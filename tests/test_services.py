@@ -0,0 +1,100 @@
+from io import StringIO
+
+import pytest
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from blog.middleware import WriteCoordinationMiddleware
+from blog.models import Comment, Post
+from blog.services import delete_in_batches
+
+
+@pytest.fixture
+def prolific_user(mixer, user, another_user, published_category,
+                  published_location, media_root):
+    posts = mixer.cycle(5).blend(
+        'blog.Post', author=user, category=published_category,
+        location=published_location,
+    )
+    for post in posts:
+        mixer.blend('blog.Comment', post=post, author=another_user)
+    kept = mixer.blend('blog.Post', author=another_user,
+                       category=published_category, location=None)
+    mixer.cycle(3).blend('blog.Comment', post=kept, author=user)
+    return kept
+
+
+@pytest.mark.django_db
+def test_delete_user_in_batches(user, prolific_user):
+    calls = []
+    with CaptureQueriesContext(connection) as queries:
+        stats = delete_in_batches(
+            user, batch_size=2, pause=0,
+            progress=lambda *args: calls.append(args),
+        )
+    assert stats[('deleted', 'blog.Post')] == 5
+    assert stats[('deleted', 'blog.Comment')] == 8
+    assert stats[('deleted', 'auth.User')] == 1
+    assert not Post.objects.filter(author=user).exists()
+    assert list(Comment.objects.values_list('post', flat=True)) == [], (
+        'Комментарии удалённого пользователя и к его публикациям должны '
+        'быть удалены.'
+    )
+    assert Post.objects.filter(pk=prolific_user.pk).exists(), (
+        'Публикации других авторов удалять нельзя.'
+    )
+    deletes = [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('DELETE FROM "blog_post"')
+    ]
+    assert len(deletes) == 3, (
+        'Публикации должны удаляться пачками по batch_size.'
+    )
+    assert ('deleted', 'blog.Post', 1, 5) in calls, (
+        'После каждой пачки должен сообщаться прогресс.'
+    )
+
+
+@pytest.mark.django_db
+def test_delete_location_nulls_posts(published_location, prolific_user):
+    stats = delete_in_batches(published_location, batch_size=2, pause=0)
+    assert stats[('nulled', 'blog.Post')] == 5
+    assert Post.objects.count() == 6
+    assert not Post.objects.filter(location__isnull=False).exists(), (
+        'При удалении местоположения ссылки публикаций должны обнуляться.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delete_batched_command(user, prolific_user):
+    out = StringIO()
+    call_command('delete_batched', 'user', str(user.pk), batch_size=3,
+                 pause=0, stdout=out)
+    assert 'deleted blog.Post: +3 (всего 3)' in out.getvalue()
+    assert Post.objects.count() == 1
+    assert Comment.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_admin_action(admin_client, user, prolific_user):
+    response = admin_client.post('/admin/blog/post/', {
+        'action': 'delete_in_batches',
+        ACTION_CHECKBOX_NAME: [prolific_user.pk],
+    }, follow=True)
+    assert 'blog.Post — удалено 1' in response.content.decode()
+    assert not Post.objects.filter(pk=prolific_user.pk).exists()
+    assert Post.objects.count() == 5
+
+
+def test_changelist_runs_without_request_transaction():
+    view = resolve('/admin/blog/post/').func
+    middleware = WriteCoordinationMiddleware(lambda request: None)
+    request = RequestFactory().post('/admin/blog/post/')
+    assert middleware.process_view(request, view, (), {}) is None, (
+        'Пакетное удаление в админке не должно попадать в одну '
+        'транзакцию запроса.'
+    )
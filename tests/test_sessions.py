@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.backends.auth import CachedModelBackend
+from blog.sessions.cached_db import SessionStore
+
+CACHED_MODE = {
+    'SESSION_ENGINE': 'blog.sessions.cached_db',
+    'AUTHENTICATION_BACKENDS': ['blog.backends.auth.CachedModelBackend'],
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def stored(session_key):
+    return Session.objects.get(pk=session_key).get_decoded()
+
+
+@pytest.mark.django_db
+def test_session_write_behind(settings):
+    settings.SESSION_WRITE_BEHIND_SECONDS = 60
+    session = SessionStore()
+    session['step'] = 1
+    session.save()
+    assert stored(session.session_key) == {'step': 1}, (
+        'Новая сессия должна сразу записываться в БД.'
+    )
+    session['step'] = 2
+    session.save()
+    assert stored(session.session_key) == {'step': 1}, (
+        'Изменения сессии должны попадать в БД не чаще '
+        'SESSION_WRITE_BEHIND_SECONDS.'
+    )
+    assert SessionStore(session.session_key)['step'] == 2
+
+    settings.SESSION_WRITE_BEHIND_SECONDS = 0
+    session['step'] = 3
+    session.save()
+    assert stored(session.session_key) == {'step': 3}
+
+
+@pytest.mark.django_db
+def test_session_row_recreated(settings):
+    settings.SESSION_WRITE_BEHIND_SECONDS = 0
+    session = SessionStore()
+    session['step'] = 1
+    session.save()
+    Session.objects.all().delete()
+    session['step'] = 2
+    session.save()
+    assert stored(session.session_key) == {'step': 2}, (
+        'Удалённая строка живой сессии должна создаваться заново.'
+    )
+
+
+@pytest.mark.django_db
+def test_cached_user(user, django_assert_num_queries):
+    backend = CachedModelBackend()
+    assert backend.get_user(user.pk) == user
+    with django_assert_num_queries(0):
+        assert backend.get_user(user.pk) == user
+    user.first_name = 'Новое'
+    user.save()
+    assert backend.get_user(user.pk).first_name == 'Новое', (
+        'После сохранения пользователя кеш должен сбрасываться.'
+    )
+
+
+@pytest.mark.django_db
+def test_authenticated_request_without_session_queries(client, user,
+                                                       settings):
+    for name, value in CACHED_MODE.items():
+        setattr(settings, name, value)
+    client.force_login(user)
+    client.get(reverse('blog:index'))
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('blog:index'))
+    assert response.context['user'] == user
+    tables = ' '.join(query['sql'] for query in queries.captured_queries)
+    assert 'django_session' not in tables and 'auth_user"' not in tables, (
+        'Сессия и пользователь должны браться из кеша.'
+    )
+
+    client.post(reverse('blog:edit_profile'), {
+        'username': user.username, 'first_name': 'Изменено',
+        'last_name': '', 'email': 'changed@example.com',
+    })
+    response = client.get(reverse('blog:index'))
+    assert response.context['user'].first_name == 'Изменено', (
+        'После редактирования профиля пользователь в кеше должен '
+        'обновляться.'
+    )
+
+    user.set_password('another-secret-42')
+    user.save()
+    response = client.get(reverse('blog:index'))
+    assert not response.context['user'].is_authenticated, (
+        'После смены пароля прежние сессии должны становиться '
+        'недействительными.'
+    )
+
+
+@pytest.mark.django_db
+def test_purge_sessions(settings):
+    settings.SESSION_WRITE_BEHIND_SECONDS = 60
+    now = timezone.now()
+    for number, age in enumerate((3600, 3600, 3600, 30, -3600)):
+        Session.objects.create(
+            session_key=f'session{number}', session_data='',
+            expire_date=now - timedelta(seconds=age),
+        )
+    call_command('purge_sessions', batch_size=2, pause=0, stdout=StringIO())
+    assert sorted(Session.objects.values_list('pk', flat=True)) == [
+        'session3', 'session4',
+    ], (
+        'Удаляться должны только сессии, просроченные дольше '
+        'SESSION_WRITE_BEHIND_SECONDS.'
+    )
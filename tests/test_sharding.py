@@ -0,0 +1,301 @@
+from datetime import timedelta
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog import sharding, views
+from blog.management.commands import rebalance_shards
+from blog.models import ArchivedPost, Category, Comment, Post, PostImage
+from blog.sharding import claim_worker_id, next_id, shard_for_author
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+SHARDS = ['default', 'shard1', 'shard2']
+
+
+@pytest.fixture(autouse=True)
+def shards(transactional_db, tmp_path):
+    # Шарды — отдельные файлы SQLite, подключаемые только на время теста.
+    with override_settings(BLOG_SHARDS=SHARDS,
+                           BLOG_ID_WORKER_DIR=tmp_path / 'id_workers'):
+        for alias in SHARDS[1:]:
+            connections.settings[alias] = {
+                **connections.settings['default'],
+                'NAME': str(tmp_path / f'{alias}.sqlite3'),
+                'TEST': {},
+            }
+            connections.ensure_defaults(alias)
+            connections.prepare_test_settings(alias)
+            call_command('migrate', database=alias, verbosity=0)
+        yield
+    for alias in SHARDS[1:]:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+@pytest.fixture
+def authors():
+    User = get_user_model()
+    return [
+        User.objects.create_user(f'author{number}')
+        for number in range(len(SHARDS))
+    ]
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(
+        title='Категория', description='Описание', slug='category'
+    )
+
+
+def make_post(author, category, days_ago, **kwargs):
+    post = Post(
+        title=f'{author.username} {days_ago}', text='Текст', author=author,
+        category=category,
+        pub_date=timezone.now() - timedelta(days=days_ago), **kwargs,
+    )
+    post.save()
+    return post
+
+
+def stored_in(model, pk):
+    return [
+        alias for alias in SHARDS
+        if model.objects.using(alias).filter(pk=pk).exists()
+    ]
+
+
+def test_post_and_comments_stored_in_author_shard(authors, category):
+    shards = {shard_for_author(author.pk) for author in authors}
+    assert shards == set(SHARDS), (
+        'Убедитесь, что авторы распределяются по всем шардам.'
+    )
+    for author in authors:
+        post = make_post(author, category, 1)
+        comment = Comment(text='Комментарий', post=post, author=authors[0])
+        comment.save()
+        assert stored_in(Post, post.pk) == [shard_for_author(author.pk)]
+        assert stored_in(Comment, comment.pk) == [
+            shard_for_author(author.pk)
+        ], 'Убедитесь, что комментарий хранится в шарде своей публикации.'
+    assert category.pk in Category.objects.using('shard1').values_list(
+        'pk', flat=True
+    ), 'Убедитесь, что справочные таблицы копируются на шарды.'
+
+
+def on_shard(authors):
+    return next(
+        author for author in authors
+        if shard_for_author(author.pk) != 'default'
+    )
+
+
+def test_objects_create_uses_shard(authors, category):
+    author = on_shard(authors)
+    post = Post.objects.create(
+        title='Заголовок', text='Текст', author=author, category=category,
+        pub_date=timezone.now(),
+    )
+    comment = Comment.objects.create(text='Комментарий', post=post,
+                                     author=authors[0])
+    assert stored_in(Post, post.pk) == [shard_for_author(author.pk)], (
+        'Убедитесь, что Post.objects.create() пишет в шард автора.'
+    )
+    assert stored_in(Comment, comment.pk) == [shard_for_author(author.pk)]
+    with pytest.raises(ValueError):
+        Comment.objects.bulk_create(
+            [Comment(text='Комментарий', post=post, author=author)]
+        )
+
+
+def test_feed_merges_shards(client, authors, category):
+    posts = [
+        make_post(authors[day % len(authors)], category, day)
+        for day in range(1, 14)
+    ]
+    response = client.get(reverse('blog:index'))
+    assert [post.pk for post in response.context['page_obj']] == [
+        post.pk for post in posts[:10]
+    ], 'Убедитесь, что лента сливает шарды в порядке -pub_date.'
+    assert response.context['paginator'].count == 13
+    response = client.get(reverse('blog:index'), {'page': 2})
+    assert [post.pk for post in response.context['page_obj']] == [
+        post.pk for post in posts[10:]
+    ]
+
+
+def test_category_feed_merges_shards(client, authors, category):
+    posts = [make_post(author, category, 1) for author in authors]
+    response = client.get(
+        reverse('blog:category_posts', args=[category.slug])
+    )
+    assert {post.pk for post in response.context['page_obj']} == {
+        post.pk for post in posts
+    }
+
+
+def test_profile_reads_single_shard(client, authors, category):
+    author = authors[1]
+    post = make_post(author, category, 1)
+    others = [alias for alias in SHARDS
+              if alias != shard_for_author(author.pk)]
+    with CaptureQueriesContext(connections[others[0]]) as first, \
+            CaptureQueriesContext(connections[others[1]]) as second:
+        response = client.get(reverse('blog:profile', args=[author.username]))
+    assert [item.pk for item in response.context['page_obj']] == [post.pk]
+    post_queries = [
+        query['sql'] for query in
+        first.captured_queries + second.captured_queries
+        if 'blog_post' in query['sql']
+    ]
+    assert not post_queries, (
+        'Убедитесь, что страница профиля читает публикации только из '
+        'шарда автора.'
+    )
+
+
+def test_detail_and_comment_on_shard(client, authors, category):
+    post = make_post(authors[2], category, 1)
+    client.force_login(authors[0])
+    url = reverse('blog:post_detail', args=[post.pk])
+    assert client.get(url).status_code == 200
+    client.post(reverse('blog:add_comment', args=[post.pk]),
+                {'text': 'Комментарий'})
+    comment = Comment.objects.using(shard_for_author(post.author_id)).get()
+    assert comment.post_id == post.pk
+    response = client.get(url)
+    assert list(response.context['comments']) == [comment]
+
+
+def test_comment_write_locks_post_shard(client, authors, category,
+                                        monkeypatch):
+    post = make_post(on_shard(authors), category, 1)
+    aliases = []
+    write_transaction = views.write_transaction
+
+    def recording_transaction(using=None):
+        aliases.append(using)
+        return write_transaction(using)
+
+    monkeypatch.setattr(views, 'write_transaction', recording_transaction)
+    client.force_login(authors[0])
+    client.post(reverse('blog:add_comment', args=[post.pk]),
+                {'text': 'Комментарий'})
+    assert aliases == [shard_for_author(post.author_id)], (
+        'Убедитесь, что запись комментария блокирует шард публикации.'
+    )
+
+
+def test_rebalance_moves_posts(authors, category):
+    with override_settings(BLOG_SHARDS=['default']):
+        posts = [make_post(author, category, 1) for author in authors]
+        comments = [
+            Comment.objects.create(text='Комментарий', post=post,
+                                   author=authors[0])
+            for post in posts
+        ]
+    call_command('rebalance_shards', verbosity=0)
+    for post, comment in zip(posts, comments):
+        shard = shard_for_author(post.author_id)
+        assert stored_in(Post, post.pk) == [shard], (
+            'Убедитесь, что rebalance_shards переносит публикации в шард '
+            'автора.'
+        )
+        assert stored_in(Comment, comment.pk) == [shard]
+
+
+def test_rebalance_moves_in_batches(authors, category, monkeypatch):
+    author = on_shard(authors)
+    with override_settings(BLOG_SHARDS=['default']):
+        posts = [make_post(author, category, days) for days in range(3)]
+        for post in posts:
+            for _ in range(2):
+                Comment.objects.create(text='Комментарий', post=post,
+                                       author=author)
+    batches = []
+    copy = rebalance_shards.Command.copy
+
+    def recording_copy(self, model, rows, target):
+        batches.append(len(rows))
+        return copy(self, model, rows, target)
+
+    monkeypatch.setattr(rebalance_shards.Command, 'copy', recording_copy)
+    call_command('rebalance_shards', batch_size=1, pause=0, verbosity=0)
+    assert batches == [1] * 9, (
+        'Убедитесь, что rebalance_shards копирует строки пачками '
+        'не больше --batch-size.'
+    )
+    shard = shard_for_author(author.pk)
+    assert Comment.objects.using(shard).count() == 6
+    assert not Comment.objects.using('default').exists()
+
+
+def test_archive_on_author_shard(client, authors, category):
+    post = make_post(authors[1], category, 1000)
+    Comment(text='Старый', post=post, author=authors[2]).save()
+    call_command('archive_posts', days=365, pause=0, stdout=StringIO())
+    shard = shard_for_author(post.author_id)
+    assert stored_in(Post, post.pk) == []
+    assert stored_in(ArchivedPost, post.pk) == [shard], (
+        'Убедитесь, что архивная публикация остаётся в шарде автора.'
+    )
+    response = client.get(reverse('blog:post_detail', args=[post.pk]))
+    assert [comment.text for comment in response.context['comments']] == [
+        'Старый'
+    ]
+
+
+def test_worker_ids_not_shared(tmp_path, monkeypatch):
+    first, first_lock = claim_worker_id(tmp_path)
+    second, second_lock = claim_worker_id(tmp_path)
+    assert first != second, (
+        'Живые процессы не должны получать один номер для идентификаторов.'
+    )
+    first_lock.close()
+    assert claim_worker_id(tmp_path)[0] == first, (
+        'Номер завершившегося процесса должен освобождаться.'
+    )
+    second_lock.close()
+
+    monkeypatch.setattr(sharding, 'current_millis', lambda: 1)
+    monkeypatch.setattr(sharding, '_last_millis', 0)
+    assert len({next_id() for _ in range(100)}) == 100
+
+
+def test_backfill_reads_all_shards(authors, category, media_root,
+                                   uploaded_image):
+    posts = [
+        make_post(author, category, 1, image=uploaded_image)
+        for author in authors
+    ]
+    call_command('backfill_image_info', stdout=StringIO())
+    for post in posts:
+        assert stored_in(PostImage, post.pk) == [
+            shard_for_author(post.author_id)
+        ], 'Убедитесь, что backfill_image_info обходит все шарды.'
+
+
+def test_export_reads_all_shards(authors, category, tmp_path):
+    posts = [make_post(author, category, 1) for author in authors]
+    target = tmp_path / 'db.json'
+    call_command('export_blog', str(target), '--format', 'json',
+                 stdout=StringIO())
+    exported = json.loads(target.read_text(encoding='utf-8'))
+    assert sorted(
+        item['pk'] for item in exported if item['model'] == 'blog.post'
+    ) == sorted(post.pk for post in posts), (
+        'Убедитесь, что export_blog выгружает публикации со всех шардов.'
+    )
+    assert len([
+        item for item in exported if item['model'] == 'auth.user'
+    ]) == len(authors), 'Справочные таблицы выгружаются один раз.'
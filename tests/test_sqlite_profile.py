@@ -0,0 +1,45 @@
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import override_settings
+
+
+pytestmark = pytest.mark.django_db
+
+
+def open_database(path):
+    wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': str(path)})
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def test_production_pragmas_applied(tmp_path):
+    pragmas = settings.SQLITE_PROFILES['production']['PRAGMAS']
+    with override_settings(SQLITE_PRAGMAS=pragmas):
+        wrapper = open_database(tmp_path / 'db.sqlite3')
+    try:
+        assert pragma(wrapper, 'journal_mode') == 'wal', (
+            'Убедитесь, что профиль production включает журнал WAL.'
+        )
+        assert pragma(wrapper, 'synchronous') == 1
+        assert pragma(wrapper, 'temp_store') == 2
+        assert pragma(wrapper, 'busy_timeout') == 5000
+        assert pragma(wrapper, 'cache_size') == pragmas['cache_size']
+    finally:
+        wrapper.close()
+
+
+def test_default_profile_keeps_journal(tmp_path):
+    with override_settings(SQLITE_PRAGMAS={}):
+        wrapper = open_database(tmp_path / 'db.sqlite3')
+    try:
+        assert pragma(wrapper, 'journal_mode') == 'delete'
+    finally:
+        wrapper.close()
@@ -0,0 +1,60 @@
+import gzip
+import json
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+
+from blogicum.middleware import StaticFilesMiddleware
+
+
+@pytest.fixture
+def collected(tmp_path):
+    root = tmp_path / 'static_root'
+    with override_settings(
+            STATIC_ROOT=str(root),
+            STATIC_PIPELINE=True,
+            STATICFILES_STORAGE=(
+                'blogicum.staticfiles.CompressedManifestStaticFilesStorage'
+            )):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        yield root
+
+
+def hashed_css(root):
+    manifest = json.loads((root / 'staticfiles.json').read_text())
+    return manifest['paths']['css/bootstrap.min.css']
+
+
+def test_collectstatic_hashes_and_compresses(collected):
+    name = hashed_css(collected)
+    assert name != 'css/bootstrap.min.css', (
+        'Убедитесь, что имена собранной статики содержат хеш.'
+    )
+    css = (collected / name).read_bytes()
+    assert gzip.decompress((collected / (name + '.gz')).read_bytes()) == css
+    assert not list(collected.rglob('*.html')), (
+        'Убедитесь, что шаблоны не попадают в собранную статику.'
+    )
+
+
+def test_static_middleware(collected):
+    middleware = StaticFilesMiddleware(lambda request: None)
+    name = hashed_css(collected)
+    request = RequestFactory().get(
+        f'/static/{name}', HTTP_ACCEPT_ENCODING='gzip, deflate'
+    )
+    response = middleware(request)
+    assert response.status_code == HTTPStatus.OK
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Content-Type'] == 'text/css'
+    assert 'Accept-Encoding' in response['Vary']
+
+    response = middleware(RequestFactory().get('/static/img/logo.png'))
+    assert response.status_code == HTTPStatus.OK
+    assert 'immutable' not in response['Cache-Control'], (
+        'Убедитесь, что файлы без хеша в имени не кешируются навсегда.'
+    )
+    assert middleware(RequestFactory().get('/static/missing.css')) is None
@@ -0,0 +1,42 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.test import RequestFactory
+
+from blog.media import serve
+from blog.models import MediaBlob
+from blog.storage import ContentAddressedStorage, is_content_addressed
+from fixtures.media import make_image_bytes
+
+
+@pytest.mark.django_db
+def test_identical_uploads_stored_once(media_root):
+    storage = ContentAddressedStorage(location=str(media_root))
+    data = make_image_bytes()
+
+    first = storage.save('posts_images/a.JPG', ContentFile(data))
+    second = storage.save('posts_images/b.jpg', ContentFile(data))
+
+    assert first == second, (
+        'Убедитесь, что одинаковое содержимое получает одно имя файла.'
+    )
+    assert is_content_addressed(first)
+    assert first.startswith('posts_images/') and first.endswith('.jpg')
+    assert MediaBlob.objects.filter(name=first).count() == 1
+
+    storage.delete(first)
+    assert storage.exists(first), (
+        'Общий файл удаляет только gc_media, когда на него не остаётся '
+        'ссылок.'
+    )
+
+
+@pytest.mark.django_db
+def test_content_addressed_media_is_immutable(media_root):
+    storage = ContentAddressedStorage(location=str(media_root))
+    name = storage.save('posts_images/a.jpg', ContentFile(b'data'))
+    response = serve(
+        RequestFactory().get('/media/' + name), name,
+        document_root=str(media_root),
+    )
+    assert response.status_code == 200
+    assert 'immutable' in response['Cache-Control']
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+from blogicum.template_loaders import strip_whitespace
+
+
+def test_strip_whitespace():
+    source = (
+        '<ul>\n    <li>\n      {{ a }}\n    </li>\n\n\n'
+        '    <li><a>1</a> <a>2</a></li>\n</ul>\n'
+        '<pre>\n  код\n\n  ещё\n</pre>\n  <textarea>\n  текст\n</textarea>'
+    )
+    assert strip_whitespace(source) == (
+        '<ul>\n<li>\n{{ a }}\n</li>\n<li><a>1</a> <a>2</a></li>\n</ul>\n'
+        '<pre>\n  код\n\n  ещё\n</pre>\n<textarea>\n  текст\n</textarea>'
+    )
+
+
+def make_backend(dirs, loader='blogicum.template_loaders.FilesystemLoader'):
+    return DjangoTemplates({
+        'NAME': 'test',
+        'DIRS': dirs,
+        'APP_DIRS': False,
+        'OPTIONS': {'loaders': [loader]},
+    })
+
+
+def test_loader_keeps_rendered_text(tmp_path):
+    (tmp_path / 'page.html').write_text(
+        '<div>\n    <p>{{ text|linebreaksbr }}</p>\n</div>\n'
+    )
+    (tmp_path / 'reset_email.html').write_text('Строка\n\n    ссылка\n')
+    backend = make_backend([str(tmp_path)])
+    page = backend.get_template('page.html').render(
+        {'text': 'первая\nвторая'}
+    )
+    email = backend.get_template('reset_email.html').render({})
+    assert page == '<div>\n<p>первая<br>вторая</p>\n</div>\n', (
+        'Убедитесь, что вывод linebreaksbr не изменяется.'
+    )
+    assert email == 'Строка\n\n    ссылка\n', (
+        'Убедитесь, что шаблоны писем не сжимаются.'
+    )
+
+
+def test_loader_shrinks_project_templates():
+    dirs = settings.TEMPLATES[0]['DIRS']
+    plain = make_backend(dirs, 'django.template.loaders.filesystem.Loader')
+    stripped = make_backend(dirs)
+    for name in ('includes/post_card.html', 'includes/paginator.html'):
+        before = plain.engine.get_template(name).source
+        after = stripped.engine.get_template(name).source
+        assert len(after) < len(before)
+        assert '\n ' not in after, (
+            f'Убедитесь, что из {name} убираются отступы.'
+        )
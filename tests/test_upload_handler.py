@@ -0,0 +1,68 @@
+import hashlib
+from http import HTTPStatus
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from blog.models import Post
+from fixtures.media import make_image_bytes
+
+
+@pytest.fixture
+def post_data(published_category, published_location):
+    return {
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+        'location': published_location.pk,
+    }
+
+
+def upload(data, name='photo.jpg'):
+    return SimpleUploadedFile(name, data, content_type='image/jpeg')
+
+
+def incoming_files(media_root):
+    incoming = media_root / 'posts_images' / 'incoming'
+    return list(incoming.iterdir()) if incoming.exists() else []
+
+
+@pytest.mark.django_db
+def test_streamed_image_saved_by_hash(user_client, post_data, media_root):
+    data = make_image_bytes()
+    response = user_client.post(
+        '/posts/create/', data={**post_data, 'image': upload(data)}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    post = Post.objects.get()
+    assert hashlib.sha256(data).hexdigest() in post.image.name
+    assert (media_root / post.image.name).read_bytes() == data
+    assert not incoming_files(media_root), (
+        'Убедитесь, что принятый файл переносится из каталога загрузок.'
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ('data', 'limits'),
+    [
+        (make_image_bytes(), {'BLOG_IMAGE_MAX_BYTES': 100}),
+        (make_image_bytes((50, 50)), {'BLOG_IMAGE_MAX_PIXELS': 100}),
+        (b'not an image' * 100, {'BLOG_IMAGE_SNIFF_BYTES': 256}),
+    ],
+    ids=['bytes', 'pixels', 'not-image'],
+)
+def test_upload_rejected_while_receiving(
+        user_client, post_data, media_root, data, limits):
+    with override_settings(**limits):
+        response = user_client.post(
+            '/posts/create/', data={**post_data, 'image': upload(data)}
+        )
+    assert response.status_code == HTTPStatus.OK
+    assert 'image' in response.context['form'].errors, (
+        'Убедитесь, что неподходящее изображение отклоняется с ошибкой формы.'
+    )
+    assert not Post.objects.exists()
+    assert not incoming_files(media_root)
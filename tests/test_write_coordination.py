@@ -0,0 +1,155 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.test import RequestFactory, override_settings
+
+from blog.backends.sqlite3.base import DatabaseWrapper
+from blog import forms
+from blog.db import retry_on_lock, write_stats, write_transaction
+from blog.forms import PostForm
+from blog.middleware import WriteCoordinationMiddleware
+from blog.models import Post
+from blog.storage import ContentAddressedStorage
+from fixtures.media import make_image_bytes
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def no_delay():
+    write_stats.reset()
+    with override_settings(SQLITE_RETRY_BASE_DELAY=0,
+                           SQLITE_WRITE_RETRIES=3):
+        yield
+
+
+def flaky(failures, error='database is locked'):
+    calls = []
+
+    def func(*args, **kwargs):
+        calls.append(args)
+        if len(calls) <= failures:
+            raise OperationalError(error)
+        return 'ok'
+
+    return func, calls
+
+
+def test_retry_on_lock():
+    func, calls = flaky(2)
+    assert retry_on_lock(func) == 'ok'
+    assert len(calls) == 3
+    assert write_stats.snapshot()['retries'] == 2
+
+
+def test_retry_gives_up():
+    func, calls = flaky(10)
+    with pytest.raises(OperationalError):
+        retry_on_lock(func)
+    assert len(calls) == 4, 'Убедитесь, что число повторов ограничено.'
+    assert write_stats.snapshot()['failures'] == 1
+
+
+def test_other_errors_not_retried():
+    func, calls = flaky(1, 'no such table: blog_post')
+    with pytest.raises(OperationalError):
+        retry_on_lock(func)
+    assert len(calls) == 1
+
+
+def test_mutating_view_in_transaction():
+    states = []
+
+    def view(request):
+        states.append(connection.in_atomic_block)
+        raise OperationalError('database is locked')
+
+    middleware = WriteCoordinationMiddleware(lambda request: None)
+    request = RequestFactory().post('/posts/1/comment/')
+    with pytest.raises(OperationalError):
+        middleware.process_view(request, view, (), {})
+    assert states == [True], (
+        'Убедитесь, что изменяющие представления выполняются в транзакции '
+        'и не вызываются повторно.'
+    )
+    assert middleware.process_view(
+        RequestFactory().get('/'), view, (), {}
+    ) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_transaction_retries_begin(monkeypatch):
+    begin = connection._start_transaction_under_autocommit
+    func, calls = flaky(2)
+    monkeypatch.setattr(
+        connection, '_start_transaction_under_autocommit',
+        lambda: func() and begin(),
+    )
+    with write_transaction():
+        assert connection.in_atomic_block
+    assert len(calls) == 3, (
+        'Убедитесь, что при занятой базе повторяется начало транзакции.'
+    )
+    assert not connection.in_atomic_block
+
+
+@pytest.mark.django_db(transaction=True)
+def test_upload_checked_outside_transaction(
+        user_client, published_category, published_location, media_root,
+        monkeypatch):
+    states = {}
+    inspect_upload = forms.inspect_upload
+    monkeypatch.setattr(forms, 'inspect_upload', lambda upload: (
+        states.setdefault('inspect', connection.in_atomic_block)
+        or inspect_upload(upload)
+    ))
+    save = PostForm.save
+    monkeypatch.setattr(PostForm, 'save', lambda form, *args: (
+        states.setdefault('save', connection.in_atomic_block)
+        and save(form, *args)
+    ))
+    store = ContentAddressedStorage.save
+    monkeypatch.setattr(ContentAddressedStorage, 'save', lambda *args, **kw: (
+        states.setdefault('store', connection.in_atomic_block)
+        or store(*args, **kw)
+    ))
+    user_client.post('/posts/create/', data={
+        'title': 'Заголовок', 'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+        'location': published_location.pk,
+        'image': SimpleUploadedFile(
+            'photo.jpg', make_image_bytes(), content_type='image/jpeg'
+        ),
+    })
+    assert states == {'inspect': False, 'store': False, 'save': True}, (
+        'Изображение должно проверяться и сохраняться в хранилище до '
+        'транзакции, а строка публикации записываться внутри неё.'
+    )
+    assert Post.objects.exists()
+
+
+def open_database(path, **options):
+    wrapper = DatabaseWrapper({
+        **connection.settings_dict, 'NAME': str(path), 'OPTIONS': options,
+    })
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def test_begin_immediate_takes_write_lock(tmp_path):
+    path = tmp_path / 'db.sqlite3'
+    first = open_database(path, transaction_mode='IMMEDIATE')
+    second = open_database(path, transaction_mode='IMMEDIATE', timeout=0)
+    try:
+        first.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True
+        )
+        with pytest.raises(OperationalError, match='locked'):
+            second.set_autocommit(
+                False, force_begin_transaction_with_broken_autocommit=True
+            )
+        assert write_stats.snapshot()['begin'] >= 1
+    finally:
+        first.close()
+        second.close()